@@ -2,7 +2,10 @@ import asyncio
 import json
 import httpx
 from datetime import datetime
-from app.core.config import OLLAMA_BASE_URL
+from app.services import ollama_client
+from app.services.llm_scheduler import llm_context
+from app.services.llm_metrics import record_timings
+from app.services.json_stream import JSONStreamParser
 
 
 class AgentMessage:
@@ -44,19 +47,20 @@ class BaseAgent:
         await self.log("command", f"[{self.name}] Querying LLM ({self.model})...")
 
         try:
-            async with httpx.AsyncClient(timeout=180.0) as client:
-                response = await client.post(
-                    f"{OLLAMA_BASE_URL}/api/chat",
-                    json={"model": self.model, "messages": messages, "stream": False}
+            with llm_context(caller=f"agent:{self.name}"):
+                response = await ollama_client.post(
+                    "/api/chat",
+                    {"model": self.model, "messages": messages, "stream": False},
+                    op="agent",
                 )
-                if response.status_code != 200:
-                    err = f"Ollama error: {response.status_code}"
-                    await self.log("error", err)
-                    return err
-                data = response.json()
-                result = data.get("message", {}).get("content", "")
-                await self.log("output", result[:500])
-                return result
+            if response.status_code != 200:
+                err = f"Ollama error: {response.status_code}"
+                await self.log("error", err)
+                return err
+            data = response.json()
+            result = data.get("message", {}).get("content", "")
+            await self.log("output", result[:500])
+            return result
         except httpx.ConnectError:
             err = "[Ollama server not available]"
             await self.log("error", err)
@@ -66,5 +70,53 @@ class BaseAgent:
             await self.log("error", err)
             return err
 
+    async def call_llm_json(self, prompt: str, system_prompt: str, array_key: str, on_item=None) -> dict:
+        """Stream a JSON-mode completion, handing each finished element of
+        ``array_key`` to ``on_item`` while the rest is still generating."""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        await self.log("command", f"[{self.name}] Querying LLM ({self.model}, JSON mode)...")
+
+        parser = JSONStreamParser(array_key)
+        try:
+            with llm_context(caller=f"agent:{self.name}"):
+                async with ollama_client.stream(
+                    "/api/chat",
+                    {"model": self.model, "messages": messages, "stream": True, "format": "json"},
+                    op="agent",
+                ) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        err = f"Ollama error: {response.status_code}"
+                        await self.log("error", err)
+                        return {array_key: [], "raw_response": err}
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        data = json.loads(line)
+                        for item in parser.feed(data.get("message", {}).get("content", "")):
+                            if on_item:
+                                await on_item(item)
+                        if data.get("done"):
+                            record_timings(self.model, data)
+                            break
+        except httpx.ConnectError:
+            err = "[Ollama server not available]"
+            await self.log("error", err)
+            return {array_key: parser.items, "raw_response": parser.buffer or err}
+        except Exception as e:
+            err = f"[LLM Error: {str(e)}]"
+            await self.log("error", err)
+            return {array_key: parser.items, "raw_response": parser.buffer or err}
+
+        await self.log("output", parser.buffer[:500])
+        document = parser.close()
+        if document is None:
+            return {array_key: parser.items, "raw_response": parser.buffer}
+        return document
+
     async def execute(self, task: str, context: dict | None = None) -> dict:
         raise NotImplementedError
@@ -1,7 +1,22 @@
+import asyncio
+import hashlib
+import json
 import os
+from collections import defaultdict
 import aiofiles
 from app.agents.base import BaseAgent
 from app.core.config import WORKSPACE_DIR
+from app.services.patching import PatchError, apply_unified_diff
+from app.services.task_budget import check_budget
+
+MANIFEST_PATH = os.path.join(".rudrax", "manifest.json")
+MAX_CONTEXT_FILE_CHARS = 20000
+
+_manifest_locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+
+def _sha256(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
 
 
 class CoderAgent(BaseAgent):
@@ -13,9 +28,37 @@ class CoderAgent(BaseAgent):
 
         plan_info = ""
         if context and "plan" in context:
-            import json
             plan_info = f"\n\nProject Plan:\n{json.dumps(context['plan'], indent=2)}"
 
+        user_id = context.get("user_id", "default") if context else "default"
+        workspace = os.path.join(WORKSPACE_DIR, str(user_id))
+        os.makedirs(workspace, exist_ok=True)
+
+        step = (context or {}).get("step")
+        task_id = (context or {}).get("task_id")
+        # The workspace is shared by all of the user's tasks, so steps are owned
+        # per task: generic steps ("Implementation") of another task never match
+        step_key = "task"
+        if step:
+            step_key = str(step["id"]) if task_id is None else f"{task_id}:{step['id']}"
+        # Within a task a plan step is keyed on its own definition and what its
+        # dependencies produced, so editing the requirements or another step
+        # leaves it alone
+        step_hash = _sha256(
+            json.dumps([self.model, task_id, step], sort_keys=True) if step else self.model + task + plan_info
+        )
+        manifest = await self._load_manifest(workspace)
+        incremental = bool(manifest["files"]) and (context or {}).get("incremental", True)
+        owned = {p: e for p, e in manifest["files"].items() if e.get("step") == step_key}
+        existing = {p: self._read_current(workspace, p) for p in owned}
+        existing = {p: c for p, c in existing.items() if c is not None}
+
+        if incremental and manifest["steps"].get(step_key) == step_hash and owned and all(
+            p in existing and _sha256(existing[p]) == owned[p]["sha256"] for p in owned
+        ):
+            await self.log("info", f"Step {step_key} unchanged, keeping {len(owned)} existing files")
+            return {"agent": self.name, "status": "completed", "files": sorted(owned), "unchanged": True}
+
         system_prompt = f"""You are an expert software developer. Generate complete, production-ready code.
 Rules:
 - Generate COMPLETE files with NO placeholders or TODOs
@@ -25,35 +68,103 @@ Rules:
 - Each file should have: "path" (relative), "content" (full file content), "language"
 - Only output valid JSON, no markdown
 {plan_info}"""
+        if incremental and existing:
+            system_prompt += self._incremental_prompt(existing, manifest, owned)
 
-        await self.log("command", "Generating code...")
-        result = await self.call_llm(task, system_prompt)
+        await self.log("command", "Generating code..." if not (incremental and existing) else "Updating existing code...")
 
         files_created = []
-        try:
-            import json
-            data = json.loads(result)
-            files = data.get("files", [])
-            user_id = context.get("user_id", "default") if context else "default"
-            workspace = os.path.join(WORKSPACE_DIR, str(user_id))
-            os.makedirs(workspace, exist_ok=True)
-
-            for file_info in files:
-                file_path = os.path.join(workspace, file_info["path"])
-                os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                async with aiofiles.open(file_path, "w") as f:
-                    await f.write(file_info["content"])
-                files_created.append(file_info["path"])
-                await self.log("output", f"Created: {file_info['path']}")
-        except (json.JSONDecodeError, ValueError):
+        written: dict[str, str] = {}
+        failed_patches = []
+
+        async def write_file(file_info):
+            if not isinstance(file_info, dict) or "path" not in file_info:
+                return
+            path = os.path.normpath(file_info["path"]).lstrip(os.sep)
+            if "content" in file_info:
+                content = file_info["content"]
+            elif "diff" in file_info and path in existing:
+                try:
+                    content = apply_unified_diff(existing[path], file_info["diff"])
+                except PatchError as e:
+                    failed_patches.append(path)
+                    await self.log("warning", f"Could not apply diff to {path}: {e}")
+                    return
+            else:
+                return
+            files_created.append(path)
+            written[path] = _sha256(content)
+            if path in existing and _sha256(existing[path]) == written[path]:
+                await self.log("output", f"Unchanged: {path}")
+                return
+            check_budget()
+            file_path = os.path.join(workspace, path)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            async with aiofiles.open(file_path, "w") as f:
+                await f.write(content)
+            await self.log("output", f"{'Updated' if path in existing else 'Created'}: {path}")
+
+        data = await self.call_llm_json(task, system_prompt, "files", on_item=write_file)
+
+        if incremental and existing:
+            kept = [p for p in existing if p not in written]
+            files_created.extend(kept)
+            written.update({p: _sha256(existing[p]) for p in kept})
+
+        if not files_created:
             await self.log("warning", "Could not parse structured output, saving raw response")
-            user_id = context.get("user_id", "default") if context else "default"
-            workspace = os.path.join(WORKSPACE_DIR, str(user_id))
-            os.makedirs(workspace, exist_ok=True)
+            check_budget()
             raw_path = os.path.join(workspace, "generated_output.txt")
             async with aiofiles.open(raw_path, "w") as f:
-                await f.write(result)
+                await f.write(data.get("raw_response") or json.dumps(data, indent=2))
             files_created.append("generated_output.txt")
+        elif not failed_patches:
+            await self._update_manifest(workspace, step_key, step_hash, written)
 
         await self.log("info", f"Coder Agent completed. Files created: {len(files_created)}")
-        return {"agent": self.name, "status": "completed", "files": files_created}
+        result = {"agent": self.name, "status": "completed", "files": files_created}
+        if failed_patches:
+            result["failed_patches"] = failed_patches
+        return result
+
+    def _incremental_prompt(self, existing: dict[str, str], manifest: dict, owned: dict) -> str:
+        others = sorted(p for p in manifest["files"] if p not in owned)
+        listing = "\n\n".join(
+            f"--- {path}\n{content[:MAX_CONTEXT_FILE_CHARS]}" for path, content in sorted(existing.items())
+        )
+        prompt = (
+            "\n\nThe workspace already contains files for this step. Only return files that must change:\n"
+            '- For an existing file, return {"path", "diff"} where "diff" is a unified diff against the content shown below\n'
+            '- For a new file, return {"path", "content", "language"}\n'
+            "- Omit existing files that need no change\n\n"
+            f"Existing files:\n{listing}"
+        )
+        if others:
+            prompt += "\n\nOther files already in the workspace (do not regenerate): " + ", ".join(others)
+        return prompt
+
+    def _read_current(self, workspace: str, rel_path: str) -> str | None:
+        try:
+            with open(os.path.join(workspace, rel_path)) as f:
+                return f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    async def _load_manifest(self, workspace: str) -> dict:
+        try:
+            async with aiofiles.open(os.path.join(workspace, MANIFEST_PATH)) as f:
+                manifest = json.loads(await f.read())
+        except (OSError, ValueError):
+            manifest = {}
+        return {"files": manifest.get("files", {}), "steps": manifest.get("steps", {})}
+
+    async def _update_manifest(self, workspace: str, step_key: str, step_hash: str, written: dict[str, str]):
+        async with _manifest_locks[workspace]:
+            manifest = await self._load_manifest(workspace)
+            manifest["files"] = {p: e for p, e in manifest["files"].items() if e.get("step") != step_key}
+            manifest["files"].update({p: {"sha256": digest, "step": step_key} for p, digest in written.items()})
+            manifest["steps"][step_key] = step_hash
+            path = os.path.join(workspace, MANIFEST_PATH)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            async with aiofiles.open(path, "w") as f:
+                await f.write(json.dumps(manifest, indent=2, sort_keys=True))
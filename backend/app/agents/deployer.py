@@ -1,7 +1,11 @@
 import asyncio
 import os
+import signal
 from app.agents.base import BaseAgent
 from app.core.config import WORKSPACE_DIR
+from app.services.task_budget import current_budget, check_budget
+
+COMMAND_TIMEOUT = 60
 
 
 class DeployerAgent(BaseAgent):
@@ -49,22 +53,41 @@ class DeployerAgent(BaseAgent):
         return {"agent": self.name, "status": "completed", "steps": steps_completed}
 
     async def _run_command(self, cmd: str, cwd: str) -> str:
+        budget = current_budget()
+        timeout = budget.limit_timeout(COMMAND_TIMEOUT) if budget else COMMAND_TIMEOUT
+        proc = None
         try:
+            check_budget()
             proc = await asyncio.create_subprocess_shell(
                 cmd,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
                 cwd=cwd,
+                start_new_session=True,
             )
-            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=60)
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
             output = stdout.decode().strip()
             errors = stderr.decode().strip()
             combined = f"{output}\n{errors}".strip()
             await self.log("output", combined[:500] if combined else "(no output)")
             return combined
         except asyncio.TimeoutError:
+            await self._kill(proc)
             await self.log("error", f"Command timed out: {cmd}")
             return "Command timed out"
+        except asyncio.CancelledError:
+            await asyncio.shield(self._kill(proc))
+            raise
         except Exception as e:
             await self.log("error", f"Command failed: {str(e)}")
             return str(e)
+
+    async def _kill(self, proc: asyncio.subprocess.Process | None):
+        """Kill the shell and everything it started (own session/process group)."""
+        if proc is None or proc.returncode is not None:
+            return
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        await proc.wait()
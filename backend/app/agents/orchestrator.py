@@ -1,10 +1,21 @@
+import asyncio
+import hashlib
 import json
+import os
 import aiosqlite
 from app.agents.planner import PlannerAgent
 from app.agents.coder import CoderAgent
 from app.agents.tester import TesterAgent
 from app.agents.deployer import DeployerAgent
-from app.core.config import DB_PATH
+from app.agents.step_graph import build_steps, ancestors, critical_path
+from app.core.config import DB_PATH, WORKSPACE_DIR, ORCHESTRATOR_MAX_PARALLEL_STEPS, ORCHESTRATOR_STEP_RETRIES
+from app.services.llm_scheduler import llm_context
+from app.services import log_sink
+from app.services.llm_metrics import pop_task_usage
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
 
 
 class AgentOrchestrator:
@@ -16,7 +27,16 @@ class AgentOrchestrator:
         self.tester = TesterAgent(model=model, log_callback=log_callback)
         self.deployer = DeployerAgent(model=model, log_callback=log_callback)
 
-    async def run(self, task_id: int, task_description: str, user_id: int, mode: str = "full"):
+    async def run(self, task_id: int, task_description: str, user_id: int, mode: str = "full", raise_errors: bool = False):
+        """With `raise_errors` a failed run raises instead of marking the task
+        failed, leaving that to the caller (the job worker retries first)."""
+        with llm_context(priority="background", user_id=user_id, task_id=task_id):
+            try:
+                return await self._run(task_id, task_description, user_id, mode, raise_errors)
+            finally:
+                await self._save_llm_usage(task_id)
+
+    async def _run(self, task_id: int, task_description: str, user_id: int, mode: str, raise_errors: bool):
         context = {"user_id": user_id, "task_id": task_id}
 
         await self._update_task_status(task_id, "running")
@@ -29,22 +49,25 @@ class AgentOrchestrator:
                     "content": f"Starting autonomous execution: {task_description}",
                 })
 
-            plan_result = await self.planner.execute(task_description, context)
+            plan_hash = _digest("plan", self.model, task_description)
+            plan_result = await self._load_checkpoint(task_id, "plan", plan_hash)
+            if plan_result is not None:
+                await self._log("info", "Reusing checkpointed plan")
+            else:
+                plan_result = await self.planner.execute(task_description, context)
+                await self._save_checkpoint(task_id, "plan", plan_hash, plan_result)
+                await self._save_log(task_id, "planner", "info", json.dumps(plan_result, default=str))
             context["plan"] = plan_result.get("plan", {})
-            await self._save_log(task_id, "planner", "info", json.dumps(plan_result, default=str))
-
-            if mode in ("full", "code"):
-                code_result = await self.coder.execute(task_description, context)
-                context["files"] = code_result.get("files", [])
-                await self._save_log(task_id, "coder", "info", json.dumps(code_result, default=str))
 
-            if mode in ("full", "test"):
-                test_result = await self.tester.execute(task_description, context)
-                await self._save_log(task_id, "tester", "info", json.dumps(test_result, default=str))
+            steps = build_steps(context["plan"], mode)
+            results, timing = await self._execute_steps(task_id, task_description, steps, context)
+            context["steps"] = {step_id: result.get("status") for step_id, result in results.items()}
+            context["timing"] = timing
+            await self._save_timing(task_id, timing)
 
-            if mode == "full":
-                deploy_result = await self.deployer.execute(task_description, context)
-                await self._save_log(task_id, "deployer", "info", json.dumps(deploy_result, default=str))
+            failed = [step_id for step_id, result in results.items() if result.get("status") in ("error", "skipped")]
+            if failed:
+                raise RuntimeError(f"Steps did not complete: {', '.join(failed)}")
 
             await self._update_task_status(task_id, "completed")
 
@@ -53,11 +76,14 @@ class AgentOrchestrator:
                     "agent": "orchestrator",
                     "type": "info",
                     "content": "All agents completed successfully",
+                    "status": "completed",
                 })
 
             return {"status": "completed", "context": {k: v for k, v in context.items() if k != "task_id"}}
 
         except Exception as e:
+            if raise_errors:
+                raise
             await self._update_task_status(task_id, "failed")
             error_msg = str(e)
             if self.log_callback:
@@ -65,21 +91,204 @@ class AgentOrchestrator:
                     "agent": "orchestrator",
                     "type": "error",
                     "content": f"Execution failed: {error_msg}",
+                    "status": "failed",
                 })
             return {"status": "failed", "error": error_msg}
 
-    async def _update_task_status(self, task_id: int, status: str):
+    async def _execute_steps(self, task_id: int, task_description: str, steps: dict[str, dict], context: dict):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        semaphore = asyncio.Semaphore(ORCHESTRATOR_MAX_PARALLEL_STEPS)
+        results: dict[str, dict] = {}
+        timings: dict[str, dict] = {}
+        step_files: dict[str, list[str]] = {}
+        pending = list(steps)
+        done: set[str] = set()
+        failed: set[str] = set()
+        running: dict[asyncio.Task, str] = {}
+        digests: dict[str, str] = {}
+        output_digests: dict[str, str] = {}
+        input_hashes: dict[str, str] = {}
+        context.setdefault("files", [])
+        workspace = os.path.join(WORKSPACE_DIR, str(context["user_id"]))
+
+        try:
+            while pending or running:
+                for step_id in [s for s in pending if any(d in failed for d in steps[s]["deps"])]:
+                    pending.remove(step_id)
+                    failed.add(step_id)
+                    results[step_id] = {"status": "skipped", "reason": "dependency failed"}
+                    await self._log("warning", f"Skipping step {step_id}: a dependency failed")
+
+                ready = [s for s in pending if all(d in done for d in steps[s]["deps"])]
+                if not ready and not running and pending:
+                    ready = pending[:1]
+                    await self._log("warning", f"Dependency cycle in plan, forcing step {ready[0]}")
+                for step_id in ready:
+                    pending.remove(step_id)
+                    step_context = dict(context)
+                    if steps[step_id]["type"] == "test":
+                        upstream = ancestors(steps, step_id)
+                        scoped = [f for s in steps if s in upstream for f in step_files.get(s, [])]
+                        step_context["files"] = scoped or list(context["files"])
+                    step = steps[step_id]
+                    step_context["dep_outputs"] = {d: output_digests[d] for d in sorted(step["deps"]) if d in output_digests}
+                    input_hash = _digest(
+                        "step", self.model, task_description, step,
+                        {d: digests[d] for d in sorted(step["deps"]) if d in digests},
+                        step_context["files"] if step["type"] == "test" else None,
+                    )
+                    input_hashes[step_id] = input_hash
+                    task = asyncio.create_task(self._run_step(
+                        task_id, step, input_hash, workspace, task_description, step_context, semaphore, started, timings,
+                    ))
+                    running[task] = step_id
+                if not running:
+                    continue
+
+                finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    step_id = running.pop(task)
+                    result = task.result()
+                    results[step_id] = result
+                    output_digests[step_id] = self._files_digest(result.get("files", []), workspace)
+                    digests[step_id] = _digest(input_hashes[step_id], self._result_digest(result, workspace))
+                    if result.get("status") == "error":
+                        failed.add(step_id)
+                    else:
+                        done.add(step_id)
+                    if steps[step_id]["type"] == "code":
+                        step_files[step_id] = result.get("files", [])
+                        context["files"].extend(f for f in step_files[step_id] if f not in context["files"])
+                    if result.get("agent") and not result.get("reused"):
+                        await self._save_log(task_id, result["agent"], "info", json.dumps(result, default=str))
+        finally:
+            # On cancellation (user cancel or exhausted budget) stop the steps still
+            # in flight so their LLM slots, subprocesses and writes end with the task
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        path, path_seconds = critical_path(steps, timings)
+        serial_seconds = round(sum(t["end"] - t["start"] for t in timings.values()), 3)
+        wall_clock = round(loop.time() - started, 3)
+        timing = {
+            "wall_clock_seconds": wall_clock,
+            "serial_seconds": serial_seconds,
+            "critical_path": path,
+            "critical_path_seconds": path_seconds,
+            "parallel_speedup": round(serial_seconds / wall_clock, 2) if wall_clock else 1.0,
+            "steps": timings,
+        }
+        await self._log("info", f"Critical path {' -> '.join(path)} took {path_seconds}s of {wall_clock}s wall clock")
+        return results, timing
+
+    async def _run_step(
+        self, task_id: int, step: dict, input_hash: str, workspace: str, task_description: str,
+        context: dict, semaphore, started: float, timings: dict,
+    ) -> dict:
+        loop = asyncio.get_running_loop()
+        stage = f"step:{step['id']}"
+        checkpoint = await self._load_checkpoint(task_id, stage, input_hash)
+        if checkpoint is not None and all(os.path.exists(os.path.join(workspace, f)) for f in checkpoint.get("files", [])):
+            now = round(loop.time() - started, 3)
+            timings[step["id"]] = {"type": step["type"], "start": now, "end": now, "attempts": 0, "reused": True}
+            await self._log("info", f"Reusing checkpoint for step {step['id']}")
+            return {**checkpoint, "reused": True}
+
+        async with semaphore:
+            timings[step["id"]] = {"type": step["type"], "start": round(loop.time() - started, 3)}
+            for attempt in range(ORCHESTRATOR_STEP_RETRIES + 1):
+                try:
+                    result = await self._dispatch_step(step, task_description, context)
+                except Exception as e:
+                    result = {"status": "error", "error": str(e)}
+                if result.get("status") != "error":
+                    break
+                if attempt < ORCHESTRATOR_STEP_RETRIES:
+                    await self._log("warning", f"Step {step['id']} failed, retrying ({attempt + 1}/{ORCHESTRATOR_STEP_RETRIES})")
+                    await asyncio.sleep(min(2 ** attempt, 10))
+            timings[step["id"]].update(end=round(loop.time() - started, 3), attempts=attempt + 1)
+        if result.get("status") != "error":
+            await self._save_checkpoint(task_id, stage, input_hash, result)
+        return result
+
+    def _result_digest(self, result: dict, workspace: str) -> str:
+        """Digest of a step's output, including the bytes of any files it
+        wrote, so dependents re-run when generated code actually changes."""
+        hasher = hashlib.sha256(json.dumps({k: v for k, v in result.items() if k != "reused"}, sort_keys=True, default=str).encode())
+        hasher.update(self._files_digest(result.get("files", []), workspace).encode())
+        return hasher.hexdigest()
+
+    def _files_digest(self, files: list[str], workspace: str) -> str:
+        hasher = hashlib.sha256()
+        for rel_path in sorted(files):
+            hasher.update(rel_path.encode())
+            try:
+                with open(os.path.join(workspace, rel_path), "rb") as f:
+                    hasher.update(f.read())
+            except OSError:
+                hasher.update(b"missing")
+        return hasher.hexdigest()
+
+    async def _load_checkpoint(self, task_id: int, stage: str, input_hash: str) -> dict | None:
         async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
-                "UPDATE tasks SET status = ?, updated_at = datetime('now') WHERE id = ?",
-                (status, task_id)
+            cursor = await db.execute(
+                "SELECT output FROM task_checkpoints WHERE task_id = ? AND stage = ? AND input_hash = ?",
+                (task_id, stage, input_hash)
             )
-            await db.commit()
+            row = await cursor.fetchone()
+        return json.loads(row[0]) if row else None
 
-    async def _save_log(self, task_id: int, agent_name: str, log_type: str, message: str):
+    async def _save_checkpoint(self, task_id: int, stage: str, input_hash: str, output: dict):
         async with aiosqlite.connect(DB_PATH) as db:
             await db.execute(
-                "INSERT INTO agent_logs (task_id, agent_name, log_type, message) VALUES (?, ?, ?, ?)",
-                (task_id, agent_name, log_type, message[:5000])
+                """INSERT INTO task_checkpoints (task_id, stage, input_hash, output) VALUES (?, ?, ?, ?)
+                   ON CONFLICT (task_id, stage) DO UPDATE SET
+                       input_hash = excluded.input_hash, output = excluded.output, updated_at = datetime('now')""",
+                (task_id, stage, input_hash, json.dumps(output, default=str))
             )
             await db.commit()
+
+    async def _dispatch_step(self, step: dict, task_description: str, context: dict) -> dict:
+        if step["type"] == "code":
+            if step["description"]:
+                task_description = (
+                    f"{task_description}\n\nCurrent step ({step['id']}): {step['title']}\n{step['description']}\n"
+                    "Only generate the files needed for this step."
+                )
+            return await self.coder.execute(task_description, {**context, "step": {
+                "id": step["id"], "title": step["title"], "description": step["description"],
+                "deps": context.get("dep_outputs", {}),
+            }})
+        if step["type"] == "test":
+            return await self.tester.execute(task_description, context)
+        if step["type"] == "deploy":
+            return await self.deployer.execute(task_description, context)
+        return {"status": "completed"}
+
+    async def _log(self, log_type: str, content: str):
+        if self.log_callback:
+            await self.log_callback({"agent": "orchestrator", "type": log_type, "content": content})
+
+    async def _save_timing(self, task_id: int, timing: dict):
+        await log_sink.write("UPDATE tasks SET timing = ? WHERE id = ?", (json.dumps(timing), task_id))
+
+    async def _update_task_status(self, task_id: int, status: str):
+        await log_sink.write(
+            "UPDATE tasks SET status = ?, updated_at = datetime('now') WHERE id = ?",
+            (status, task_id)
+        )
+
+    async def _save_llm_usage(self, task_id: int):
+        usage = pop_task_usage(task_id)
+        if usage is None:
+            return
+        await log_sink.write("UPDATE tasks SET llm_usage = ? WHERE id = ?", (json.dumps(usage), task_id))
+
+    async def _save_log(self, task_id: int, agent_name: str, log_type: str, message: str):
+        await log_sink.write(
+            "INSERT INTO agent_logs (task_id, agent_name, log_type, message) VALUES (?, ?, ?, ?)",
+            (task_id, agent_name, log_type, message[:5000])
+        )
@@ -21,14 +21,17 @@ Each step should have: "id", "title", "description", "type", "dependencies", "co
 Only output valid JSON, no markdown."""
 
         await self.log("command", "Generating project plan...")
-        result = await self.call_llm(task, system_prompt)
+
+        async def on_step(step):
+            if isinstance(step, dict):
+                await self.log("output", f"Step {step.get('id', '?')}: {step.get('title', '')}")
+
+        plan = await self.call_llm_json(task, system_prompt, "steps", on_item=on_step)
 
         await self.log("info", "Plan generation complete")
 
-        try:
-            import json
-            plan = json.loads(result)
-        except (json.JSONDecodeError, ValueError):
+        if not plan.get("steps"):
+            result = plan.get("raw_response", "")
             plan = {
                 "steps": [
                     {"id": 1, "title": "Analysis", "description": result[:200], "type": "design", "dependencies": [], "complexity": "medium"},
@@ -0,0 +1,84 @@
+MODE_STEP_TYPES = {
+    "full": {"design", "code", "test", "deploy"},
+    "code": {"design", "code"},
+    "test": {"design", "test"},
+}
+
+
+def _step_id(value) -> str:
+    return str(value).strip()
+
+
+def build_steps(plan: dict, mode: str) -> dict[str, dict]:
+    """Turn planner output into an executable DAG keyed by step id.
+
+    Unknown dependencies are dropped, steps outside the mode become no-ops so
+    their dependents still run, all deploy steps collapse into a single node
+    (they share one git workspace), and a code/test/deploy node is synthesised
+    when the mode needs one but the plan has none."""
+    enabled = MODE_STEP_TYPES.get(mode, MODE_STEP_TYPES["full"])
+    steps: dict[str, dict] = {}
+    for i, raw in enumerate(plan.get("steps") or [], start=1):
+        if not isinstance(raw, dict):
+            continue
+        step_id = _step_id(raw.get("id", i))
+        if step_id in steps:
+            step_id = f"{step_id}.{i}"
+        step_type = str(raw.get("type", "code")).lower()
+        deps = raw.get("dependencies") or []
+        steps[step_id] = {
+            "id": step_id,
+            "title": str(raw.get("title", f"Step {step_id}")),
+            "description": str(raw.get("description", "")),
+            "type": step_type if step_type in enabled else "noop",
+            "deps": [_step_id(d) for d in (deps if isinstance(deps, list) else [deps])],
+        }
+    for step in steps.values():
+        step["deps"] = [d for d in dict.fromkeys(step["deps"]) if d in steps and d != step["id"]]
+
+    def ids_of(step_type: str) -> list[str]:
+        return [s for s, step in steps.items() if step["type"] == step_type]
+
+    if "code" in enabled and not ids_of("code"):
+        steps["code"] = {"id": "code", "title": "Implementation", "description": "", "type": "code", "deps": ids_of("noop")}
+    if "test" in enabled and not ids_of("test"):
+        steps["test"] = {"id": "test", "title": "Testing", "description": "", "type": "test", "deps": ids_of("code")}
+
+    deploys = ids_of("deploy")
+    if "deploy" in enabled:
+        others = [s for s in steps if s not in deploys]
+        for s in deploys:
+            del steps[s]
+        for step in steps.values():
+            step["deps"] = [d for d in step["deps"] if d not in deploys]
+        steps["deploy"] = {"id": "deploy", "title": "Deployment", "description": "", "type": "deploy", "deps": others}
+    return steps
+
+
+def ancestors(steps: dict[str, dict], step_id: str) -> set[str]:
+    seen: set[str] = set()
+    stack = list(steps[step_id]["deps"])
+    while stack:
+        current = stack.pop()
+        if current not in seen:
+            seen.add(current)
+            stack.extend(steps[current]["deps"])
+    return seen
+
+
+def critical_path(steps: dict[str, dict], timings: dict[str, dict]) -> tuple[list[str], float]:
+    """Walk back from the last step to finish through whichever dependency
+    finished last; that chain is what bounded the wall-clock time."""
+    finished = {s: t for s, t in timings.items() if "end" in t}
+    if not finished:
+        return [], 0.0
+    current = max(finished, key=lambda s: finished[s]["end"])
+    path = [current]
+    while True:
+        deps = [d for d in steps[current]["deps"] if d in finished]
+        if not deps:
+            break
+        current = max(deps, key=lambda d: finished[d]["end"])
+        path.append(current)
+    path.reverse()
+    return path, round(sum(finished[s]["end"] - finished[s]["start"] for s in path), 3)
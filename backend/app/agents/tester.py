@@ -1,7 +1,8 @@
 import asyncio
 import os
 from app.agents.base import BaseAgent
-from app.core.config import WORKSPACE_DIR
+from app.core.config import WORKSPACE_DIR, TESTER_CONCURRENCY
+from app.services.syntax_check import check_file
 
 
 class TesterAgent(BaseAgent):
@@ -14,27 +15,13 @@ class TesterAgent(BaseAgent):
         files = context.get("files", []) if context else []
         user_id = context.get("user_id", "default") if context else "default"
         workspace = os.path.join(WORKSPACE_DIR, str(user_id))
-        test_results = []
+        semaphore = asyncio.Semaphore(TESTER_CONCURRENCY)
 
-        for file_path in files:
-            full_path = os.path.join(workspace, file_path)
-            if not os.path.exists(full_path):
-                test_results.append({"file": file_path, "status": "missing", "errors": ["File not found"]})
-                await self.log("error", f"File not found: {file_path}")
-                continue
+        async def run_check(file_path: str) -> dict:
+            async with semaphore:
+                return await self._check_file(os.path.join(workspace, file_path), file_path)
 
-            ext = os.path.splitext(file_path)[1].lower()
-            await self.log("command", f"Testing: {file_path}")
-
-            if ext == ".py":
-                result = await self._test_python(full_path, file_path)
-                test_results.append(result)
-            elif ext in (".js", ".ts", ".jsx", ".tsx"):
-                result = await self._test_syntax(full_path, file_path)
-                test_results.append(result)
-            else:
-                test_results.append({"file": file_path, "status": "skipped", "errors": []})
-                await self.log("info", f"Skipped non-testable file: {file_path}")
+        test_results = await asyncio.gather(*(run_check(f) for f in files))
 
         errors = [r for r in test_results if r["status"] == "error"]
         if errors and context:
@@ -49,34 +36,16 @@ class TesterAgent(BaseAgent):
         await self.log("info", f"Tester Agent completed. {len(errors)} errors found in {len(test_results)} files")
         return {"agent": self.name, "status": status, "results": test_results}
 
-    async def _test_python(self, full_path: str, rel_path: str) -> dict:
-        try:
-            proc = await asyncio.create_subprocess_exec(
-                "python3", "-c", f"import py_compile; py_compile.compile('{full_path}', doraise=True)",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-            )
-            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=30)
-            if proc.returncode == 0:
-                await self.log("output", f"PASS: {rel_path}")
-                return {"file": rel_path, "status": "passed", "errors": []}
-            else:
-                err_msg = stderr.decode().strip()
-                await self.log("error", f"FAIL: {rel_path} - {err_msg}")
-                return {"file": rel_path, "status": "error", "errors": [err_msg]}
-        except asyncio.TimeoutError:
-            await self.log("error", f"TIMEOUT: {rel_path}")
-            return {"file": rel_path, "status": "error", "errors": ["Test timed out"]}
-        except Exception as e:
-            return {"file": rel_path, "status": "error", "errors": [str(e)]}
-
-    async def _test_syntax(self, full_path: str, rel_path: str) -> dict:
-        try:
-            with open(full_path, "r") as f:
-                content = f.read()
-            if len(content) == 0:
-                return {"file": rel_path, "status": "error", "errors": ["Empty file"]}
-            await self.log("output", f"PASS (syntax check): {rel_path}")
-            return {"file": rel_path, "status": "passed", "errors": []}
-        except Exception as e:
-            return {"file": rel_path, "status": "error", "errors": [str(e)]}
+    async def _check_file(self, full_path: str, rel_path: str) -> dict:
+        if not os.path.exists(full_path):
+            await self.log("error", f"File not found: {rel_path}")
+            return {"file": rel_path, "status": "missing", "errors": ["File not found"]}
+
+        result = await check_file(full_path, rel_path)
+        if result["status"] == "skipped":
+            await self.log("info", f"Skipped non-testable file: {rel_path}")
+        elif result["status"] == "passed":
+            await self.log("output", f"PASS{' (cached)' if result.get('cached') else ''}: {rel_path}")
+        else:
+            await self.log("error", f"FAIL: {rel_path} - {'; '.join(result['errors'])}")
+        return result
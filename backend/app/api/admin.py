@@ -4,6 +4,7 @@ import aiosqlite
 from app.core.database import get_db
 from app.core.deps import require_admin
 from app.core.security import hash_password
+from app.services.llm_cache import cache_stats, clear_cache
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
@@ -87,3 +88,11 @@ async def update_setting(req: UpdateSettingRequest, admin: dict = Depends(requir
     )
     await db.commit()
     return {"message": "Setting updated"}
+
+@router.get("/llm-cache")
+async def get_llm_cache_stats(admin: dict = Depends(require_admin)):
+    return await cache_stats()
+
+@router.delete("/llm-cache")
+async def clear_llm_cache(admin: dict = Depends(require_admin)):
+    return await clear_cache()
@@ -1,13 +1,15 @@
 import asyncio
 import json
+import sys
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 import aiosqlite
 from app.core.database import get_db
 from app.core.deps import get_current_user
 from app.core.security import decode_access_token
-from app.core.config import DB_PATH
-from app.agents.orchestrator import AgentOrchestrator
+from app.core.config import DB_PATH, AGENT_WS_FLUSH_MS, AGENT_EVENTS_POLL_MS, ORCHESTRATOR_RESUME_ON_STARTUP
+from app.services import job_queue
+from app import worker
 
 router = APIRouter(prefix="/api/agent", tags=["agent"])
 
@@ -17,6 +19,120 @@ class AgentTaskRequest(BaseModel):
     task: str
     model: str = "llama3"
     mode: str = "full"
+    time_budget: float | None = None
+    token_budget: int | None = None
+
+class ResumeTaskRequest(BaseModel):
+    model: str | None = None
+    mode: str | None = None
+    time_budget: float | None = None
+    token_budget: int | None = None
+
+_ws_buffers: dict[int, list[dict]] = {}
+_ws_flushers: dict[int, asyncio.Task] = {}
+
+async def _flush_ws(user_id: int):
+    await asyncio.sleep(AGENT_WS_FLUSH_MS / 1000)
+    _ws_flushers.pop(user_id, None)
+    messages = _ws_buffers.pop(user_id, [])
+    if not messages or user_id not in active_connections:
+        return
+    if len(messages) == 1:
+        data = json.dumps(messages[0])
+    else:
+        data = json.dumps({"type": "batch", "messages": messages})
+    disconnected = []
+    for ws in active_connections[user_id]:
+        try:
+            await ws.send_text(data)
+        except Exception:
+            disconnected.append(ws)
+    for ws in disconnected:
+        active_connections[user_id].remove(ws)
+
+def _push(user_id: int, msg: dict):
+    if user_id not in active_connections:
+        return
+    _ws_buffers.setdefault(user_id, []).append(msg)
+    if user_id not in _ws_flushers:
+        _ws_flushers[user_id] = asyncio.create_task(_flush_ws(user_id))
+
+_relay: asyncio.Task | None = None
+
+async def _relay_events():
+    """Forward agent events published by the workers to this process's
+    WebSocket clients."""
+    queue = job_queue.get_queue()
+    loop = asyncio.get_running_loop()
+    cursor = await queue.event_cursor()
+    next_prune = 0.0
+    while True:
+        try:
+            cursor, events = await queue.read_events(cursor, AGENT_EVENTS_POLL_MS / 1000)
+            for user_id, event in events:
+                _push(user_id, event)
+            if loop.time() >= next_prune:
+                next_prune = loop.time() + 60
+                await queue.prune_events()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"agent event relay: {e}", file=sys.stderr)
+            await asyncio.sleep(1)
+            continue
+        if not events and queue.name == "sqlite":
+            await asyncio.sleep(AGENT_EVENTS_POLL_MS / 1000)
+
+def start_event_relay():
+    global _relay
+    if _relay is None or _relay.done():
+        _relay = asyncio.create_task(_relay_events())
+
+def stop_event_relay():
+    global _relay
+    if _relay is not None:
+        _relay.cancel()
+        _relay = None
+
+def _job_key(task_id: int) -> str:
+    return f"orchestrator:{task_id}"
+
+async def _enqueue_run(
+    task_id: int, description: str, user_id: int, model: str, mode: str,
+    time_budget: float | None = None, token_budget: int | None = None,
+) -> tuple[int, bool]:
+    return await job_queue.enqueue(
+        "orchestrator",
+        {
+            "task_id": task_id, "description": description, "user_id": user_id, "model": model, "mode": mode,
+            "time_budget": time_budget, "token_budget": token_budget,
+        },
+        key=_job_key(task_id),
+    )
+
+async def resume_interrupted_tasks():
+    """Called on startup: orchestrator tasks left pending/running without a
+    live job (e.g. queued before the job queue existed) either get a new job
+    (completed stages come back from checkpoints) or are marked interrupted.
+    Tasks whose job is still queued or running are left to the workers."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "SELECT id, user_id, description, model_used, mode FROM tasks "
+            "WHERE agent_type = 'orchestrator' AND status IN ('pending', 'running')"
+        )
+        rows = await cursor.fetchall()
+    queue = job_queue.get_queue()
+    orphaned = [row for row in rows if await queue.active_job(_job_key(row[0])) is None]
+    if not ORCHESTRATOR_RESUME_ON_STARTUP:
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.executemany(
+                "UPDATE tasks SET status = 'interrupted', updated_at = datetime('now') WHERE id = ?",
+                [(row[0],) for row in orphaned]
+            )
+            await db.commit()
+        return
+    for task_id, user_id, description, model, mode in orphaned:
+        await _enqueue_run(task_id, description or "", user_id, model or "llama3", mode or "full")
 
 @router.post("/execute")
 async def execute_agent_task(
@@ -25,29 +141,75 @@ async def execute_agent_task(
     db: aiosqlite.Connection = Depends(get_db),
 ):
     cursor = await db.execute(
-        "INSERT INTO tasks (user_id, title, description, status, agent_type, model_used) VALUES (?, ?, ?, 'pending', 'orchestrator', ?)",
-        (current_user["id"], req.task[:100], req.task, req.model)
+        "INSERT INTO tasks (user_id, title, description, status, agent_type, model_used, mode) VALUES (?, ?, ?, 'pending', 'orchestrator', ?, ?)",
+        (current_user["id"], req.task[:100], req.task, req.model, req.mode)
     )
     await db.commit()
     task_id = cursor.lastrowid
 
-    async def log_callback(msg: dict):
-        user_id = current_user["id"]
-        if user_id in active_connections:
-            data = json.dumps({"task_id": task_id, **msg})
-            disconnected = []
-            for ws in active_connections[user_id]:
-                try:
-                    await ws.send_text(data)
-                except Exception:
-                    disconnected.append(ws)
-            for ws in disconnected:
-                active_connections[user_id].remove(ws)
-
-    orchestrator = AgentOrchestrator(model=req.model, log_callback=log_callback)
-    asyncio.create_task(orchestrator.run(task_id, req.task, current_user["id"], req.mode))
-
-    return {"task_id": task_id, "status": "started", "message": "Agent execution started"}
+    job_id, _ = await _enqueue_run(
+        task_id, req.task, current_user["id"], req.model, req.mode, req.time_budget, req.token_budget
+    )
+
+    return {"task_id": task_id, "job_id": job_id, "status": "queued", "message": "Agent execution queued"}
+
+@router.post("/tasks/{task_id}/resume")
+async def resume_agent_task(
+    task_id: int,
+    req: ResumeTaskRequest | None = None,
+    current_user: dict = Depends(get_current_user),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    cursor = await db.execute(
+        "SELECT description, model_used, mode FROM tasks WHERE id = ? AND user_id = ? AND agent_type = 'orchestrator'",
+        (task_id, current_user["id"])
+    )
+    task = await cursor.fetchone()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if await job_queue.get_queue().active_job(_job_key(task_id)) is not None:
+        raise HTTPException(status_code=409, detail="Task is already queued or running")
+
+    model = (req and req.model) or task["model_used"] or "llama3"
+    mode = (req and req.mode) or task["mode"] or "full"
+    await db.execute("UPDATE tasks SET model_used = ?, mode = ? WHERE id = ?", (model, mode, task_id))
+    await db.commit()
+
+    job_id, created = await _enqueue_run(
+        task_id, task["description"] or "", current_user["id"], model, mode,
+        req and req.time_budget, req and req.token_budget,
+    )
+    if not created:
+        raise HTTPException(status_code=409, detail="Task is already queued or running")
+    return {"task_id": task_id, "job_id": job_id, "status": "resumed", "model": model, "mode": mode}
+
+@router.post("/tasks/{task_id}/cancel")
+async def cancel_agent_task(
+    task_id: int,
+    current_user: dict = Depends(get_current_user),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    cursor = await db.execute(
+        "SELECT status FROM tasks WHERE id = ? AND user_id = ? AND agent_type = 'orchestrator'",
+        (task_id, current_user["id"])
+    )
+    task = await cursor.fetchone()
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    state = await job_queue.cancel(_job_key(task_id))
+    if state == "cancelling":
+        job_id = await job_queue.get_queue().active_job(_job_key(task_id))
+        if job_id is not None:
+            worker.cancel_local(job_id)
+        return {"task_id": task_id, "status": "cancelling"}
+    if state is None and task["status"] not in ("pending", "running"):
+        raise HTTPException(status_code=409, detail=f"Task is already {task['status']}")
+    await db.execute(
+        "UPDATE tasks SET status = 'cancelled', updated_at = datetime('now') WHERE id = ?", (task_id,)
+    )
+    await db.commit()
+    return {"task_id": task_id, "status": "cancelled"}
 
 @router.websocket("/ws/{token}")
 async def agent_websocket(websocket: WebSocket, token: str):
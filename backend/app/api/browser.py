@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 from app.core.deps import get_current_user
 from app.services.browser_agent import browse_url, crawl_site, api_request, analyze_api
+from app.services.llm_scheduler import llm_context
 
 router = APIRouter(prefix="/api/browser", tags=["browser"])
 
@@ -50,4 +51,5 @@ async def run_api_test(req: ApiTestRequest, current_user: dict = Depends(get_cur
 
 @router.post("/api-analyze")
 async def run_api_analyze(req: ApiAnalyzeRequest, current_user: dict = Depends(get_current_user)):
-    return await analyze_api(req.url, req.model)
+    with llm_context(priority="interactive", user_id=current_user["id"], caller="api_analyze"):
+        return await analyze_api(req.url, req.model)
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import aiosqlite
 import httpx
 import json
 from app.core.database import get_db
 from app.core.deps import get_current_user
-from app.core.config import OLLAMA_BASE_URL
+from app.core.config import DB_PATH, HEDGE_ENABLED
+from app.services import ollama_client
+from app.services.chat_context import build_context
+from app.services.llm_metrics import record_timings
+from app.services.llm_scheduler import llm_context
+from app.services.ollama_service import hedged_complete, hedged_stream
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
@@ -17,43 +24,102 @@ class ChatRequest(BaseModel):
 class ChatHistoryRequest(BaseModel):
     session_id: str
 
-@router.post("/send")
-async def send_message(req: ChatRequest, current_user: dict = Depends(get_current_user), db: aiosqlite.Connection = Depends(get_db)):
+async def _prepare_messages(req: ChatRequest, user_id: int, db: aiosqlite.Connection) -> list[dict]:
     await db.execute(
         "INSERT INTO chat_messages (user_id, role, content, model, session_id) VALUES (?, 'user', ?, ?, ?)",
-        (current_user["id"], req.message, req.model, req.session_id)
+        (user_id, req.message, req.model, req.session_id)
     )
     await db.commit()
 
-    cursor = await db.execute(
-        "SELECT role, content FROM chat_messages WHERE user_id = ? AND session_id = ? ORDER BY created_at ASC",
-        (current_user["id"], req.session_id)
-    )
-    history = await cursor.fetchall()
-    messages = [{"role": r["role"], "content": r["content"]} for r in history]
+    messages = await build_context(db, user_id, req.session_id, req.model)
+    return messages or [{"role": "user", "content": req.message}]
+
+async def _save_assistant_message(user_id: int, content: str, model: str, session_id: str | None):
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            "INSERT INTO chat_messages (user_id, role, content, model, session_id) VALUES (?, 'assistant', ?, ?, ?)",
+            (user_id, content, model, session_id)
+        )
+        await db.commit()
+
+@router.post("/send")
+async def send_message(req: ChatRequest, current_user: dict = Depends(get_current_user), db: aiosqlite.Connection = Depends(get_db)):
+    messages = await _prepare_messages(req, current_user["id"], db)
 
     try:
-        async with httpx.AsyncClient(timeout=120.0) as client:
-            response = await client.post(
-                f"{OLLAMA_BASE_URL}/api/chat",
-                json={"model": req.model, "messages": messages, "stream": False}
-            )
-            if response.status_code != 200:
-                raise HTTPException(status_code=502, detail=f"Ollama error: {response.text}")
-            data = response.json()
-            assistant_msg = data.get("message", {}).get("content", "No response from model")
+        with llm_context(caller="chat"):
+            if HEDGE_ENABLED:
+                status, data = await hedged_complete(
+                    "/api/chat",
+                    {"model": req.model, "messages": messages},
+                    op="chat", priority="interactive", user_id=current_user["id"],
+                )
+            else:
+                response = await ollama_client.post(
+                    "/api/chat",
+                    {"model": req.model, "messages": messages, "stream": False},
+                    op="chat", priority="interactive", user_id=current_user["id"],
+                )
+                status, data = response.status_code, response.text if response.status_code != 200 else response.json()
+        if status != 200:
+            raise HTTPException(status_code=502, detail=f"Ollama error: {data}")
+        assistant_msg = data.get("message", {}).get("content", "No response from model")
     except httpx.ConnectError:
         assistant_msg = "[Ollama server not available. Please ensure Ollama is running on the server.]"
     except Exception as e:
         assistant_msg = f"[Error communicating with Ollama: {str(e)}]"
 
-    await db.execute(
-        "INSERT INTO chat_messages (user_id, role, content, model, session_id) VALUES (?, 'assistant', ?, ?, ?)",
-        (current_user["id"], assistant_msg, req.model, req.session_id)
-    )
-    await db.commit()
+    await _save_assistant_message(current_user["id"], assistant_msg, req.model, req.session_id)
     return {"response": assistant_msg, "model": req.model}
 
+@router.post("/send/stream")
+async def send_message_stream(request: Request, req: ChatRequest, current_user: dict = Depends(get_current_user), db: aiosqlite.Connection = Depends(get_db)):
+    messages = await _prepare_messages(req, current_user["id"], db)
+
+    async def event_stream():
+        parts: list[str] = []
+        try:
+            async with hedged_stream(
+                "/api/chat",
+                {"model": req.model, "messages": messages, "stream": True},
+                op="chat", priority="interactive", user_id=current_user["id"], caller="chat_stream",
+            ) as response:
+                if response.status_code != 200:
+                    detail = (await response.aread()).decode(errors="replace")
+                    yield json.dumps({"error": f"Ollama error: {detail}"}) + "\n"
+                    return
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    if await request.is_disconnected():
+                        break
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    token = data.get("message", {}).get("content", "")
+                    if token:
+                        parts.append(token)
+                        yield json.dumps({"token": token}) + "\n"
+                    if data.get("done"):
+                        record_timings(
+                            response.model, data, caller="chat_stream", user_id=current_user["id"],
+                            queue_wait=response.queue_wait,
+                        )
+                        break
+        except httpx.ConnectError:
+            parts = ["[Ollama server not available. Please ensure Ollama is running on the server.]"]
+            yield json.dumps({"token": parts[0]}) + "\n"
+        except Exception as e:
+            parts = [f"[Error communicating with Ollama: {str(e)}]"]
+            yield json.dumps({"token": parts[0]}) + "\n"
+        finally:
+            if parts:
+                await asyncio.shield(_save_assistant_message(current_user["id"], "".join(parts), req.model, req.session_id))
+        yield json.dumps({"done": True, "model": req.model}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 @router.get("/history")
 async def get_chat_history(session_id: str, current_user: dict = Depends(get_current_user), db: aiosqlite.Connection = Depends(get_db)):
     cursor = await db.execute(
@@ -78,5 +144,9 @@ async def delete_session(session_id: str, current_user: dict = Depends(get_curre
         "DELETE FROM chat_messages WHERE user_id = ? AND session_id = ?",
         (current_user["id"], session_id)
     )
+    await db.execute(
+        "DELETE FROM chat_summaries WHERE user_id = ? AND session_id = ?",
+        (current_user["id"], session_id)
+    )
     await db.commit()
     return {"message": "Session deleted"}
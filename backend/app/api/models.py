@@ -1,51 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException
-import httpx
-from app.core.deps import get_current_user
-from app.core.config import OLLAMA_BASE_URL
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+from app.core.deps import get_current_user, require_admin
+from app.services import ollama_client
+from app.services.llm_scheduler import scheduler
+from app.services.ollama_nodes import pool
+from app.services import model_catalog, model_warmup
+from app.services.llm_metrics import hedge_stats, load_stats
 
 router = APIRouter(prefix="/api/models", tags=["models"])
 
+class PinRequest(BaseModel):
+    model: str
+
 @router.get("/")
 async def list_models(current_user: dict = Depends(get_current_user)):
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(f"{OLLAMA_BASE_URL}/api/tags")
-            if response.status_code != 200:
-                raise HTTPException(status_code=502, detail="Failed to fetch models from Ollama")
-            data = response.json()
-            models = data.get("models", [])
-            return [
-                {
-                    "name": m.get("name", ""),
-                    "model": m.get("model", ""),
-                    "size": m.get("size", 0),
-                    "digest": m.get("digest", ""),
-                    "modified_at": m.get("modified_at", ""),
-                    "details": m.get("details", {}),
-                }
-                for m in models
-            ]
-    except httpx.ConnectError:
-        return []
+        return await model_catalog.get_models()
     except Exception:
         return []
 
 @router.get("/running")
 async def running_models(current_user: dict = Depends(get_current_user)):
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"{OLLAMA_BASE_URL}/api/ps")
-            if response.status_code == 200:
-                return response.json()
-            return {"models": []}
+        running = []
+        for node_url, response in await ollama_client.get_all("/api/ps", op="ps"):
+            if response is not None and response.status_code == 200:
+                running.extend({**m, "node": node_url} for m in response.json().get("models", []))
+        return {"models": running}
     except Exception:
         return {"models": []}
 
+@router.get("/running/pins")
+async def list_pins(current_user: dict = Depends(get_current_user)):
+    return model_warmup.warmup_status()
+
+@router.post("/running/pins")
+async def pin_model(req: PinRequest, admin: dict = Depends(require_admin)):
+    return await model_warmup.pin_model(req.model)
+
+@router.delete("/running/pins/{model}")
+async def unpin_model(model: str, admin: dict = Depends(require_admin)):
+    return await model_warmup.unpin_model(model)
+
+@router.get("/load-metrics")
+async def model_load_metrics(current_user: dict = Depends(get_current_user)):
+    return load_stats()
+
+@router.get("/hedging")
+async def hedging_stats(current_user: dict = Depends(get_current_user)):
+    return hedge_stats()
+
 @router.get("/status")
 async def ollama_status(current_user: dict = Depends(get_current_user)):
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(f"{OLLAMA_BASE_URL}/")
-            return {"online": response.status_code == 200}
+        status = await model_catalog.get_status()
+        return {"online": status["online"]}
     except Exception:
         return {"online": False}
+
+@router.get("/queue")
+async def llm_queue(current_user: dict = Depends(get_current_user)):
+    return scheduler.stats()
+
+@router.get("/nodes")
+async def ollama_nodes(current_user: dict = Depends(get_current_user)):
+    return {"nodes": pool.stats(), "healthy": pool.healthy_count()}
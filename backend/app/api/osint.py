@@ -9,6 +9,7 @@ from app.services.osint_service import (
     subdomain_enumeration, http_recon, email_harvester, tech_stack_detection,
 )
 from app.services.report_generator import generate_osint_report
+from app.services.llm_scheduler import llm_context
 
 router = APIRouter(prefix="/api/osint", tags=["osint"])
 
@@ -27,7 +28,8 @@ async def run_deep_osint(
 ):
     if not req.confirmed:
         return {"warning": "Deep OSINT scan will enumerate the target thoroughly. Please confirm.", "requires_confirmation": True}
-    results = await deep_osint(req.target, req.model)
+    with llm_context(priority="interactive", user_id=current_user["id"], caller="osint_deep"):
+        results = await deep_osint(req.target, req.model)
     await db.execute(
         "INSERT INTO osint_results (user_id, target, osint_type, results, status) VALUES (?, ?, 'deep', ?, 'completed')",
         (current_user["id"], req.target, json.dumps(results, default=str)),
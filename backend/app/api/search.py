@@ -0,0 +1,17 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, Query
+from app.core.deps import get_current_user
+from app.services.search_service import search_text
+
+router = APIRouter(prefix="/api/search", tags=["search"])
+
+@router.get("/")
+async def search(
+    q: str = Query(..., min_length=1),
+    scope: Literal["all", "chat", "memory"] = "all",
+    session_id: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: dict = Depends(get_current_user),
+):
+    return await search_text(current_user["id"], q, scope, limit, offset, session_id)
@@ -1,10 +1,16 @@
 import json
 from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 import aiosqlite
 from app.core.database import get_db
 from app.core.deps import get_current_user
-from app.services.soc_service import analyze_soc_event, get_soc_dashboard_stats, generate_auto_patch
+from app.core.config import SOC_BATCH_MAX_CONCURRENCY
+from app.services.soc_service import (
+    analyze_soc_event, analyze_soc_events_batch, get_soc_dashboard_stats, generate_auto_patch,
+    save_event_analysis,
+)
+from app.services.llm_scheduler import llm_context
 
 router = APIRouter(prefix="/api/soc", tags=["soc"])
 
@@ -23,6 +29,16 @@ class AnalyzeEventRequest(BaseModel):
     model: str = "llama3"
 
 
+class BatchAnalyzeRequest(BaseModel):
+    event_ids: list[int] | None = None
+    severity: str | None = None
+    resolved: bool | None = None
+    limit: int = 100
+    model: str = "llama3"
+    concurrency: int = 4
+    force: bool = False
+
+
 class AutoPatchRequest(BaseModel):
     finding: dict
     model: str = "llama3"
@@ -102,7 +118,51 @@ async def analyze_event(
         event_data = req.event_data
     else:
         return {"error": "Provide event_id or event_data"}
-    return await analyze_soc_event(event_data, req.model)
+    with llm_context(priority="soc", user_id=current_user["id"], caller="soc_analyze"):
+        result = await analyze_soc_event(event_data, req.model)
+    if req.event_id and not result["analysis"].startswith("Error"):
+        await save_event_analysis(req.event_id, result, req.model)
+    return result
+
+
+@router.post("/analyze/batch")
+async def analyze_events_batch(
+    req: BatchAnalyzeRequest,
+    current_user: dict = Depends(get_current_user),
+    db: aiosqlite.Connection = Depends(get_db),
+):
+    query = "SELECT * FROM soc_events WHERE 1=1"
+    params: list = []
+    if req.event_ids:
+        query += f" AND id IN ({','.join('?' * len(req.event_ids))})"
+        params.extend(req.event_ids)
+    if req.severity:
+        query += " AND severity = ?"
+        params.append(req.severity)
+    if req.resolved is not None:
+        query += " AND is_resolved = ?"
+        params.append(1 if req.resolved else 0)
+    query += " ORDER BY created_at DESC LIMIT ?"
+    params.append(req.limit)
+    cursor = await db.execute(query, params)
+    events = [dict(row) for row in await cursor.fetchall()]
+
+    done = [e for e in events if e.get("analysis") and e.get("analysis_model") == req.model and not req.force]
+    todo = [e for e in events if e not in done]
+    concurrency = min(max(req.concurrency, 1), SOC_BATCH_MAX_CONCURRENCY)
+
+    async def results():
+        yield json.dumps({"total": len(events), "cached": len(done), "queued": len(todo)}) + "\n"
+        for event in done:
+            yield json.dumps({
+                "event_id": event["id"], "cached": True, "analysis": event["analysis"],
+                "analyzed_at": event["analyzed_at"],
+            }, default=str) + "\n"
+        async for result in analyze_soc_events_batch(todo, req.model, concurrency, current_user["id"]):
+            yield json.dumps(result, default=str) + "\n"
+        yield json.dumps({"done": True}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 
 @router.post("/auto-patch")
@@ -111,7 +171,8 @@ async def auto_patch(
     current_user: dict = Depends(get_current_user),
     db: aiosqlite.Connection = Depends(get_db),
 ):
-    patch = await generate_auto_patch(req.finding, req.model)
+    with llm_context(priority="soc", user_id=current_user["id"], caller="soc_auto_patch"):
+        patch = await generate_auto_patch(req.finding, req.model)
     await db.execute(
         "INSERT INTO patch_suggestions (title, description, severity, status) VALUES (?, ?, ?, 'pending')",
         (patch["title"], patch["description"], patch["severity"]),
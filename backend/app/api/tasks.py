@@ -51,6 +51,7 @@ async def get_task_logs(task_id: int, current_user: dict = Depends(get_current_u
 @router.delete("/{task_id}")
 async def delete_task(task_id: int, current_user: dict = Depends(get_current_user), db: aiosqlite.Connection = Depends(get_db)):
     await db.execute("DELETE FROM agent_logs WHERE task_id = ?", (task_id,))
+    await db.execute("DELETE FROM task_checkpoints WHERE task_id = ?", (task_id,))
     await db.execute("DELETE FROM tasks WHERE id = ? AND user_id = ?", (task_id, current_user["id"]))
     await db.commit()
     return {"message": "Task deleted"}
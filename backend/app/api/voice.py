@@ -1,7 +1,10 @@
+import json
 from fastapi import APIRouter, Depends
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from app.core.deps import get_current_user
-from app.services.voice_service import process_voice_text, detect_language, translate_text
+from app.services.voice_service import process_voice_text, stream_voice_text, detect_language, translate_text, translate_batch
+from app.services.llm_scheduler import llm_context
 
 router = APIRouter(prefix="/api/voice", tags=["voice"])
 
@@ -11,6 +14,7 @@ class VoiceRequest(BaseModel):
     model: str = "llama3"
     context: str = "cybersecurity"
     language: str | None = None
+    stream: bool = False
 
 
 class TranslateRequest(BaseModel):
@@ -19,12 +23,29 @@ class TranslateRequest(BaseModel):
     model: str = "llama3"
 
 
+class BatchTranslateRequest(BaseModel):
+    segments: list[str] = Field(..., max_length=1000)
+    target_language: str = "en"
+    model: str = "llama3"
+
+
 @router.post("/process")
 async def voice_process(req: VoiceRequest, current_user: dict = Depends(get_current_user)):
-    result = await process_voice_text(
-        text=req.text, model=req.model,
-        context=req.context, force_language=req.language,
-    )
+    if req.stream:
+        async def event_stream():
+            async for event in stream_voice_text(
+                text=req.text, model=req.model, context=req.context,
+                force_language=req.language, user_id=current_user["id"],
+            ):
+                yield json.dumps(event) + "\n"
+
+        return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+    with llm_context(priority="interactive", user_id=current_user["id"], caller="voice"):
+        result = await process_voice_text(
+            text=req.text, model=req.model,
+            context=req.context, force_language=req.language,
+        )
     return result
 
 
@@ -36,5 +57,12 @@ async def voice_detect_language(req: VoiceRequest, current_user: dict = Depends(
 
 @router.post("/translate")
 async def voice_translate(req: TranslateRequest, current_user: dict = Depends(get_current_user)):
-    translated = await translate_text(req.text, req.target_language, req.model)
+    with llm_context(priority="interactive", user_id=current_user["id"], caller="translate"):
+        translated = await translate_text(req.text, req.target_language, req.model)
     return {"original": req.text, "translated": translated, "target_language": req.target_language}
+
+
+@router.post("/translate/batch")
+async def voice_translate_batch(req: BatchTranslateRequest, current_user: dict = Depends(get_current_user)):
+    with llm_context(priority="interactive", user_id=current_user["id"], caller="translate_batch"):
+        return await translate_batch(req.segments, req.target_language, req.model)
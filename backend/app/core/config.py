@@ -7,13 +7,79 @@ SECRET_KEY = os.getenv("SECRET_KEY", "rudrax-super-secret-key-change-in-producti
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", os.getenv("OLLAMA_URL", "http://localhost:11434"))
+OLLAMA_NODES = [u.strip().rstrip("/") for u in os.getenv("OLLAMA_NODES", OLLAMA_BASE_URL).split(",") if u.strip()]
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "15"))
+OLLAMA_NODE_MAX_FAILURES = int(os.getenv("OLLAMA_NODE_MAX_FAILURES", "2"))
+MODEL_CATALOG_REFRESH = float(os.getenv("MODEL_CATALOG_REFRESH", "30"))
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "5m")
+OLLAMA_MODEL_KEEP_ALIVE = os.getenv("OLLAMA_MODEL_KEEP_ALIVE", "")
+OLLAMA_HOT_MODELS = [m.strip() for m in os.getenv("OLLAMA_HOT_MODELS", "").split(",") if m.strip()]
+OLLAMA_WARMUP_INTERVAL = float(os.getenv("OLLAMA_WARMUP_INTERVAL", "240"))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "100"))
+OLLAMA_MAX_KEEPALIVE = int(os.getenv("OLLAMA_MAX_KEEPALIVE", "20"))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_GENERATE_TIMEOUT = float(os.getenv("OLLAMA_GENERATE_TIMEOUT", "120"))
+OLLAMA_AGENT_TIMEOUT = float(os.getenv("OLLAMA_AGENT_TIMEOUT", "180"))
+OLLAMA_META_TIMEOUT = float(os.getenv("OLLAMA_META_TIMEOUT", "10"))
+OLLAMA_DRAIN_TIMEOUT = float(os.getenv("OLLAMA_DRAIN_TIMEOUT", "30"))
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./rudrax.db")
 WORKSPACE_DIR = os.getenv("WORKSPACE_DIR", "/tmp/rudrax_workspace")
 _default_db = "/data/rudrax.db" if os.path.isdir("/data") else "./rudrax.db"
 DB_PATH = os.getenv("DB_PATH", _default_db)
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+LLM_DEFAULT_CONCURRENCY = int(os.getenv("LLM_DEFAULT_CONCURRENCY", "2"))
+LLM_MODEL_CONCURRENCY = os.getenv("LLM_MODEL_CONCURRENCY", "")
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "256"))
+
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "2.0"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.25"))
+HEDGE_FALLBACK_MODELS = os.getenv("HEDGE_FALLBACK_MODELS", "")
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(60 * 60 * 24 * 7)))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+ORCHESTRATOR_MAX_PARALLEL_STEPS = int(os.getenv("ORCHESTRATOR_MAX_PARALLEL_STEPS", "3"))
+ORCHESTRATOR_STEP_RETRIES = int(os.getenv("ORCHESTRATOR_STEP_RETRIES", "1"))
+ORCHESTRATOR_RESUME_ON_STARTUP = os.getenv("ORCHESTRATOR_RESUME_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+TESTER_WORKERS = int(os.getenv("TESTER_WORKERS", str(min(4, os.cpu_count() or 1))))
+TESTER_CONCURRENCY = int(os.getenv("TESTER_CONCURRENCY", "16"))
+TESTER_CACHE_ENTRIES = int(os.getenv("TESTER_CACHE_ENTRIES", "10000"))
+
+LOG_SINK_FLUSH_MS = int(os.getenv("LOG_SINK_FLUSH_MS", "100"))
+LOG_SINK_BATCH_ROWS = int(os.getenv("LOG_SINK_BATCH_ROWS", "500"))
+LOG_SINK_MAX_QUEUE = int(os.getenv("LOG_SINK_MAX_QUEUE", "10000"))
+AGENT_WS_FLUSH_MS = int(os.getenv("AGENT_WS_FLUSH_MS", "50"))
+
+AGENT_EMBEDDED_WORKER = os.getenv("AGENT_EMBEDDED_WORKER", "true").lower() in ("1", "true", "yes")
+AGENT_WORKER_CONCURRENCY = int(os.getenv("AGENT_WORKER_CONCURRENCY", "2"))
+AGENT_EVENTS_POLL_MS = int(os.getenv("AGENT_EVENTS_POLL_MS", "200"))
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "10"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_CANCEL_POLL = float(os.getenv("JOB_CANCEL_POLL", "1"))
+AGENT_TASK_TIME_BUDGET = float(os.getenv("AGENT_TASK_TIME_BUDGET", str(30 * 60)))
+AGENT_TASK_TOKEN_BUDGET = int(os.getenv("AGENT_TASK_TOKEN_BUDGET", "200000"))
+JOB_EVENTS_RETENTION = int(os.getenv("JOB_EVENTS_RETENTION", str(60 * 60)))
+
+SOC_BATCH_MAX_CONCURRENCY = int(os.getenv("SOC_BATCH_MAX_CONCURRENCY", "8"))
+
+CHAT_CONTEXT_TOKENS = int(os.getenv("CHAT_CONTEXT_TOKENS", "3000"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "500"))
+
+REDIS_URL = os.getenv("REDIS_URL", "")
 CHROMADB_DIR = os.getenv("CHROMADB_DIR", "/tmp/rudrax_chromadb")
+MEMORY_INDEX_DIR = os.getenv("MEMORY_INDEX_DIR", CHROMADB_DIR)
+MEMORY_EMBED_MODEL = os.getenv("MEMORY_EMBED_MODEL", "nomic-embed-text")
+MEMORY_ANN_MIN_ROWS = int(os.getenv("MEMORY_ANN_MIN_ROWS", "50000"))
+MEMORY_ANN_PROBES = int(os.getenv("MEMORY_ANN_PROBES", "8"))
 REPORTS_DIR = os.getenv("REPORTS_DIR", "/tmp/rudrax_reports")
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/tmp/rudrax_uploads")
 
@@ -22,5 +88,6 @@ USE_POSTGRES = bool(POSTGRES_URL)
 
 os.makedirs(WORKSPACE_DIR, exist_ok=True)
 os.makedirs(CHROMADB_DIR, exist_ok=True)
+os.makedirs(MEMORY_INDEX_DIR, exist_ok=True)
 os.makedirs(REPORTS_DIR, exist_ok=True)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
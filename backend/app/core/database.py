@@ -12,9 +12,53 @@ async def get_db():
         await db.close()
 
 
+async def _ensure_columns(db: aiosqlite.Connection, table: str, columns: dict[str, str]):
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in await cursor.fetchall()}
+    for name, definition in columns.items():
+        if name not in existing:
+            await db.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+async def _ensure_fts(
+    db: aiosqlite.Connection, table: str, columns: list[str], suffix: str = "fts", tokenize: str = "porter unicode61",
+):
+    fts = f"{table}_{suffix}"
+    cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+    exists = await cursor.fetchone() is not None
+    await db.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({', '.join(columns)}, "
+        f"content='{table}', content_rowid='id', tokenize='{tokenize}')"
+    )
+    names = [c.split()[0] for c in columns]
+    fields = ", ".join(names)
+    new_values = ", ".join(f"new.{name}" for name in names)
+    old_values = ", ".join(f"old.{name}" for name in names)
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {fields}) VALUES (new.id, {new_values});
+        END
+    """)
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {fields}) VALUES ('delete', old.id, {old_values});
+        END
+    """)
+    await db.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {fields} ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {fields}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {fts}(rowid, {fields}) VALUES (new.id, {new_values});
+        END
+    """)
+    if not exists:
+        await db.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
 async def init_db():
     os.makedirs(os.path.dirname(DB_PATH) if os.path.dirname(DB_PATH) else ".", exist_ok=True)
     async with aiosqlite.connect(DB_PATH) as db:
+        # API and worker processes share this file
+        await db.execute("PRAGMA journal_mode=WAL")
         await db.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -44,6 +88,7 @@ async def init_db():
                 FOREIGN KEY (user_id) REFERENCES users(id)
             )
         """)
+        await _ensure_columns(db, "tasks", {"llm_usage": "TEXT", "timing": "TEXT", "mode": "TEXT"})
         await db.execute("""
             CREATE TABLE IF NOT EXISTS chat_messages (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -74,6 +119,17 @@ async def init_db():
                 FOREIGN KEY (task_id) REFERENCES tasks(id)
             )
         """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS task_checkpoints (
+                task_id INTEGER NOT NULL,
+                stage TEXT NOT NULL,
+                input_hash TEXT NOT NULL,
+                output TEXT NOT NULL,
+                updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+                PRIMARY KEY (task_id, stage),
+                FOREIGN KEY (task_id) REFERENCES tasks(id)
+            )
+        """)
         await db.execute("""
             CREATE TABLE IF NOT EXISTS scan_results (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -127,6 +183,11 @@ async def init_db():
                 created_at TEXT NOT NULL DEFAULT (datetime('now'))
             )
         """)
+        await _ensure_columns(db, "soc_events", {
+            "analysis": "TEXT",
+            "analysis_model": "TEXT",
+            "analyzed_at": "TEXT",
+        })
         await db.execute("""
             CREATE TABLE IF NOT EXISTS patch_suggestions (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -186,4 +247,81 @@ async def init_db():
                 FOREIGN KEY (user_id) REFERENCES users(id)
             )
         """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS chat_summaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                session_id TEXT NOT NULL,
+                summary TEXT NOT NULL DEFAULT '',
+                last_message_id INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT NOT NULL DEFAULT (datetime('now')),
+                UNIQUE (user_id, session_id),
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages(user_id, session_id, id)")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_access ON llm_cache(last_access)")
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS translation_memory (
+                source_hash TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                model TEXT NOT NULL,
+                source_text TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL DEFAULT (datetime('now')),
+                PRIMARY KEY (source_hash, target_lang, model)
+            )
+        """)
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                lease_until REAL,
+                worker_id TEXT,
+                last_error TEXT,
+                created_at TEXT DEFAULT (datetime('now')),
+                updated_at TEXT DEFAULT (datetime('now'))
+            )
+        """)
+        await _ensure_columns(db, "jobs", {"cancel_requested": "INTEGER NOT NULL DEFAULT 0"})
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, available_at)")
+        await db.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_key ON jobs(key) WHERE status IN ('queued', 'running')"
+        )
+        await db.execute("""
+            CREATE TABLE IF NOT EXISTS job_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_job_events_created ON job_events(created_at)")
+        await _ensure_fts(db, "chat_messages", ["content", "user_id", "session_id", "role UNINDEXED"])
+        await _ensure_fts(db, "memory_store", ["content", "user_id", "context_key UNINDEXED"])
+        # Stemmed indexes can't prefix-match partial words ("runn" is not a
+        # prefix of the stem "run"), so the unstemmed words are indexed too and
+        # the search expands a trailing partial word into the words it starts
+        for table in ("chat_messages", "memory_store"):
+            await _ensure_fts(db, table, ["content"], suffix="terms", tokenize="unicode61")
+            await db.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_terms_vocab USING fts5vocab({table}_terms, 'row')"
+            )
         await db.commit()
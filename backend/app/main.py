@@ -1,11 +1,17 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.database import init_db
 from app.core.security import hash_password
-from app.core.config import DB_PATH
+from app.core.config import DB_PATH, AGENT_EMBEDDED_WORKER
+from app.services import job_queue, log_sink, model_catalog, model_warmup, ollama_client, syntax_check
+from app.services.llm_metrics import render_prometheus
+from app.services.llm_scheduler import scheduler
+from app.services.ollama_nodes import pool
 from app.api import auth, admin, chat, models, tasks, files, pentest, agent
-from app.api import voice, browser, osint, network, reports, soc, projects, deploy
+from app.api import voice, browser, osint, network, reports, soc, projects, deploy, search
+from app import worker
 import aiosqlite
 
 
@@ -13,7 +19,22 @@ import aiosqlite
 async def lifespan(app: FastAPI):
     await init_db()
     await seed_admin()
+    log_sink.start_sink()
+    await ollama_client.start_client()
+    model_catalog.start_catalog()
+    await model_warmup.start_warmup()
+    await agent.resume_interrupted_tasks()
+    agent.start_event_relay()
+    if AGENT_EMBEDDED_WORKER:
+        worker.start_embedded()
     yield
+    await worker.stop_embedded()
+    agent.stop_event_relay()
+    model_warmup.stop_warmup()
+    model_catalog.stop_catalog()
+    await ollama_client.close_client()
+    syntax_check.shutdown_pool()
+    await log_sink.stop_sink()
 
 
 async def seed_admin():
@@ -60,8 +81,25 @@ app.include_router(reports.router)
 app.include_router(soc.router)
 app.include_router(projects.router)
 app.include_router(deploy.router)
+app.include_router(search.router)
 
 
 @app.get("/healthz")
 async def healthz():
     return {"status": "ok", "version": "2.0.0", "platform": "RudraX CyberSec"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    queue = scheduler.stats()
+    jobs = await job_queue.get_queue().stats()
+    gauges = {
+        "llm_queue_depth": [({}, queue["queue_depth"])],
+        "llm_active_requests": [({"model": m}, q["active"]) for m, q in queue["models"].items()],
+        "llm_queued_requests": [({"model": m}, q["queued"]) for m, q in queue["models"].items()],
+        "ollama_node_up": [({"node": n["url"]}, 1 if n["healthy"] else 0) for n in pool.stats()],
+        "ollama_node_outstanding": [({"node": n["url"]}, n["outstanding"]) for n in pool.stats()],
+        "log_sink_queued": [({}, log_sink.sink_stats()["queued"])],
+        "agent_jobs": [({"status": status}, count) for status, count in jobs.items()],
+    }
+    return render_prometheus(gauges)
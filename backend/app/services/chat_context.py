@@ -0,0 +1,114 @@
+import asyncio
+import aiosqlite
+from app.core.config import DB_PATH, CHAT_CONTEXT_TOKENS, CHAT_SUMMARY_TOKENS
+from app.services.ollama_service import chat_ollama
+from app.services.llm_scheduler import llm_context
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of a conversation between a user and RudraX AI.
+Merge the new turns into the existing summary. Keep facts, decisions, targets, code names and open questions.
+Drop greetings and repetition. Output only the updated summary in plain text."""
+
+_refreshing: set[tuple[int, str]] = set()
+_background: set[asyncio.Task] = set()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 4
+
+
+async def _load_summary(db: aiosqlite.Connection, user_id: int, session_id: str) -> tuple[str, int]:
+    cursor = await db.execute(
+        "SELECT summary, last_message_id FROM chat_summaries WHERE user_id = ? AND session_id = ?",
+        (user_id, session_id),
+    )
+    row = await cursor.fetchone()
+    return (row[0], row[1]) if row else ("", 0)
+
+
+async def build_context(
+    db: aiosqlite.Connection,
+    user_id: int,
+    session_id: str | None,
+    model: str,
+    budget: int = CHAT_CONTEXT_TOKENS,
+) -> list[dict]:
+    summary, last_summarized = ("", 0)
+    if session_id:
+        summary, last_summarized = await _load_summary(db, user_id, session_id)
+    remaining = budget - (estimate_tokens(summary) if summary else 0)
+
+    window: list[dict] = []
+    overflow = False
+    cursor = await db.execute(
+        "SELECT id, role, content FROM chat_messages WHERE user_id = ? AND session_id = ? AND id > ? ORDER BY id DESC",
+        (user_id, session_id, last_summarized),
+    )
+    while not overflow:
+        rows = await cursor.fetchmany(50)
+        if not rows:
+            break
+        for row in rows:
+            cost = estimate_tokens(row[2])
+            if window and cost > remaining:
+                overflow = True
+                break
+            window.append({"id": row[0], "role": row[1], "content": row[2]})
+            remaining -= cost
+    await cursor.close()
+
+    if overflow and session_id:
+        _schedule_refresh(user_id, session_id, model, window[-1]["id"])
+
+    messages = []
+    if summary:
+        messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+    messages.extend({"role": m["role"], "content": m["content"]} for m in reversed(window))
+    return messages
+
+
+def _schedule_refresh(user_id: int, session_id: str, model: str, window_start_id: int):
+    key = (user_id, session_id)
+    if key in _refreshing:
+        return
+    _refreshing.add(key)
+    task = asyncio.create_task(refresh_summary(user_id, session_id, model, window_start_id))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+    task.add_done_callback(lambda _: _refreshing.discard(key))
+
+
+async def refresh_summary(user_id: int, session_id: str, model: str, before_id: int):
+    async with aiosqlite.connect(DB_PATH) as db:
+        summary, last_summarized = await _load_summary(db, user_id, session_id)
+        cursor = await db.execute(
+            "SELECT id, role, content FROM chat_messages WHERE user_id = ? AND session_id = ? AND id > ? AND id < ? ORDER BY id ASC",
+            (user_id, session_id, last_summarized, before_id),
+        )
+        turns, used, last_id = [], 0, last_summarized
+        for row in await cursor.fetchall():
+            cost = estimate_tokens(row[2])
+            if turns and used + cost > CHAT_CONTEXT_TOKENS:
+                break
+            turns.append(f"{row[1]}: {row[2]}")
+            used += cost
+            last_id = row[0]
+        if not turns:
+            return
+
+        prompt = f"Existing summary:\n{summary or '(none)'}\n\nNew turns:\n" + "\n".join(turns)
+        prompt += f"\n\nWrite the updated summary in at most {CHAT_SUMMARY_TOKENS * 3 // 4} words."
+        with llm_context(priority="background", user_id=user_id, caller="chat_summary"):
+            updated = await chat_ollama(
+                [{"role": "system", "content": SUMMARY_SYSTEM_PROMPT}, {"role": "user", "content": prompt}],
+                model=model, use_cache=False,
+            )
+        if not updated or updated.startswith("Error"):
+            return
+
+        await db.execute(
+            """INSERT INTO chat_summaries (user_id, session_id, summary, last_message_id) VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, session_id) DO UPDATE SET
+                summary = excluded.summary, last_message_id = excluded.last_message_id, updated_at = datetime('now')""",
+            (user_id, session_id, updated.strip(), last_id),
+        )
+        await db.commit()
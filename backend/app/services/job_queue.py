@@ -0,0 +1,351 @@
+import json
+import time
+import aiosqlite
+from app.core.config import DB_PATH, REDIS_URL, JOB_MAX_ATTEMPTS, JOB_EVENTS_RETENTION
+from app.services import log_sink
+
+REDIS_PREFIX = "rudrax:jobs:"
+REDIS_EVENTS = "rudrax:events"
+REDIS_EVENTS_MAXLEN = 10000
+EVENT_BATCH = 1000
+
+
+def _job(row) -> dict:
+    job_id, kind, key, payload, attempts, max_attempts, cancel_requested = row
+    return {
+        "id": int(job_id),
+        "kind": kind,
+        "key": key or None,
+        "payload": json.loads(payload),
+        "attempts": int(attempts),
+        "max_attempts": int(max_attempts),
+        "cancel_requested": bool(int(cancel_requested or 0)),
+    }
+
+
+class SQLiteQueue:
+    """Jobs live in the `jobs` table. A claimed job carries a lease; if the
+    worker holding it dies the lease expires and the next claim picks it up
+    again, counting another attempt."""
+
+    name = "sqlite"
+
+    async def active_job(self, key: str) -> int | None:
+        async with aiosqlite.connect(DB_PATH) as db:
+            cursor = await db.execute("SELECT id FROM jobs WHERE key = ? AND status IN ('queued', 'running')", (key,))
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    async def enqueue(self, kind: str, payload: dict, key: str | None, max_attempts: int) -> tuple[int, bool]:
+        async with aiosqlite.connect(DB_PATH) as db:
+            try:
+                cursor = await db.execute(
+                    "INSERT INTO jobs (kind, key, payload, max_attempts, available_at) VALUES (?, ?, ?, ?, ?)",
+                    (kind, key, json.dumps(payload), max_attempts, time.time())
+                )
+                await db.commit()
+                return cursor.lastrowid, True
+            except aiosqlite.IntegrityError:
+                pass
+        return await self.active_job(key), False
+
+    async def claim(self, worker_id: str, visibility: float) -> dict | None:
+        now = time.time()
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute("BEGIN IMMEDIATE")
+            cursor = await db.execute("""
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?,
+                    worker_id = ?, updated_at = datetime('now')
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE (status = 'queued' AND available_at <= ?) OR (status = 'running' AND lease_until < ?)
+                    ORDER BY available_at, id LIMIT 1
+                )
+                RETURNING id, kind, key, payload, attempts, max_attempts, cancel_requested
+            """, (now + visibility, worker_id, now, now))
+            row = await cursor.fetchone()
+            await db.commit()
+        return _job(row) if row else None
+
+    async def extend(self, job_id: int, worker_id: str, visibility: float) -> bool:
+        async with aiosqlite.connect(DB_PATH) as db:
+            cursor = await db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (time.time() + visibility, job_id, worker_id)
+            )
+            await db.commit()
+            return cursor.rowcount == 1
+
+    async def complete(self, job_id: int, worker_id: str):
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute(
+                "UPDATE jobs SET status = 'done', lease_until = NULL, updated_at = datetime('now') "
+                "WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (job_id, worker_id)
+            )
+            await db.commit()
+
+    async def fail(self, job_id: int, worker_id: str, error: str, retry_at: float | None):
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute(
+                "UPDATE jobs SET status = ?, available_at = COALESCE(?, available_at), lease_until = NULL, "
+                "last_error = ?, updated_at = datetime('now') WHERE id = ? AND worker_id = ? AND status = 'running'",
+                ("queued" if retry_at is not None else "dead", retry_at, error[:2000], job_id, worker_id)
+            )
+            await db.commit()
+
+    async def mark_cancelled(self, job_id: int, worker_id: str):
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute(
+                "UPDATE jobs SET status = 'cancelled', lease_until = NULL, updated_at = datetime('now') "
+                "WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (job_id, worker_id)
+            )
+            await db.commit()
+
+    async def cancel(self, key: str) -> str | None:
+        async with aiosqlite.connect(DB_PATH) as db:
+            cursor = await db.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = datetime('now') WHERE key = ? AND status = 'queued'",
+                (key,)
+            )
+            if cursor.rowcount:
+                await db.commit()
+                return "cancelled"
+            cursor = await db.execute(
+                "UPDATE jobs SET cancel_requested = 1 WHERE key = ? AND status = 'running'", (key,)
+            )
+            await db.commit()
+            return "cancelling" if cursor.rowcount else None
+
+    async def cancel_requested(self, job_ids: list[int]) -> set[int]:
+        async with aiosqlite.connect(DB_PATH) as db:
+            cursor = await db.execute(
+                f"SELECT id FROM jobs WHERE cancel_requested = 1 AND id IN ({', '.join('?' * len(job_ids))})",
+                job_ids
+            )
+            return {row[0] for row in await cursor.fetchall()}
+
+    async def stats(self) -> dict:
+        async with aiosqlite.connect(DB_PATH) as db:
+            cursor = await db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+            return {status: count for status, count in await cursor.fetchall()}
+
+    async def publish(self, user_id: int, event: dict):
+        await log_sink.write(
+            "INSERT INTO job_events (user_id, payload, created_at) VALUES (?, ?, ?)",
+            (user_id, json.dumps(event), time.time())
+        )
+
+    async def event_cursor(self):
+        async with aiosqlite.connect(DB_PATH) as db:
+            cursor = await db.execute("SELECT COALESCE(MAX(id), 0) FROM job_events")
+            return (await cursor.fetchone())[0]
+
+    async def read_events(self, cursor, wait: float) -> tuple[object, list[tuple[int, dict]]]:
+        async with aiosqlite.connect(DB_PATH) as db:
+            rows = await (await db.execute(
+                "SELECT id, user_id, payload FROM job_events WHERE id > ? ORDER BY id LIMIT ?",
+                (cursor, EVENT_BATCH)
+            )).fetchall()
+        if not rows:
+            return cursor, []
+        return rows[-1][0], [(user_id, json.loads(payload)) for _, user_id, payload in rows]
+
+    async def prune_events(self):
+        async with aiosqlite.connect(DB_PATH) as db:
+            await db.execute("DELETE FROM job_events WHERE created_at < ?", (time.time() - JOB_EVENTS_RETENTION,))
+            await db.commit()
+
+
+_ENQUEUE = """
+local prefix = ARGV[1]
+if ARGV[3] ~= '' then
+    local existing = redis.call('GET', prefix .. 'key:' .. ARGV[3])
+    if existing then return {tonumber(existing), 0} end
+end
+local id = redis.call('INCR', prefix .. 'seq')
+redis.call('HSET', prefix .. 'job:' .. id, 'kind', ARGV[2], 'key', ARGV[3], 'payload', ARGV[4],
+    'attempts', 0, 'max_attempts', ARGV[5], 'status', 'queued')
+redis.call('ZADD', prefix .. 'ready', ARGV[6], id)
+if ARGV[3] ~= '' then redis.call('SET', prefix .. 'key:' .. ARGV[3], id) end
+return {id, 1}
+"""
+
+_CLAIM = """
+local prefix, now = ARGV[1], ARGV[2]
+local id = redis.call('ZRANGEBYSCORE', prefix .. 'leased', '-inf', '(' .. now, 'LIMIT', 0, 1)[1]
+if not id then
+    id = redis.call('ZRANGEBYSCORE', prefix .. 'ready', '-inf', now, 'LIMIT', 0, 1)[1]
+    if not id then return nil end
+    redis.call('ZREM', prefix .. 'ready', id)
+end
+local job = prefix .. 'job:' .. id
+redis.call('ZADD', prefix .. 'leased', ARGV[3], id)
+redis.call('HSET', job, 'status', 'running', 'worker_id', ARGV[4])
+local attempts = redis.call('HINCRBY', job, 'attempts', 1)
+local fields = redis.call('HMGET', job, 'kind', 'key', 'payload', 'max_attempts', 'cancel_requested')
+return {id, fields[1], fields[2], fields[3], attempts, fields[4], fields[5] or '0'}
+"""
+
+_EXTEND = """
+local prefix, id = ARGV[1], ARGV[2]
+local job = prefix .. 'job:' .. id
+if redis.call('HGET', job, 'worker_id') ~= ARGV[3] or redis.call('HGET', job, 'status') ~= 'running' then
+    return 0
+end
+redis.call('ZADD', prefix .. 'leased', 'XX', ARGV[4], id)
+return 1
+"""
+
+_FINISH = """
+local prefix, id = ARGV[1], ARGV[2]
+local job = prefix .. 'job:' .. id
+if redis.call('HGET', job, 'worker_id') ~= ARGV[3] or redis.call('HGET', job, 'status') ~= 'running' then
+    return 0
+end
+redis.call('ZREM', prefix .. 'leased', id)
+if ARGV[4] == 'queued' then
+    redis.call('HSET', job, 'status', 'queued', 'last_error', ARGV[5])
+    redis.call('ZADD', prefix .. 'ready', ARGV[6], id)
+    return 1
+end
+redis.call('HSET', job, 'status', ARGV[4], 'last_error', ARGV[5])
+redis.call('EXPIRE', job, tonumber(ARGV[7]))
+local key = redis.call('HGET', job, 'key')
+if key and key ~= '' and redis.call('GET', prefix .. 'key:' .. key) == id then
+    redis.call('DEL', prefix .. 'key:' .. key)
+end
+return 1
+"""
+
+_CANCEL = """
+local prefix = ARGV[1]
+local id = redis.call('GET', prefix .. 'key:' .. ARGV[2])
+if not id then return nil end
+local job = prefix .. 'job:' .. id
+local status = redis.call('HGET', job, 'status')
+if status == 'queued' then
+    redis.call('ZREM', prefix .. 'ready', id)
+    redis.call('HSET', job, 'status', 'cancelled')
+    redis.call('EXPIRE', job, tonumber(ARGV[3]))
+    redis.call('DEL', prefix .. 'key:' .. ARGV[2])
+    return 'cancelled'
+end
+if status == 'running' then
+    redis.call('HSET', job, 'cancel_requested', 1)
+    return 'cancelling'
+end
+return nil
+"""
+
+
+class RedisQueue:
+    """Same semantics as SQLiteQueue on Redis: a `ready` sorted set scored by
+    availability time, a `leased` sorted set scored by lease expiry, and one
+    hash per job. Every state change is a Lua script so it is atomic across
+    workers."""
+
+    name = "redis"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url, decode_responses=True)
+        self.scripts = {
+            name: self.client.register_script(source)
+            for name, source in (("enqueue", _ENQUEUE), ("claim", _CLAIM), ("extend", _EXTEND), ("finish", _FINISH), ("cancel", _CANCEL))
+        }
+
+    async def active_job(self, key: str) -> int | None:
+        job_id = await self.client.get(REDIS_PREFIX + "key:" + key)
+        return int(job_id) if job_id else None
+
+    async def enqueue(self, kind: str, payload: dict, key: str | None, max_attempts: int) -> tuple[int, bool]:
+        job_id, created = await self.scripts["enqueue"](
+            args=[REDIS_PREFIX, kind, key or "", json.dumps(payload), max_attempts, time.time()]
+        )
+        return int(job_id), bool(created)
+
+    async def claim(self, worker_id: str, visibility: float) -> dict | None:
+        now = time.time()
+        row = await self.scripts["claim"](args=[REDIS_PREFIX, now, now + visibility, worker_id])
+        return _job(row) if row else None
+
+    async def extend(self, job_id: int, worker_id: str, visibility: float) -> bool:
+        return bool(await self.scripts["extend"](args=[REDIS_PREFIX, job_id, worker_id, time.time() + visibility]))
+
+    async def complete(self, job_id: int, worker_id: str):
+        await self.scripts["finish"](args=[REDIS_PREFIX, job_id, worker_id, "done", "", 0, JOB_EVENTS_RETENTION])
+
+    async def fail(self, job_id: int, worker_id: str, error: str, retry_at: float | None):
+        await self.scripts["finish"](args=[
+            REDIS_PREFIX, job_id, worker_id, "queued" if retry_at is not None else "dead",
+            error[:2000], retry_at or 0, JOB_EVENTS_RETENTION,
+        ])
+
+    async def mark_cancelled(self, job_id: int, worker_id: str):
+        await self.scripts["finish"](args=[REDIS_PREFIX, job_id, worker_id, "cancelled", "", 0, JOB_EVENTS_RETENTION])
+
+    async def cancel(self, key: str) -> str | None:
+        return await self.scripts["cancel"](args=[REDIS_PREFIX, key, JOB_EVENTS_RETENTION])
+
+    async def cancel_requested(self, job_ids: list[int]) -> set[int]:
+        async with self.client.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.hget(f"{REDIS_PREFIX}job:{job_id}", "cancel_requested")
+            flags = await pipe.execute()
+        return {job_id for job_id, flag in zip(job_ids, flags) if flag == "1"}
+
+    async def stats(self) -> dict:
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.zcard(REDIS_PREFIX + "ready")
+            pipe.zcard(REDIS_PREFIX + "leased")
+            queued, running = await pipe.execute()
+        return {"queued": queued, "running": running}
+
+    async def publish(self, user_id: int, event: dict):
+        await self.client.xadd(
+            REDIS_EVENTS, {"user_id": user_id, "payload": json.dumps(event)},
+            maxlen=REDIS_EVENTS_MAXLEN, approximate=True,
+        )
+
+    async def event_cursor(self):
+        latest = await self.client.xrevrange(REDIS_EVENTS, count=1)
+        return latest[0][0] if latest else "0-0"
+
+    async def read_events(self, cursor, wait: float) -> tuple[object, list[tuple[int, dict]]]:
+        response = await self.client.xread({REDIS_EVENTS: cursor}, count=EVENT_BATCH, block=int(wait * 1000))
+        if not response:
+            return cursor, []
+        entries = response[0][1]
+        return entries[-1][0], [(int(fields["user_id"]), json.loads(fields["payload"])) for _, fields in entries]
+
+    async def prune_events(self):
+        pass
+
+
+_backend: SQLiteQueue | RedisQueue | None = None
+
+
+def get_queue() -> SQLiteQueue | RedisQueue:
+    global _backend
+    if _backend is None:
+        _backend = RedisQueue(REDIS_URL) if REDIS_URL else SQLiteQueue()
+    return _backend
+
+
+async def enqueue(kind: str, payload: dict, key: str | None = None, max_attempts: int = JOB_MAX_ATTEMPTS) -> tuple[int, bool]:
+    """Add a job. With a `key`, at most one queued/running job per key exists;
+    enqueueing again returns the existing job id with created=False."""
+    return await get_queue().enqueue(kind, payload, key, max_attempts)
+
+
+async def cancel(key: str) -> str | None:
+    """Cancel the active job for `key`: a queued job is dropped ("cancelled"),
+    a running one is flagged for its worker to stop ("cancelling")."""
+    return await get_queue().cancel(key)
+
+
+async def publish_event(user_id: int, event: dict):
+    await get_queue().publish(user_id, event)
@@ -0,0 +1,75 @@
+import json
+
+
+class JSONStreamParser:
+    """Incrementally scans a streamed JSON document and emits each element of
+    a top-level array (e.g. ``{"files": [...]}``) as soon as it is complete."""
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self.buffer = ""
+        self._pos = 0
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_key: str | None = None
+        self._target_depth = -1
+        self._item_start = -1
+        self.items: list = []
+
+    def feed(self, chunk: str) -> list:
+        self.buffer += chunk
+        completed = []
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._stack == ["{"]:
+                        try:
+                            self._last_key = json.loads(buf[self._string_start:i + 1])
+                        except ValueError:
+                            self._last_key = None
+                continue
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                if not self._stack and ch == "[":
+                    continue
+                if ch == "[" and self._stack == ["{"] and self._last_key == self.array_key:
+                    self._target_depth = 2
+                if len(self._stack) == self._target_depth and self._stack[-1] == "[":
+                    self._item_start = i
+                self._stack.append(ch)
+            elif ch in "}]" and self._stack:
+                self._stack.pop()
+                if len(self._stack) == self._target_depth and self._item_start >= 0:
+                    try:
+                        item = json.loads(buf[self._item_start:i + 1])
+                        self.items.append(item)
+                        completed.append(item)
+                    except ValueError:
+                        pass
+                    self._item_start = -1
+                elif ch == "]" and len(self._stack) == 1 and self._target_depth == 2:
+                    self._target_depth = -1
+        self._pos = len(buf)
+        return completed
+
+    def close(self) -> dict | None:
+        text = self.buffer.strip()
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end < start:
+            return None
+        try:
+            document = json.loads(text[start:end + 1])
+        except ValueError:
+            return None
+        return document if isinstance(document, dict) else None
@@ -0,0 +1,32 @@
+from app.core.config import OLLAMA_KEEP_ALIVE, OLLAMA_MODEL_KEEP_ALIVE
+from app.services.model_names import normalize_model, parse_model_map
+
+PINNED_KEEP_ALIVE = -1
+
+
+_policies = parse_model_map(OLLAMA_MODEL_KEEP_ALIVE)
+_pinned: set[str] = set()
+
+
+def keep_alive_for(model: str) -> str | int:
+    name = normalize_model(model)
+    if name in _pinned:
+        return PINNED_KEEP_ALIVE
+    return _policies.get(name, OLLAMA_KEEP_ALIVE)
+
+
+def pinned_models() -> list[str]:
+    return sorted(_pinned)
+
+
+def set_pinned(models: list[str]):
+    _pinned.clear()
+    _pinned.update(normalize_model(m) for m in models)
+
+
+def add_pin(model: str):
+    _pinned.add(normalize_model(model))
+
+
+def remove_pin(model: str):
+    _pinned.discard(normalize_model(model))
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+import aiosqlite
+from app.core.config import (
+    DB_PATH, LLM_CACHE_ENABLED, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES,
+)
+from app.services import model_catalog
+from app.services.model_names import normalize_model
+
+_memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+# Eviction trims the table to this fraction of LLM_CACHE_MAX_BYTES so it runs
+# once per burst of writes rather than on every store
+EVICT_TO = 0.9
+SWEEP_INTERVAL = 3600
+
+# Running estimate of the table size; other processes writing the same
+# database make it drift, so each eviction pass re-reads the real total
+_disk_bytes: int | None = None
+_last_sweep = 0.0
+_evicting: asyncio.Task | None = None
+
+
+async def cache_key(model: str, request: dict) -> str:
+    digest = await model_catalog.get_digest(model)
+    raw = json.dumps([normalize_model(model), digest, request], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _remember(key: str, value: str, expires_at: float):
+    _memory[key] = (value, expires_at)
+    _memory.move_to_end(key)
+    while len(_memory) > LLM_CACHE_MEMORY_ENTRIES:
+        _memory.popitem(last=False)
+
+
+async def get_cached(key: str) -> str | None:
+    if not LLM_CACHE_ENABLED:
+        return None
+    now = time.time()
+    entry = _memory.get(key)
+    if entry is not None:
+        if entry[1] > now:
+            _memory.move_to_end(key)
+            _stats["memory_hits"] += 1
+            return entry[0]
+        del _memory[key]
+
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            cursor = await db.execute(
+                "SELECT response, created_at FROM llm_cache WHERE key = ? AND created_at > ?",
+                (key, now - LLM_CACHE_TTL),
+            )
+            row = await cursor.fetchone()
+            if row:
+                await db.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+                await db.commit()
+    except Exception:
+        row = None
+
+    if row is None:
+        _stats["misses"] += 1
+        return None
+    _stats["disk_hits"] += 1
+    _remember(key, row[0], row[1] + LLM_CACHE_TTL)
+    return row[0]
+
+
+async def store_cached(key: str, model: str, value: str):
+    global _disk_bytes
+    if not LLM_CACHE_ENABLED:
+        return
+    now = time.time()
+    _remember(key, value, now + LLM_CACHE_TTL)
+    _stats["stores"] += 1
+    size = len(value.encode())
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            if _disk_bytes is None:
+                cursor = await db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache")
+                _disk_bytes = (await cursor.fetchone())[0]
+            cursor = await db.execute("SELECT size FROM llm_cache WHERE key = ?", (key,))
+            replaced = await cursor.fetchone()
+            await db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, size, created_at, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, value, size, now, now),
+            )
+            await db.commit()
+        _disk_bytes += size - (replaced[0] if replaced else 0)
+    except Exception:
+        return
+    if _disk_bytes > LLM_CACHE_MAX_BYTES or now - _last_sweep > SWEEP_INTERVAL:
+        _schedule_eviction()
+
+
+def _schedule_eviction():
+    global _evicting
+    if _evicting is None or _evicting.done():
+        _evicting = asyncio.create_task(_evict())
+
+
+async def _evict():
+    """Drops expired entries, then the least recently used ones until the
+    table is back under EVICT_TO of the size limit."""
+    global _disk_bytes, _last_sweep
+    now = time.time()
+    _last_sweep = now
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            cursor = await db.execute("DELETE FROM llm_cache WHERE created_at <= ?", (now - LLM_CACHE_TTL,))
+            evicted = cursor.rowcount
+            cursor = await db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache")
+            total = (await cursor.fetchone())[0]
+            if total > LLM_CACHE_MAX_BYTES * EVICT_TO:
+                cursor = await db.execute(
+                    """DELETE FROM llm_cache WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(size) OVER (ORDER BY last_access DESC, key) AS running FROM llm_cache
+                        ) WHERE running > ?
+                    )""",
+                    (int(LLM_CACHE_MAX_BYTES * EVICT_TO),),
+                )
+                evicted += cursor.rowcount
+                cursor = await db.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache")
+                total = (await cursor.fetchone())[0]
+            await db.commit()
+        _disk_bytes = total
+        _stats["evictions"] += max(evicted, 0)
+    except Exception:
+        _disk_bytes = None
+
+
+async def cache_stats() -> dict:
+    entries, total_bytes = 0, 0
+    try:
+        async with aiosqlite.connect(DB_PATH) as db:
+            cursor = await db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache")
+            entries, total_bytes = await cursor.fetchone()
+    except Exception:
+        pass
+    lookups = _stats["memory_hits"] + _stats["disk_hits"] + _stats["misses"]
+    hits = _stats["memory_hits"] + _stats["disk_hits"]
+    return {
+        "enabled": LLM_CACHE_ENABLED,
+        **_stats,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "memory_entries": len(_memory),
+        "disk_entries": entries,
+        "disk_bytes": total_bytes,
+    }
+
+
+async def clear_cache() -> dict:
+    global _disk_bytes
+    _memory.clear()
+    _disk_bytes = 0
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute("DELETE FROM llm_cache")
+        await db.commit()
+    return {"status": "cleared"}
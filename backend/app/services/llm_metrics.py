@@ -0,0 +1,179 @@
+from collections import defaultdict
+from app.services.llm_scheduler import current_caller, current_task, current_user, last_queue_wait
+from app.services.task_budget import current_budget
+
+COLD_START_SECONDS = 0.5
+
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250)
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 40, 60, 120)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+_models: dict[str, dict] = {}
+_histograms: dict[tuple[str, str, str], Histogram] = {}
+_counters: dict[tuple[str, str, str, str], float] = defaultdict(float)
+_task_usage: dict[int, dict] = {}
+_hedges: dict[tuple[str, str], dict] = defaultdict(lambda: {"eligible": 0, "fired": 0, "won": 0})
+
+
+def _entry(model: str) -> dict:
+    if model not in _models:
+        _models[model] = {
+            "requests": 0,
+            "cold_starts": 0,
+            "load_seconds_total": 0.0,
+            "load_seconds_max": 0.0,
+            "generation_seconds_total": 0.0,
+        }
+    return _models[model]
+
+
+def _observe(name: str, model: str, caller: str, value: float, buckets: tuple):
+    key = (name, model, caller)
+    if key not in _histograms:
+        _histograms[key] = Histogram(buckets)
+    _histograms[key].observe(value)
+
+
+def record_timings(
+    model: str, data: dict, caller: str | None = None, user_id: int | None = None, queue_wait: float | None = None,
+):
+    """`queue_wait` defaults to the wait of the last scheduler slot taken in
+    this context; callers whose request ran in another task pass it in."""
+    if not data.get("done", True):
+        return
+    caller = caller or current_caller()
+    user = str(user_id if user_id is not None else current_user() or "")
+    load = data.get("load_duration", 0) / 1e9
+    total = data.get("total_duration", 0) / 1e9
+    prompt_tokens = data.get("prompt_eval_count", 0)
+    prompt_seconds = data.get("prompt_eval_duration", 0) / 1e9
+    completion_tokens = data.get("eval_count", 0)
+    eval_seconds = data.get("eval_duration", 0) / 1e9
+    queue_wait = last_queue_wait() if queue_wait is None else queue_wait
+
+    entry = _entry(model)
+    entry["requests"] += 1
+    entry["load_seconds_total"] += load
+    entry["load_seconds_max"] = max(entry["load_seconds_max"], load)
+    entry["generation_seconds_total"] += max(total - load, 0.0)
+    if load >= COLD_START_SECONDS:
+        entry["cold_starts"] += 1
+
+    _observe("queue_wait_seconds", model, caller, queue_wait, SECONDS_BUCKETS)
+    _observe("time_to_first_token_seconds", model, caller, queue_wait + load + prompt_seconds, SECONDS_BUCKETS)
+    _observe("load_seconds", model, caller, load, SECONDS_BUCKETS)
+    if eval_seconds > 0:
+        _observe("tokens_per_second", model, caller, completion_tokens / eval_seconds, TOKENS_PER_SECOND_BUCKETS)
+    _counters[("requests_total", model, caller, user)] += 1
+    _counters[("prompt_tokens_total", model, caller, user)] += prompt_tokens
+    _counters[("completion_tokens_total", model, caller, user)] += completion_tokens
+
+    budget = current_budget()
+    if budget is not None:
+        budget.charge(prompt_tokens + completion_tokens)
+
+    task_id = current_task()
+    if task_id is not None:
+        usage = _task_usage.setdefault(task_id, {
+            "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+            "load_seconds": 0.0, "eval_seconds": 0.0, "queue_wait_seconds": 0.0, "by_caller": {},
+        })
+        usage["calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["completion_tokens"] += completion_tokens
+        usage["load_seconds"] = round(usage["load_seconds"] + load, 3)
+        usage["eval_seconds"] = round(usage["eval_seconds"] + eval_seconds, 3)
+        usage["queue_wait_seconds"] = round(usage["queue_wait_seconds"] + queue_wait, 3)
+        per_caller = usage["by_caller"].setdefault(caller, {"calls": 0, "completion_tokens": 0})
+        per_caller["calls"] += 1
+        per_caller["completion_tokens"] += completion_tokens
+
+
+def pop_task_usage(task_id: int) -> dict | None:
+    return _task_usage.pop(task_id, None)
+
+
+def record_hedge(model: str, caller: str | None = None, fired: bool = False, won: bool = False):
+    entry = _hedges[(model, caller or current_caller())]
+    entry["eligible"] += 1
+    entry["fired"] += fired
+    entry["won"] += won
+
+
+def hedge_stats() -> dict:
+    """Hedge rate is fired/eligible; win rate is how often the duplicate
+    request beat the original once fired."""
+    stats = {}
+    for (model, caller), entry in _hedges.items():
+        stats.setdefault(model, {})[caller] = {
+            **entry,
+            "hedge_rate": round(entry["fired"] / entry["eligible"], 4) if entry["eligible"] else 0.0,
+            "win_rate": round(entry["won"] / entry["fired"], 4) if entry["fired"] else 0.0,
+        }
+    return stats
+
+
+def load_stats() -> dict:
+    stats = {}
+    for model, entry in _models.items():
+        requests = entry["requests"] or 1
+        stats[model] = {
+            **entry,
+            "avg_load_seconds": round(entry["load_seconds_total"] / requests, 3),
+            "avg_generation_seconds": round(entry["generation_seconds_total"] / requests, 3),
+        }
+    return stats
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render_prometheus(gauges: dict[str, list[tuple[dict, float]]] | None = None) -> str:
+    lines = []
+    for name in ("requests_total", "prompt_tokens_total", "completion_tokens_total"):
+        lines.append(f"# TYPE rudrax_llm_{name} counter")
+        for (metric, model, caller, user), value in _counters.items():
+            if metric == name:
+                lines.append(f"rudrax_llm_{name}{_labels(model=model, caller=caller, user=user)} {value:g}")
+
+    for name in ("eligible", "fired", "won"):
+        lines.append(f"# TYPE rudrax_llm_hedge_{name}_total counter")
+        for (model, caller), entry in _hedges.items():
+            lines.append(f"rudrax_llm_hedge_{name}_total{_labels(model=model, caller=caller)} {entry[name]}")
+
+    for name in ("tokens_per_second", "time_to_first_token_seconds", "queue_wait_seconds", "load_seconds"):
+        lines.append(f"# TYPE rudrax_llm_{name} histogram")
+        for (metric, model, caller), hist in _histograms.items():
+            if metric != name:
+                continue
+            for bound, count in zip(hist.buckets, hist.counts):
+                lines.append(f"rudrax_llm_{name}_bucket{_labels(model=model, caller=caller, le=bound)} {count}")
+            lines.append(f"rudrax_llm_{name}_bucket{_labels(model=model, caller=caller, le='+Inf')} {hist.count}")
+            lines.append(f"rudrax_llm_{name}_sum{_labels(model=model, caller=caller)} {hist.total:g}")
+            lines.append(f"rudrax_llm_{name}_count{_labels(model=model, caller=caller)} {hist.count}")
+
+    for name, samples in (gauges or {}).items():
+        lines.append(f"# TYPE rudrax_{name} gauge")
+        for labels, value in samples:
+            lines.append(f"rudrax_{name}{_labels(**labels) if labels else ''} {value:g}")
+    return "\n".join(lines) + "\n"
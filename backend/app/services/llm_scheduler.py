@@ -0,0 +1,187 @@
+import asyncio
+import itertools
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from app.core.config import LLM_DEFAULT_CONCURRENCY, LLM_MODEL_CONCURRENCY, LLM_MAX_QUEUE
+from app.services.model_names import normalize_model, parse_model_map
+
+PRIORITIES = {"interactive": 0, "soc": 1, "background": 2}
+
+_priority: ContextVar[str | None] = ContextVar("llm_priority", default=None)
+_user: ContextVar[int | None] = ContextVar("llm_user", default=None)
+_caller: ContextVar[str | None] = ContextVar("llm_caller", default=None)
+_task: ContextVar[int | None] = ContextVar("llm_task", default=None)
+_queue_wait: ContextVar[float] = ContextVar("llm_queue_wait", default=0.0)
+
+
+class LLMQueueFull(Exception):
+    pass
+
+
+@contextmanager
+def llm_context(
+    priority: str | None = None,
+    user_id: int | None = None,
+    caller: str | None = None,
+    task_id: int | None = None,
+):
+    tokens = []
+    for var, value in ((_priority, priority), (_user, user_id), (_caller, caller), (_task, task_id)):
+        if value is not None:
+            tokens.append((var, var.set(value)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def current_priority(default: str = "interactive") -> str:
+    return _priority.get() or default
+
+
+def current_user() -> int | None:
+    return _user.get()
+
+
+def current_caller() -> str:
+    return _caller.get() or "unknown"
+
+
+def current_task() -> int | None:
+    return _task.get()
+
+
+def last_queue_wait() -> float:
+    return _queue_wait.get()
+
+
+class _ModelQueue:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.active_by_user: Counter = Counter()
+        self.waiters: list[tuple[int, int, int | None, asyncio.Future]] = []
+
+
+class LLMScheduler:
+    def __init__(self, default_limit: int, limits: dict[str, int], max_queue: int):
+        self.default_limit = default_limit
+        self.limits = limits
+        self.max_queue = max_queue
+        self.capacity = 1
+        self._queues: dict[str, _ModelQueue] = {}
+        self._seq = itertools.count()
+        self._waits: dict[str, deque] = {name: deque(maxlen=1000) for name in PRIORITIES}
+        self.admitted = 0
+        self.rejected = 0
+
+    def _queue(self, model: str) -> _ModelQueue:
+        key = normalize_model(model)
+        if key not in self._queues:
+            self._queues[key] = _ModelQueue(self.limits.get(key, self.default_limit))
+        return self._queues[key]
+
+    def set_capacity(self, nodes: int):
+        self.capacity = max(1, nodes)
+        for queue in self._queues.values():
+            self._dispatch(queue)
+
+    def _limit(self, queue: _ModelQueue) -> int:
+        return queue.limit * self.capacity
+
+    def queued(self) -> int:
+        return sum(len(q.waiters) for q in self._queues.values())
+
+    async def acquire(self, model: str, priority: str, user_id: int | None) -> float:
+        queue = self._queue(model)
+        started = time.monotonic()
+        if queue.active < self._limit(queue) and not queue.waiters:
+            self._grant(queue, user_id)
+        else:
+            if self.queued() >= self.max_queue:
+                self.rejected += 1
+                raise LLMQueueFull("LLM queue is full, try again shortly")
+            future = asyncio.get_running_loop().create_future()
+            entry = (PRIORITIES.get(priority, 0), next(self._seq), user_id, future)
+            queue.waiters.append(entry)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self.release(model, user_id)
+                elif entry in queue.waiters:
+                    queue.waiters.remove(entry)
+                raise
+        waited = time.monotonic() - started
+        _queue_wait.set(waited)
+        self._waits.setdefault(priority, deque(maxlen=1000)).append(waited)
+        self.admitted += 1
+        return waited
+
+    def _grant(self, queue: _ModelQueue, user_id: int | None):
+        queue.active += 1
+        queue.active_by_user[user_id] += 1
+
+    def release(self, model: str, user_id: int | None):
+        queue = self._queue(model)
+        queue.active -= 1
+        queue.active_by_user[user_id] -= 1
+        if queue.active_by_user[user_id] <= 0:
+            del queue.active_by_user[user_id]
+        self._dispatch(queue)
+
+    def _dispatch(self, queue: _ModelQueue):
+        while queue.active < self._limit(queue) and queue.waiters:
+            entry = min(queue.waiters, key=lambda w: (w[0], queue.active_by_user[w[2]], w[1]))
+            queue.waiters.remove(entry)
+            future = entry[3]
+            if future.done():
+                continue
+            self._grant(queue, entry[2])
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self, model: str, priority: str | None = None, user_id: int | None = None):
+        priority = priority or current_priority()
+        user_id = user_id if user_id is not None else current_user()
+        await self.acquire(model, priority, user_id)
+        try:
+            yield
+        finally:
+            self.release(model, user_id)
+
+    def stats(self) -> dict:
+        waits = {}
+        for name, samples in self._waits.items():
+            ordered = sorted(samples)
+            waits[name] = {
+                "samples": len(ordered),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1) if ordered else 0.0,
+                "p95_ms": round(ordered[int(len(ordered) * 0.95)] * 1000, 1) if ordered else 0.0,
+                "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+            }
+        models = {}
+        for name, queue in self._queues.items():
+            depth = Counter(next(k for k, v in PRIORITIES.items() if v == w[0]) for w in queue.waiters)
+            models[name] = {
+                "limit": self._limit(queue),
+                "active": queue.active,
+                "queued": len(queue.waiters),
+                "queued_by_priority": dict(depth),
+                "active_users": len(queue.active_by_user),
+            }
+        return {
+            "queue_depth": self.queued(),
+            "max_queue": self.max_queue,
+            "capacity_nodes": self.capacity,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_times": waits,
+            "models": models,
+        }
+
+
+scheduler = LLMScheduler(LLM_DEFAULT_CONCURRENCY, parse_model_map(LLM_MODEL_CONCURRENCY, lambda v: max(1, int(v))), LLM_MAX_QUEUE)
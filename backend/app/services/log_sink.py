@@ -0,0 +1,90 @@
+import asyncio
+import sys
+import aiosqlite
+from app.core.config import DB_PATH, LOG_SINK_FLUSH_MS, LOG_SINK_BATCH_ROWS, LOG_SINK_MAX_QUEUE
+
+_queue: asyncio.Queue | None = None
+_writer: asyncio.Task | None = None
+_stats = {"written": 0, "batches": 0, "failed": 0}
+
+
+def _get_queue() -> asyncio.Queue:
+    global _queue
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=LOG_SINK_MAX_QUEUE)
+    return _queue
+
+
+async def _write_batch(batch: list[tuple[str, tuple]]):
+    """Write a batch in one transaction, folding runs of the same statement
+    into executemany while keeping the original order."""
+    async with aiosqlite.connect(DB_PATH) as db:
+        start = 0
+        while start < len(batch):
+            sql = batch[start][0]
+            end = start
+            while end < len(batch) and batch[end][0] == sql:
+                end += 1
+            await db.executemany(sql, [params for _, params in batch[start:end]])
+            start = end
+        await db.commit()
+
+
+async def _writer_loop():
+    queue = _get_queue()
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + LOG_SINK_FLUSH_MS / 1000
+        while len(batch) < LOG_SINK_BATCH_ROWS:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        try:
+            await _write_batch(batch)
+            _stats["written"] += len(batch)
+            _stats["batches"] += 1
+        except Exception as e:
+            _stats["failed"] += len(batch)
+            print(f"log sink: dropped {len(batch)} rows: {e}", file=sys.stderr)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+def start_sink():
+    global _writer
+    if _writer is None or _writer.done():
+        _writer = asyncio.create_task(_writer_loop())
+
+
+async def write(sql: str, params: tuple):
+    """Queue a write for the next batch. Blocks (backpressure) while the
+    queue is full instead of letting producers grow memory without bound."""
+    start_sink()
+    await _get_queue().put((sql, params))
+
+
+async def flush():
+    if _queue is not None and _writer is not None and not _writer.done():
+        await _queue.join()
+
+
+async def stop_sink(timeout: float = 10.0):
+    global _writer, _queue
+    try:
+        await asyncio.wait_for(flush(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    if _writer is not None:
+        _writer.cancel()
+        _writer = None
+    _queue = None
+
+
+def sink_stats() -> dict:
+    return {**_stats, "queued": _queue.qsize() if _queue is not None else 0}
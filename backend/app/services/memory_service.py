@@ -1,17 +1,92 @@
+import asyncio
 import json
+from collections import defaultdict
 from datetime import datetime
 import aiosqlite
-from app.core.config import DB_PATH
+from app.core.config import DB_PATH, MEMORY_EMBED_MODEL
+from app.services import ollama_client, search_service, vector_index
+
+_index_locks: dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+
+async def embed_text(text: str) -> list[float] | None:
+    try:
+        response = await ollama_client.post(
+            "/api/embed", {"model": MEMORY_EMBED_MODEL, "input": text}, op="embed",
+        )
+        if response.status_code != 200:
+            return None
+        embeddings = response.json().get("embeddings") or []
+        return embeddings[0] if embeddings else None
+    except Exception:
+        return None
+
+
+async def _index_memory(
+    user_id: int, memory_id: int, vector: list[float] | None, embedding_id: str | None = None,
+) -> str | None:
+    """Adds an already computed embedding to the user's shard and records its
+    id. The embedding is computed before this is called so no SQLite write
+    transaction is held open across an Ollama request."""
+    if vector is None:
+        return None
+    async with _index_locks[user_id]:
+        shard = vector_index.get_shard(user_id, len(vector), MEMORY_EMBED_MODEL)
+        reset = shard.dim != len(vector) or shard.model != MEMORY_EMBED_MODEL
+        if reset:
+            vector_index.drop_shard(user_id)
+            shard = vector_index.get_shard(user_id, len(vector), MEMORY_EMBED_MODEL)
+            embedding_id = None
+        embedding_id = shard.upsert(memory_id, vector, embedding_id)
+        async with aiosqlite.connect(DB_PATH) as db:
+            if reset:
+                await db.execute("UPDATE memory_store SET embedding_id = NULL WHERE user_id = ?", (user_id,))
+            await db.execute("UPDATE memory_store SET embedding_id = ? WHERE id = ?", (embedding_id, memory_id))
+            await db.commit()
+        if shard.needs_training():
+            await asyncio.to_thread(shard.train)
+    return embedding_id
 
 
 async def store_memory(user_id: int, context_key: str, content: str) -> dict:
+    vector = await embed_text(content)
     async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
+        cursor = await db.execute(
             "INSERT INTO memory_store (user_id, context_key, content) VALUES (?, ?, ?)",
             (user_id, context_key, content),
         )
         await db.commit()
-    return {"status": "stored", "context_key": context_key}
+    await _index_memory(user_id, cursor.lastrowid, vector)
+    return {"status": "stored", "context_key": context_key, "id": cursor.lastrowid}
+
+
+async def update_memory(user_id: int, memory_id: int, content: str) -> dict:
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "SELECT embedding_id FROM memory_store WHERE id = ? AND user_id = ?", (memory_id, user_id),
+        )
+        row = await cursor.fetchone()
+    if not row:
+        return {"status": "not_found"}
+    vector = await embed_text(content)
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute("UPDATE memory_store SET content = ? WHERE id = ?", (content, memory_id))
+        await db.commit()
+    await _index_memory(user_id, memory_id, vector, row[0])
+    return {"status": "updated", "id": memory_id}
+
+
+async def reindex_memory(user_id: int) -> dict:
+    indexed = 0
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "SELECT id, content FROM memory_store WHERE user_id = ? AND embedding_id IS NULL ORDER BY id", (user_id,),
+        )
+        rows = await cursor.fetchall()
+    for memory_id, content in rows:
+        if await _index_memory(user_id, memory_id, await embed_text(content)) is not None:
+            indexed += 1
+    return {"status": "reindexed", "indexed": indexed}
 
 
 async def retrieve_memory(user_id: int, context_key: str, limit: int = 10) -> list[dict]:
@@ -25,25 +100,61 @@ async def retrieve_memory(user_id: int, context_key: str, limit: int = 10) -> li
         return [dict(row) for row in rows]
 
 
-async def search_memory(user_id: int, query: str, limit: int = 10) -> list[dict]:
+async def _search_text(user_id: int, query: str, limit: int) -> list[dict]:
+    ids = await search_service.search_ids("memory", user_id, query, limit)
+    if not ids:
+        return []
     async with aiosqlite.connect(DB_PATH) as db:
         db.row_factory = aiosqlite.Row
         cursor = await db.execute(
-            "SELECT * FROM memory_store WHERE user_id = ? AND content LIKE ? ORDER BY created_at DESC LIMIT ?",
-            (user_id, f"%{query}%", limit),
+            f"SELECT * FROM memory_store WHERE id IN ({','.join('?' * len(ids))})", ids,
         )
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows]
+        rows = {row["id"]: dict(row) for row in await cursor.fetchall()}
+    return [rows[i] for i in ids if i in rows]
+
+
+async def search_memory(user_id: int, query: str, limit: int = 10, approximate: bool | None = None) -> list[dict]:
+    shard = vector_index.get_shard(user_id)
+    vector = await embed_text(query) if shard is not None and shard.count else None
+    if vector is None or len(vector) != shard.dim:
+        return await _search_text(user_id, query, limit)
+
+    hits = await asyncio.to_thread(shard.search, vector, limit, approximate)
+    if not hits:
+        return []
+    scores = dict(hits)
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        cursor = await db.execute(
+            f"SELECT * FROM memory_store WHERE user_id = ? AND id IN ({','.join('?' * len(scores))})",
+            (user_id, *scores),
+        )
+        rows = [dict(row) for row in await cursor.fetchall()]
+    for row in rows:
+        row["score"] = round(scores[row["id"]], 4)
+    return sorted(rows, key=lambda r: r["score"], reverse=True)
 
 
 async def clear_memory(user_id: int, context_key: str | None = None) -> dict:
     async with aiosqlite.connect(DB_PATH) as db:
         if context_key:
+            cursor = await db.execute(
+                "SELECT embedding_id FROM memory_store WHERE user_id = ? AND context_key = ? AND embedding_id IS NOT NULL",
+                (user_id, context_key),
+            )
+            shard = vector_index.get_shard(user_id)
+            if shard is not None:
+                async with _index_locks[user_id]:
+                    for (embedding_id,) in await cursor.fetchall():
+                        shard.remove(embedding_id)
+                    shard.flush()
             await db.execute(
                 "DELETE FROM memory_store WHERE user_id = ? AND context_key = ?",
                 (user_id, context_key),
             )
         else:
             await db.execute("DELETE FROM memory_store WHERE user_id = ?", (user_id,))
+            async with _index_locks[user_id]:
+                vector_index.drop_shard(user_id)
         await db.commit()
     return {"status": "cleared"}
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from app.core.config import MODEL_CATALOG_REFRESH
+from app.services import ollama_client
+from app.services.model_names import normalize_model
+
+DEFAULT_MODEL = "llama3"
+
+PREFERENCE_MAP = {
+    "code": ["codellama", "deepseek-coder", "starcoder", "codegemma", "qwen2.5-coder"],
+    "security": ["llama3", "mixtral", "mistral", "gemma2"],
+    "analysis": ["llama3", "mixtral", "mistral", "phi3"],
+    "general": ["llama3", "mixtral", "mistral", "gemma2"],
+}
+
+_models: list[dict] = []
+_digests: dict[str, str] = {}
+_resolved: dict[str, str] = {}
+_signature: tuple = ()
+_online = False
+_refreshed_at = 0.0
+_refresh_lock = asyncio.Lock()
+_refresh_task: asyncio.Task | None = None
+
+
+def _resolve_preferences(names: list[str]) -> dict[str, str]:
+    lowered = [n.lower() for n in names]
+    resolved = {}
+    for task_type, preferences in PREFERENCE_MAP.items():
+        resolved[task_type] = next(
+            (names[i] for pref in preferences for i, name in enumerate(lowered) if pref in name),
+            names[0],
+        )
+    return resolved
+
+
+async def refresh() -> bool:
+    global _models, _resolved, _signature, _online, _refreshed_at
+    async with _refresh_lock:
+        tags = await ollama_client.get_all("/api/tags", op="tags")
+        running = await ollama_client.get_all("/api/ps", op="ps")
+
+        catalog: dict[str, dict] = {}
+        online = False
+        for node_url, response in tags:
+            if response is None or response.status_code != 200:
+                continue
+            online = True
+            for m in response.json().get("models", []):
+                entry = catalog.setdefault(m.get("name", ""), {
+                    "name": m.get("name", ""),
+                    "model": m.get("model", ""),
+                    "size": m.get("size", 0),
+                    "digest": m.get("digest", ""),
+                    "modified_at": m.get("modified_at", ""),
+                    "details": m.get("details", {}),
+                    "nodes": [],
+                    "loaded": False,
+                })
+                entry["nodes"].append(node_url)
+        for node_url, response in running:
+            if response is None or response.status_code != 200:
+                continue
+            for m in response.json().get("models", []):
+                if m.get("name") in catalog:
+                    catalog[m["name"]]["loaded"] = True
+
+        _online = online
+        _refreshed_at = time.time()
+        if not online:
+            return False
+
+        _models = list(catalog.values())
+        _digests.clear()
+        _digests.update({m["name"]: m["digest"] for m in _models})
+        signature = tuple(sorted(_digests.items()))
+        if signature != _signature:
+            _signature = signature
+            _resolved = _resolve_preferences([m["name"] for m in _models]) if _models else {}
+        return True
+
+
+async def _ensure_loaded():
+    if not _refreshed_at:
+        await refresh()
+
+
+async def _refresh_loop():
+    while True:
+        try:
+            await refresh()
+        except Exception:
+            pass
+        await asyncio.sleep(MODEL_CATALOG_REFRESH if _online else min(5.0, MODEL_CATALOG_REFRESH))
+
+
+def start_catalog():
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_refresh_loop())
+
+
+def stop_catalog():
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        _refresh_task = None
+
+
+async def get_models() -> list[dict]:
+    await _ensure_loaded()
+    return _models if _online else []
+
+
+async def get_model_names() -> list[str]:
+    return [m["name"] for m in await get_models()]
+
+
+async def get_status() -> dict:
+    await _ensure_loaded()
+    return {
+        "online": _online,
+        "models_count": len(_models) if _online else 0,
+        "loaded_count": sum(1 for m in _models if m["loaded"]) if _online else 0,
+        "refreshed_at": _refreshed_at,
+    }
+
+
+async def get_digest(model: str) -> str:
+    await _ensure_loaded()
+    return _digests.get(normalize_model(model), _digests.get(model, ""))
+
+
+async def resolve_model(task_type: str) -> str:
+    await _ensure_loaded()
+    if not _online or not _resolved:
+        return DEFAULT_MODEL
+    return _resolved.get(task_type, _resolved["general"])
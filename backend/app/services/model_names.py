@@ -0,0 +1,17 @@
+"""Ollama model names and the per-model settings keyed on them."""
+
+
+def normalize_model(model: str) -> str:
+    """Ollama treats "llama3" and "llama3:latest" as the same model."""
+    return model if ":" in model else f"{model}:latest"
+
+
+def parse_model_map(raw: str, convert=str.strip) -> dict:
+    """Parses a "model=value,model=value" setting into a dict keyed on the
+    normalized model name, with each value passed through `convert`."""
+    result = {}
+    for item in raw.split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            result[normalize_model(name.strip())] = convert(value)
+    return result
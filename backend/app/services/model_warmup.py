@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+import aiosqlite
+from app.core.config import DB_PATH, OLLAMA_HOT_MODELS, OLLAMA_WARMUP_INTERVAL
+from app.services import keep_alive, ollama_client
+from app.services.llm_scheduler import llm_context
+from app.services.ollama_nodes import OllamaNode, pool
+
+PINS_SETTING_KEY = "ollama_pinned_models"
+
+_warmup_task: asyncio.Task | None = None
+_last_warmup: dict[str, dict] = {}
+
+
+async def load_pins():
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute("SELECT value FROM settings WHERE key = ?", (PINS_SETTING_KEY,))
+        row = await cursor.fetchone()
+    keep_alive.set_pinned(json.loads(row[0]) if row else [])
+
+
+async def _save_pins():
+    value = json.dumps(keep_alive.pinned_models())
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            "INSERT INTO settings (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = ?",
+            (PINS_SETTING_KEY, value, value),
+        )
+        await db.commit()
+
+
+async def _warm_node(node: OllamaNode, model: str) -> dict:
+    try:
+        with llm_context(caller="warmup"):
+            response = await ollama_client.post(
+                "/api/generate",
+                {"model": model, "keep_alive": keep_alive.keep_alive_for(model)},
+                op="generate", priority="background", node=node,
+            )
+        ok = response.status_code == 200
+        load_seconds = response.json().get("load_duration", 0) / 1e9 if ok else 0.0
+        error = "" if ok else f"status {response.status_code}"
+    except Exception as e:
+        ok, load_seconds, error = False, 0.0, str(e)
+    return {"ok": ok, "load_seconds": round(load_seconds, 3), "error": error}
+
+
+async def warm_model(model: str) -> dict:
+    """Loads (or refreshes keep_alive for) the model on every healthy node,
+    so requests keep finding it hot whichever node they are routed to."""
+    started = time.monotonic()
+    nodes = [n for n in pool.nodes if n.healthy] or pool.nodes
+    per_node = dict(zip((n.url for n in nodes), await asyncio.gather(*(_warm_node(n, model) for n in nodes))))
+    result = {
+        "model": model,
+        "ok": all(r["ok"] for r in per_node.values()),
+        "load_seconds": max(r["load_seconds"] for r in per_node.values()),
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "error": "; ".join(f"{url}: {r['error']}" for url, r in per_node.items() if r["error"]),
+        "warmed_at": time.time(),
+        "nodes": per_node,
+    }
+    _last_warmup[model] = result
+    return result
+
+
+def hot_models() -> list[str]:
+    return sorted(set(OLLAMA_HOT_MODELS) | set(keep_alive.pinned_models()))
+
+
+async def warm_all() -> list[dict]:
+    return await asyncio.gather(*(warm_model(m) for m in hot_models()))
+
+
+async def pin_model(model: str) -> dict:
+    keep_alive.add_pin(model)
+    await _save_pins()
+    return await warm_model(model)
+
+
+async def unpin_model(model: str) -> dict:
+    keep_alive.remove_pin(model)
+    await _save_pins()
+    return await warm_model(model)
+
+
+def warmup_status() -> dict:
+    return {
+        "hot_models": hot_models(),
+        "pinned": keep_alive.pinned_models(),
+        "last_warmup": _last_warmup,
+    }
+
+
+async def _warmup_loop():
+    while True:
+        try:
+            await warm_all()
+        except Exception:
+            pass
+        await asyncio.sleep(OLLAMA_WARMUP_INTERVAL)
+
+
+async def start_warmup():
+    global _warmup_task
+    await load_pins()
+    if _warmup_task is None or _warmup_task.done():
+        _warmup_task = asyncio.create_task(_warmup_loop())
+
+
+def stop_warmup():
+    global _warmup_task
+    if _warmup_task is not None:
+        _warmup_task.cancel()
+        _warmup_task = None
@@ -0,0 +1,217 @@
+import asyncio
+from contextlib import asynccontextmanager
+import httpx
+from app.core.config import (
+    OLLAMA_MAX_CONNECTIONS, OLLAMA_MAX_KEEPALIVE, OLLAMA_KEEPALIVE_EXPIRY,
+    OLLAMA_CONNECT_TIMEOUT, OLLAMA_GENERATE_TIMEOUT, OLLAMA_AGENT_TIMEOUT, OLLAMA_META_TIMEOUT,
+    OLLAMA_DRAIN_TIMEOUT, OLLAMA_HEALTH_INTERVAL,
+)
+from app.services.llm_scheduler import scheduler, current_priority
+from app.services.ollama_nodes import OllamaNode, pool
+from app.services.keep_alive import keep_alive_for
+from app.services.llm_metrics import record_timings
+from app.services.task_budget import current_budget
+
+TIMEOUTS = {
+    "generate": OLLAMA_GENERATE_TIMEOUT,
+    "chat": OLLAMA_GENERATE_TIMEOUT,
+    "stream": OLLAMA_GENERATE_TIMEOUT,
+    "agent": OLLAMA_AGENT_TIMEOUT,
+    "embed": OLLAMA_GENERATE_TIMEOUT,
+    "tags": OLLAMA_META_TIMEOUT,
+    "ps": OLLAMA_META_TIMEOUT,
+    "status": min(OLLAMA_META_TIMEOUT, 5.0),
+}
+
+BACKGROUND_OPS = {"agent"}
+
+_client: httpx.AsyncClient | None = None
+_health_task: asyncio.Task | None = None
+_in_flight = 0
+
+pool.on_capacity_change = scheduler.set_capacity
+scheduler.set_capacity(len(pool.nodes))
+
+
+def _timeout(op: str, override: float | None = None) -> httpx.Timeout:
+    return httpx.Timeout(override or TIMEOUTS.get(op, OLLAMA_GENERATE_TIMEOUT), connect=OLLAMA_CONNECT_TIMEOUT)
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_KEEPALIVE,
+                keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY,
+            ),
+            timeout=_timeout("generate"),
+        )
+    return _client
+
+
+async def start_client():
+    global _health_task
+    get_client()
+    if _health_task is None or _health_task.done():
+        _health_task = asyncio.create_task(_health_loop())
+
+
+async def close_client(drain_timeout: float = OLLAMA_DRAIN_TIMEOUT):
+    global _client, _health_task
+    if _health_task is not None:
+        _health_task.cancel()
+        _health_task = None
+    if _client is None:
+        return
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + drain_timeout
+    while _in_flight and loop.time() < deadline:
+        await asyncio.sleep(0.05)
+    client, _client = _client, None
+    await client.aclose()
+
+
+def in_flight() -> int:
+    return _in_flight
+
+
+async def check_node(node):
+    try:
+        response = await get_client().get(f"{node.url}/api/ps", timeout=_timeout("ps"))
+        if response.status_code != 200:
+            pool.record_check(node, None, f"status {response.status_code}")
+            return
+        pool.record_check(node, [m.get("name", "") for m in response.json().get("models", [])])
+    except Exception as e:
+        pool.record_check(node, None, str(e) or type(e).__name__)
+
+
+async def _health_loop():
+    while True:
+        await asyncio.gather(*(check_node(node) for node in pool.nodes))
+        await asyncio.sleep(OLLAMA_HEALTH_INTERVAL)
+
+
+@asynccontextmanager
+async def _track():
+    global _in_flight
+    _in_flight += 1
+    try:
+        yield
+    finally:
+        _in_flight -= 1
+
+
+@asynccontextmanager
+async def _slot(payload: dict, op: str, priority: str | None, user_id: int | None):
+    default = "background" if op in BACKGROUND_OPS else "interactive"
+    async with scheduler.slot(payload["model"], priority or current_priority(default), user_id):
+        yield
+
+
+def _apply_budget(payload: dict, op: str, timeout: float | None) -> float | None:
+    """Inside an agent task, refuse to start once its budget is spent, cap the
+    HTTP timeout at the time left and num_predict at the tokens left."""
+    budget = current_budget()
+    if budget is None:
+        return timeout
+    budget.check()
+    remaining = budget.remaining_tokens()
+    if remaining is not None:
+        options = dict(payload.get("options") or {})
+        limit = options.get("num_predict")
+        if limit is None or limit < 0 or limit > remaining:
+            options["num_predict"] = remaining
+            payload["options"] = options
+    return budget.limit_timeout(timeout or TIMEOUTS.get(op, OLLAMA_GENERATE_TIMEOUT))
+
+
+async def post(
+    path: str,
+    payload: dict,
+    op: str = "generate",
+    timeout: float | None = None,
+    priority: str | None = None,
+    user_id: int | None = None,
+    node: OllamaNode | None = None,
+) -> httpx.Response:
+    """POST to the least loaded node, failing over on connection errors.
+    With `node`, only that node is used."""
+    model = payload.get("model")
+    payload.setdefault("keep_alive", keep_alive_for(model))
+    timeout = _apply_budget(payload, op, timeout)
+    tried: set[str] = set()
+    async with _slot(payload, op, priority, user_id), _track():
+        target = node
+        while True:
+            node = target or pool.pick(model, exclude=tried)
+            tried.add(node.url)
+            with pool.lease(node):
+                try:
+                    response = await get_client().post(f"{node.url}{path}", json=payload, timeout=_timeout(op, timeout))
+                except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                    pool.mark_failure(node, str(e) or type(e).__name__)
+                    if target is None and len(tried) < len(pool.nodes):
+                        continue
+                    raise
+            if response.status_code < 500:
+                pool.mark_success(node, model)
+            if response.status_code == 200 and not payload.get("stream"):
+                try:
+                    record_timings(model, response.json())
+                except ValueError:
+                    pass
+            return response
+
+
+async def get(path: str, op: str = "tags", timeout: float | None = None) -> httpx.Response:
+    node = pool.pick()
+    async with _track():
+        with pool.lease(node):
+            return await get_client().get(f"{node.url}{path}", timeout=_timeout(op, timeout))
+
+
+async def get_all(path: str, op: str = "tags", timeout: float | None = None) -> list[tuple[str, httpx.Response | None]]:
+    async def fetch(node):
+        try:
+            return node.url, await get_client().get(f"{node.url}{path}", timeout=_timeout(op, timeout))
+        except Exception:
+            return node.url, None
+    async with _track():
+        return await asyncio.gather(*(fetch(node) for node in pool.nodes if node.healthy))
+
+
+@asynccontextmanager
+async def stream(
+    path: str,
+    payload: dict,
+    op: str = "stream",
+    timeout: float | None = None,
+    priority: str | None = None,
+    user_id: int | None = None,
+    tried: set[str] | None = None,
+    on_dispatch=None,
+):
+    """Stream from the least loaded node. With `tried`, nodes already in the
+    set are avoided when possible and the chosen node is added to it.
+    `on_dispatch` is called once a scheduler slot is held and a node chosen."""
+    model = payload.get("model")
+    payload.setdefault("keep_alive", keep_alive_for(model))
+    timeout = _apply_budget(payload, op, timeout)
+    async with _slot(payload, op, priority, user_id), _track():
+        node = pool.pick(model, exclude=tried)
+        if tried is not None:
+            tried.add(node.url)
+        if on_dispatch is not None:
+            on_dispatch()
+        with pool.lease(node):
+            try:
+                async with get_client().stream("POST", f"{node.url}{path}", json=payload, timeout=_timeout(op, timeout)) as response:
+                    if response.status_code < 500:
+                        pool.mark_success(node, model)
+                    yield response
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                pool.mark_failure(node, str(e) or type(e).__name__)
+                raise
@@ -0,0 +1,97 @@
+import time
+from contextlib import contextmanager
+from app.core.config import OLLAMA_NODES, OLLAMA_NODE_MAX_FAILURES
+from app.services.model_names import normalize_model
+
+AFFINITY_SLACK = 2
+
+
+class OllamaNode:
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.loaded: set[str] = set()
+        self.last_error = ""
+        self.last_checked = 0.0
+        self.served = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "failures": self.failures,
+            "loaded_models": sorted(self.loaded),
+            "served": self.served,
+            "last_error": self.last_error,
+            "last_checked": self.last_checked,
+        }
+
+
+class NodePool:
+    def __init__(self, urls: list[str], max_failures: int):
+        self.nodes = [OllamaNode(url) for url in urls]
+        self.max_failures = max_failures
+        self.on_capacity_change = None
+
+    def healthy_count(self) -> int:
+        return sum(1 for n in self.nodes if n.healthy)
+
+    def pick(self, model: str | None = None, exclude: set[str] | None = None) -> OllamaNode:
+        candidates = [n for n in self.nodes if n.healthy and n.url not in (exclude or set())]
+        if not candidates:
+            candidates = [n for n in self.nodes if n.url not in (exclude or set())] or self.nodes
+        best = min(candidates, key=lambda n: (n.outstanding, n.served))
+        if model:
+            name = normalize_model(model)
+            warm = [n for n in candidates if name in n.loaded]
+            if warm:
+                best_warm = min(warm, key=lambda n: (n.outstanding, n.served))
+                if best_warm.outstanding - best.outstanding <= AFFINITY_SLACK:
+                    return best_warm
+        return best
+
+    @contextmanager
+    def lease(self, node: OllamaNode):
+        node.outstanding += 1
+        try:
+            yield node
+        finally:
+            node.outstanding -= 1
+
+    def mark_success(self, node: OllamaNode, model: str | None = None):
+        node.failures = 0
+        node.served += 1
+        if model:
+            node.loaded.add(normalize_model(model))
+        self._set_health(node, True)
+
+    def mark_failure(self, node: OllamaNode, error: str):
+        node.failures += 1
+        node.last_error = error
+        if node.failures >= self.max_failures:
+            self._set_health(node, False)
+
+    def record_check(self, node: OllamaNode, loaded: list[str] | None, error: str = ""):
+        node.last_checked = time.time()
+        if loaded is None:
+            self.mark_failure(node, error)
+            return
+        node.loaded = {normalize_model(m) for m in loaded}
+        node.failures = 0
+        self._set_health(node, True)
+
+    def _set_health(self, node: OllamaNode, healthy: bool):
+        if node.healthy == healthy:
+            return
+        node.healthy = healthy
+        if self.on_capacity_change:
+            self.on_capacity_change(max(1, self.healthy_count()))
+
+    def stats(self) -> list[dict]:
+        return [n.to_dict() for n in self.nodes]
+
+
+pool = NodePool(OLLAMA_NODES, OLLAMA_NODE_MAX_FAILURES)
@@ -1,98 +1,362 @@
-import httpx
+import asyncio
+import hashlib
 import json
-from app.core.config import OLLAMA_BASE_URL
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from app.core.config import (
+    HEDGE_ENABLED, HEDGE_PERCENTILE, HEDGE_MIN_SAMPLES, HEDGE_DEFAULT_DELAY, HEDGE_MIN_DELAY, HEDGE_FALLBACK_MODELS,
+)
+from app.services import llm_cache, model_catalog, ollama_client
+from app.services.llm_metrics import record_hedge, record_timings
+from app.services.llm_scheduler import LLMQueueFull, current_caller, last_queue_wait
+from app.services.model_names import normalize_model, parse_model_map
+from app.services.ollama_nodes import pool
 
+_in_flight: dict[str, asyncio.Task] = {}
 
-async def query_ollama(prompt: str, model: str = "llama3", system: str = "", timeout: float = 120.0) -> str:
+
+async def _coalesce(key: str, factory) -> str:
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.create_task(factory())
+        _in_flight[key] = task
+
+        def _release(done: asyncio.Task):
+            if _in_flight.get(key) is done:
+                del _in_flight[key]
+        task.add_done_callback(_release)
+    return await asyncio.shield(task)
+
+
+async def _complete(path: str, payload: dict, op: str, timeout: float | None, cache_key: str | None) -> str:
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{OLLAMA_BASE_URL}/api/generate",
-                json={"model": model, "prompt": prompt, "system": system, "stream": False},
-                timeout=timeout,
-            )
-            if response.status_code == 200:
-                return response.json().get("response", "")
-            return f"Error: Ollama returned status {response.status_code}"
+        response = await ollama_client.post(path, payload, op=op, timeout=timeout)
+        if response.status_code == 200:
+            data = response.json()
+            if path == "/api/chat":
+                result = data.get("message", {}).get("content", "")
+            else:
+                result = data.get("response", "")
+            if cache_key:
+                await llm_cache.store_cached(cache_key, payload["model"], result)
+            return result
+        return f"Error: Ollama returned status {response.status_code}"
+    except LLMQueueFull as e:
+        return f"Error: {str(e)}"
     except Exception as e:
         return f"Error connecting to Ollama: {str(e)}"
 
 
-async def chat_ollama(messages: list[dict], model: str = "llama3", timeout: float = 120.0) -> str:
+async def _generate_once(path: str, payload: dict, op: str, timeout: float | None, cache_key: str | None) -> str:
+    flight_key = hashlib.sha256(json.dumps([path, payload], sort_keys=True, default=str).encode()).hexdigest()
+    return await _coalesce(flight_key, lambda: _complete(path, payload, op, timeout, cache_key))
+
+
+async def query_ollama(
+    prompt: str,
+    model: str = "llama3",
+    system: str = "",
+    timeout: float | None = None,
+    options: dict | None = None,
+    use_cache: bool = True,
+    format: str | None = None,
+) -> str:
+    key = None
+    if use_cache:
+        request = {"system": system, "prompt": prompt, "options": options}
+        if format:
+            request["format"] = format
+        key = await llm_cache.cache_key(model, request)
+        cached = await llm_cache.get_cached(key)
+        if cached is not None:
+            return cached
+
+    payload = {"model": model, "prompt": prompt, "system": system, "stream": False}
+    if options:
+        payload["options"] = options
+    if format:
+        payload["format"] = format
+    return await _generate_once("/api/generate", payload, "generate", timeout, key)
+
+
+async def chat_ollama(
+    messages: list[dict],
+    model: str = "llama3",
+    timeout: float | None = None,
+    options: dict | None = None,
+    use_cache: bool = True,
+) -> str:
+    key = None
+    if use_cache:
+        key = await llm_cache.cache_key(model, {"messages": messages, "options": options})
+        cached = await llm_cache.get_cached(key)
+        if cached is not None:
+            return cached
+
+    payload = {"model": model, "messages": messages, "stream": False}
+    if options:
+        payload["options"] = options
+    return await _generate_once("/api/chat", payload, "chat", timeout, key)
+
+
+async def stream_ollama(
+    prompt: str,
+    model: str = "llama3",
+    system: str = "",
+    priority: str | None = None,
+    user_id: int | None = None,
+    caller: str | None = None,
+):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{OLLAMA_BASE_URL}/api/chat",
-                json={"model": model, "messages": messages, "stream": False},
-                timeout=timeout,
-            )
-            if response.status_code == 200:
-                return response.json().get("message", {}).get("content", "")
-            return f"Error: Ollama returned status {response.status_code}"
+        async with hedged_stream(
+            "/api/generate",
+            {"model": model, "prompt": prompt, "system": system, "stream": True},
+            priority=priority, user_id=user_id, caller=caller,
+        ) as response:
+            async for line in response.aiter_lines():
+                if line:
+                    try:
+                        data = json.loads(line)
+                        if "response" in data:
+                            yield data["response"]
+                        if data.get("done"):
+                            record_timings(response.model, data, caller=caller, user_id=user_id, queue_wait=response.queue_wait)
+                    except json.JSONDecodeError:
+                        continue
     except Exception as e:
-        return f"Error connecting to Ollama: {str(e)}"
+        yield f"Error: {str(e)}"
 
 
-async def stream_ollama(prompt: str, model: str = "llama3", system: str = ""):
-    try:
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST",
-                f"{OLLAMA_BASE_URL}/api/generate",
-                json={"model": model, "prompt": prompt, "system": system, "stream": True},
-                timeout=120.0,
+_fallback_models = parse_model_map(HEDGE_FALLBACK_MODELS)
+_first_token: dict[str, deque] = {}
+
+
+def _observe_first_token(model: str, seconds: float):
+    _first_token.setdefault(normalize_model(model), deque(maxlen=500)).append(seconds)
+
+
+def hedge_delay(model: str) -> float:
+    """How long to wait for the first token before hedging: the configured
+    percentile of recent first-token times for this model."""
+    samples = _first_token.get(normalize_model(model))
+    if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * HEDGE_PERCENTILE / 100))
+    return max(HEDGE_MIN_DELAY, ordered[index])
+
+
+class _Attempt:
+    """One streaming request running in its own task, feeding its lines into
+    a queue so two attempts can be raced and the loser cancelled (which
+    closes its connection and frees its scheduler slot)."""
+
+    def __init__(self, path: str, payload: dict, op: str, priority: str | None, user_id: int | None, tried: set[str]):
+        self.model = payload["model"]
+        self.dispatched_at: float | None = None
+        self.queue_wait = 0.0
+        self.settled = asyncio.Event()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._run(path, payload, op, priority, user_id, tried))
+
+    def _dispatched(self):
+        # The slot was taken in this attempt's task, so its queue wait is only
+        # visible here and has to be carried back to the caller
+        self.queue_wait = last_queue_wait()
+        self.dispatched_at = time.monotonic()
+        self.settled.set()
+
+    async def _run(self, path, payload, op, priority, user_id, tried):
+        try:
+            async with ollama_client.stream(
+                path, payload, op=op, priority=priority, user_id=user_id, tried=tried, on_dispatch=self._dispatched,
             ) as response:
+                if response.status_code != 200:
+                    await self.queue.put(("status", response.status_code, await response.aread()))
+                    return
                 async for line in response.aiter_lines():
                     if line:
-                        try:
-                            data = json.loads(line)
-                            if "response" in data:
-                                yield data["response"]
-                        except json.JSONDecodeError:
-                            continue
-    except Exception as e:
-        yield f"Error: {str(e)}"
+                        await self.queue.put(("line", line))
+            await self.queue.put(("end",))
+        except Exception as e:
+            await self.queue.put(("error", e))
+        finally:
+            self.settled.set()
 
+    async def wait_dispatched(self, timeout: float) -> bool:
+        """Waits out the scheduler queue. False if the request is still
+        queued after `timeout` or ended without being sent."""
+        try:
+            await asyncio.wait_for(self.settled.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.dispatched_at is not None
 
-async def list_ollama_models() -> list[str]:
+    async def next(self, timeout: float | None = None):
+        if timeout is None:
+            return await self.queue.get()
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def observe(self):
+        """Records time to first token, measured from dispatch so scheduler
+        queueing does not inflate the hedge delay."""
+        if self.dispatched_at is not None:
+            _observe_first_token(self.model, time.monotonic() - self.dispatched_at)
+
+    def cancel(self):
+        self.task.cancel()
+
+
+class HedgedResponse:
+    """The subset of httpx.Response the streaming callers use, backed by
+    whichever attempt won. `model` is the model that actually answered and
+    `queue_wait` how long it waited for a scheduler slot."""
+
+    def __init__(self, attempt: _Attempt, first: tuple):
+        self.model = attempt.model
+        self.queue_wait = attempt.queue_wait
+        self._attempt = attempt
+        self._first = first
+        self.status_code = first[1] if first[0] == "status" else 200
+
+    async def aread(self) -> bytes:
+        return self._first[2] if self._first[0] == "status" else b""
+
+    async def aiter_lines(self):
+        item = self._first
+        while item[0] == "line":
+            yield item[1]
+            item = await self._attempt.next()
+        if item[0] == "error":
+            raise item[1]
+
+
+def _hedge_payload(payload: dict, tried: set[str]) -> dict | None:
+    """Another node only helps once the original has been sent to one: while
+    it is still queued a copy of the same model would join the same queue."""
+    if tried and any(n.healthy and n.url not in tried for n in pool.nodes):
+        return dict(payload)
+    fallback = _fallback_models.get(normalize_model(payload["model"]))
+    if fallback:
+        return {**payload, "model": fallback}
+    return None
+
+
+async def _race(primary: _Attempt, backup: _Attempt) -> tuple[_Attempt, tuple]:
+    """First attempt to produce a token wins. An attempt that fails first
+    only wins if the other one fails too."""
+    gets = {asyncio.create_task(a.queue.get()): a for a in (primary, backup)}
+    failed = None
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=10.0)
-            if response.status_code == 200:
-                return [m["name"] for m in response.json().get("models", [])]
-    except Exception:
-        pass
-    return []
+        while gets:
+            done, _ = await asyncio.wait(gets, return_when=asyncio.FIRST_COMPLETED)
+            for get in sorted(done, key=lambda t: t.result()[0] != "line"):
+                attempt, item = gets.pop(get), get.result()
+                if item[0] == "line":
+                    return attempt, item
+                failed = failed or (attempt, item)
+        return failed
+    finally:
+        for get in gets:
+            get.cancel()
 
 
-async def get_ollama_status() -> dict:
+@asynccontextmanager
+async def hedged_stream(
+    path: str,
+    payload: dict,
+    op: str = "stream",
+    priority: str | None = None,
+    user_id: int | None = None,
+    caller: str | None = None,
+    hedge: bool | None = None,
+):
+    """Like ollama_client.stream, but when hedging is on and the first token
+    is slower than the usual first-token time (HEDGE_PERCENTILE), a duplicate
+    goes to another node, or to the HEDGE_FALLBACK_MODELS model when there
+    is no other node or the original is still waiting in the scheduler
+    queue. The first to produce a token is used; the other is cancelled."""
+    hedge = HEDGE_ENABLED if hedge is None else hedge
+    caller = caller or current_caller()
+    tried: set[str] = set()
+    primary = _Attempt(path, payload, op, priority, user_id, tried)
+    attempts = [primary]
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{OLLAMA_BASE_URL}/api/tags", timeout=5.0)
-            if response.status_code == 200:
-                models = response.json().get("models", [])
-                return {"status": "connected", "models_count": len(models)}
-    except Exception:
-        pass
-    return {"status": "disconnected", "models_count": 0}
+        winner, first = primary, None
+        if hedge:
+            deadline = time.monotonic() + hedge_delay(primary.model)
+            if await primary.wait_dispatched(deadline - time.monotonic()):
+                first = await primary.next(max(deadline - time.monotonic(), 0.0))
+            elif not primary.queue.empty():
+                first = primary.queue.get_nowait()
+            backup_payload = _hedge_payload(payload, tried) if first is None else None
+            if backup_payload is not None:
+                backup = _Attempt(path, backup_payload, op, priority, user_id, tried)
+                attempts.append(backup)
+                winner, first = await _race(primary, backup)
+                if winner is backup:
+                    primary.cancel()
+                    primary.observe()
+                else:
+                    backup.cancel()
+            record_hedge(primary.model, caller, fired=backup_payload is not None, won=winner is not primary)
+        if first is None:
+            first = await primary.next()
+        if winner is primary and first[0] == "line":
+            primary.observe()
+        if first[0] == "error":
+            raise first[1]
+        yield HedgedResponse(winner, first)
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
 
 
-async def auto_select_model(task_type: str) -> str:
-    models = await list_ollama_models()
-    if not models:
-        return "llama3"
-
-    model_names_lower = [m.lower() for m in models]
-    preference_map = {
-        "code": ["codellama", "deepseek-coder", "starcoder", "codegemma", "qwen2.5-coder"],
-        "security": ["llama3", "mixtral", "mistral", "gemma2"],
-        "analysis": ["llama3", "mixtral", "mistral", "phi3"],
-        "general": ["llama3", "mixtral", "mistral", "gemma2"],
+async def hedged_complete(
+    path: str,
+    payload: dict,
+    op: str = "chat",
+    priority: str | None = None,
+    user_id: int | None = None,
+    caller: str | None = None,
+) -> tuple[int, dict | str]:
+    """Non-streaming call built on hedged_stream. Returns (status, body) with
+    the body shaped like Ollama's non-streaming response."""
+    async with hedged_stream(path, {**payload, "stream": True}, op, priority, user_id, caller) as response:
+        if response.status_code != 200:
+            return response.status_code, (await response.aread()).decode(errors="replace")
+        parts, final = [], {}
+        async for line in response.aiter_lines():
+            data = json.loads(line)
+            parts.append(data.get("message", {}).get("content", "") if path == "/api/chat" else data.get("response", ""))
+            if data.get("done"):
+                final = data
+                record_timings(response.model, data, caller=caller, user_id=user_id, queue_wait=response.queue_wait)
+                break
+    content = "".join(parts)
+    if path == "/api/chat":
+        final["message"] = {"role": "assistant", "content": content}
+    else:
+        final["response"] = content
+    final["model"] = response.model
+    return 200, final
+
+
+async def list_ollama_models() -> list[str]:
+    return await model_catalog.get_model_names()
+
+
+async def get_ollama_status() -> dict:
+    status = await model_catalog.get_status()
+    return {
+        "status": "connected" if status["online"] else "disconnected",
+        "models_count": status["models_count"],
     }
 
-    preferences = preference_map.get(task_type, preference_map["general"])
-    for pref in preferences:
-        for i, name in enumerate(model_names_lower):
-            if pref in name:
-                return models[i]
-    return models[0]
+
+async def auto_select_model(task_type: str) -> str:
+    return await model_catalog.resolve_model(task_type)
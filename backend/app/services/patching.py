@@ -0,0 +1,47 @@
+import re
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    pass
+
+
+def _parse_hunks(diff: str) -> list[dict]:
+    hunks, current = [], None
+    for line in diff.splitlines():
+        match = HUNK_HEADER.match(line)
+        if match:
+            current = {"start": int(match.group(1)), "lines": []}
+            hunks.append(current)
+        elif current is not None and line[:1] in (" ", "-", "+"):
+            current["lines"].append(line)
+        elif current is not None and line == "":
+            current["lines"].append(" ")
+    if not hunks:
+        raise PatchError("diff has no hunks")
+    return hunks
+
+
+def _find(lines: list[str], expected: list[str], hint: int) -> int:
+    """Locate the hunk's old lines, preferring the header position and then
+    searching outward so slightly stale line numbers still apply."""
+    if not expected:
+        return min(max(hint, 0), len(lines))
+    for offset in range(0, len(lines) + 1):
+        for pos in (hint + offset, hint - offset):
+            if 0 <= pos <= len(lines) - len(expected) and lines[pos:pos + len(expected)] == expected:
+                return pos
+    raise PatchError(f"hunk context not found near line {hint + 1}")
+
+
+def apply_unified_diff(original: str, diff: str) -> str:
+    lines = original.splitlines()
+    shift = 0
+    for hunk in _parse_hunks(diff):
+        old = [l[1:] for l in hunk["lines"] if l[0] in (" ", "-")]
+        new = [l[1:] for l in hunk["lines"] if l[0] in (" ", "+")]
+        pos = _find(lines, old, hunk["start"] - 1 + shift)
+        lines[pos:pos + len(old)] = new
+        shift += len(new) - len(old)
+    return "\n".join(lines) + ("\n" if original.endswith("\n") or not original else "")
@@ -0,0 +1,129 @@
+import re
+import aiosqlite
+from app.core.config import DB_PATH
+
+SNIPPET_TOKENS = 16
+PREFIX_COMPLETIONS = 32
+
+SOURCES = {
+    "chat": {
+        "fts": "chat_messages_fts",
+        "vocab": "chat_messages_terms_vocab",
+        "table": "chat_messages",
+        "fields": "t.session_id AS session_id, t.role AS role, NULL AS context_key",
+    },
+    "memory": {
+        "fts": "memory_store_fts",
+        "vocab": "memory_store_terms_vocab",
+        "table": "memory_store",
+        "fields": "NULL AS session_id, NULL AS role, t.context_key AS context_key",
+    },
+}
+
+
+def build_match(query: str, prefix: bool = True, completions: list[str] | tuple = ()) -> str:
+    """Turn free text into an FTS5 expression: every term quoted (so user
+    input can't inject FTS syntax) and ANDed, with the last term prefix-matched.
+    `completions` are whole words the last term may be the start of; the
+    stemmed index only prefix-matches stems, so "runn" needs "running"."""
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return ""
+    quoted = [f'"{t}"' for t in terms]
+    if prefix:
+        quoted[-1] = " OR ".join([quoted[-1] + "*", *(f'"{word}"' for word in completions)])
+        if completions:
+            quoted[-1] = f"({quoted[-1]})"
+    return " AND ".join(quoted)
+
+
+async def _completions(db: aiosqlite.Connection, sources: list[str], query: str) -> list[str]:
+    """The most common indexed words starting with the last query term, read
+    from the unstemmed vocabulary (a range scan, not a table scan)."""
+    terms = re.findall(r"\w+", query.lower())
+    if not terms:
+        return []
+    start = terms[-1]
+    end = start[:-1] + chr(ord(start[-1]) + 1)
+    words: set[str] = set()
+    for source in sources:
+        cursor = await db.execute(
+            f"SELECT term FROM {SOURCES[source]['vocab']} WHERE term > ? AND term < ? ORDER BY doc DESC LIMIT ?",
+            (start, end, PREFIX_COMPLETIONS),
+        )
+        words.update(row[0] for row in await cursor.fetchall())
+    return sorted(words)
+
+
+def _scoped_match(terms: str, user_id: int, session_id: str | None = None) -> str:
+    """Scope the terms to the content column and AND in the user (and
+    session) tokens, so FTS intersects posting lists instead of ranking every
+    user's matches and filtering afterwards."""
+    match = f'content : ({terms}) AND user_id : "{int(user_id)}"'
+    if session_id:
+        match += ' AND session_id : "' + session_id.replace('"', '""') + '"'
+    return match
+
+
+def _source_query(source: str, user_id: int, terms: str, session_id: str | None) -> tuple[str, list]:
+    spec = SOURCES[source]
+    fts = spec["fts"]
+    sql = f"""
+        SELECT '{source}' AS source, t.id AS id, {spec['fields']}, t.created_at AS created_at,
+               snippet({fts}, 0, '[', ']', '...', {SNIPPET_TOKENS}) AS snippet,
+               bm25({fts}, 1.0, 0.0, 0.0) AS rank
+        FROM {fts} CROSS JOIN {spec['table']} t ON t.id = {fts}.rowid
+        WHERE {fts} MATCH ? AND t.user_id = ?"""
+    session_id = session_id if source == "chat" else None
+    params = [_scoped_match(terms, user_id, session_id), user_id]
+    if session_id:
+        sql += " AND t.session_id = ?"
+        params.append(session_id)
+    return sql, params
+
+
+async def search_text(
+    user_id: int,
+    query: str,
+    scope: str = "all",
+    limit: int = 20,
+    offset: int = 0,
+    session_id: str | None = None,
+) -> dict:
+    sources = list(SOURCES) if scope == "all" else [scope]
+    if not build_match(query):
+        return {"query": query, "scope": scope, "total": 0, "limit": limit, "offset": offset, "results": []}
+
+    async with aiosqlite.connect(DB_PATH) as db:
+        db.row_factory = aiosqlite.Row
+        terms = build_match(query, completions=await _completions(db, sources, query))
+        parts, params = [], []
+        for source in sources:
+            sql, extra = _source_query(source, user_id, terms, session_id)
+            parts.append(sql)
+            params.extend(extra)
+        union = " UNION ALL ".join(parts)
+        cursor = await db.execute(f"SELECT COUNT(*) FROM ({union})", params)
+        total = (await cursor.fetchone())[0]
+        cursor = await db.execute(
+            f"SELECT * FROM ({union}) ORDER BY rank, created_at DESC LIMIT ? OFFSET ?",
+            (*params, limit, offset),
+        )
+        rows = [dict(r) for r in await cursor.fetchall()]
+
+    for row in rows:
+        row["score"] = round(-row.pop("rank"), 4)
+    return {"query": query, "scope": scope, "total": total, "limit": limit, "offset": offset, "results": rows}
+
+
+async def search_ids(source: str, user_id: int, query: str, limit: int) -> list[int]:
+    if not build_match(query):
+        return []
+    fts = SOURCES[source]["fts"]
+    async with aiosqlite.connect(DB_PATH) as db:
+        terms = build_match(query, completions=await _completions(db, [source], query))
+        cursor = await db.execute(
+            f"SELECT rowid FROM {fts} WHERE {fts} MATCH ? ORDER BY bm25({fts}, 1.0, 0.0, 0.0) LIMIT ?",
+            (_scoped_match(terms, user_id), limit),
+        )
+        return [row[0] for row in await cursor.fetchall()]
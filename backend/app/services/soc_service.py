@@ -1,9 +1,16 @@
+import asyncio
 import json
 from datetime import datetime
+import aiosqlite
+from app.core.config import DB_PATH
 from app.services.ollama_service import query_ollama
+from app.services.llm_scheduler import llm_context
+
+ANALYSIS_FIELDS = ("analysis", "analysis_model", "analyzed_at")
 
 
 async def analyze_soc_event(event_data: dict, model: str = "llama3") -> dict:
+    event_data = {k: v for k, v in event_data.items() if k not in ANALYSIS_FIELDS}
     prompt = f"""Analyze this security event and provide:
 1. Threat classification
 2. Severity assessment (Critical/High/Medium/Low/Info)
@@ -24,6 +31,37 @@ Event data:
     }
 
 
+async def save_event_analysis(event_id: int, result: dict, model: str):
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.execute(
+            "UPDATE soc_events SET analysis = ?, analysis_model = ?, analyzed_at = ? WHERE id = ?",
+            (result["analysis"], model, result["analyzed_at"], event_id),
+        )
+        await db.commit()
+
+
+async def analyze_soc_events_batch(
+    events: list[dict], model: str = "llama3", concurrency: int = 4, user_id: int | None = None,
+):
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(event: dict) -> dict:
+        async with semaphore:
+            with llm_context(priority="soc", user_id=user_id, caller="soc_batch"):
+                result = await analyze_soc_event(event, model)
+        if not result["analysis"].startswith("Error"):
+            await save_event_analysis(event["id"], result, model)
+        return {"event_id": event["id"], "cached": False, **result}
+
+    pending = [asyncio.create_task(run(event)) for event in events]
+    try:
+        for finished in asyncio.as_completed(pending):
+            yield await finished
+    finally:
+        for task in pending:
+            task.cancel()
+
+
 async def get_soc_dashboard_stats(db) -> dict:
     cursor = await db.execute(
         "SELECT severity, COUNT(*) as count FROM soc_events GROUP BY severity"
@@ -0,0 +1,114 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import shutil
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.core.config import TESTER_WORKERS, TESTER_CACHE_ENTRIES
+
+PYTHON_EXTENSIONS = {".py"}
+NODE_EXTENSIONS = {".js", ".mjs", ".cjs"}
+SCRIPT_EXTENSIONS = {".js", ".ts", ".jsx", ".tsx", ".mjs", ".cjs"}
+NODE_TIMEOUT = 30
+
+_pool: ProcessPoolExecutor | None = None
+_cache: OrderedDict[str, dict] = OrderedDict()
+_stats = {"hits": 0, "misses": 0}
+
+
+def _compile_python(source: bytes, filename: str) -> str | None:
+    try:
+        compile(source, filename, "exec", dont_inherit=True)
+        return None
+    except SyntaxError as e:
+        return f"{type(e).__name__}: {e.msg} ({filename}, line {e.lineno})"
+    except (ValueError, UnicodeDecodeError) as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=TESTER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _compile_in_pool(source: bytes, filename: str) -> str | None:
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_get_pool(), _compile_python, source, filename)
+    except BrokenProcessPool:
+        shutdown_pool()
+        return await asyncio.to_thread(_compile_python, source, filename)
+
+
+async def _check_node(full_path: str) -> str | None:
+    proc = await asyncio.create_subprocess_exec(
+        "node", "--check", full_path,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(proc.communicate(), timeout=NODE_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        return "Syntax check timed out"
+    if proc.returncode == 0:
+        return None
+    lines = [
+        line for line in stderr.decode(errors="replace").splitlines()
+        if line.strip() and not line.startswith("    at ") and not line.startswith("Node.js v")
+    ]
+    return "\n".join(lines) or "node --check failed"
+
+
+async def check_file(full_path: str, rel_path: str) -> dict:
+    """Syntax-check one file, reusing the cached verdict when the same path
+    was already checked with identical content."""
+    ext = os.path.splitext(rel_path)[1].lower()
+    if ext not in PYTHON_EXTENSIONS | SCRIPT_EXTENSIONS:
+        return {"file": rel_path, "status": "skipped", "errors": []}
+    try:
+        source = await asyncio.to_thread(_read, full_path)
+    except OSError as e:
+        return {"file": rel_path, "status": "error", "errors": [str(e)]}
+
+    key = hashlib.sha256(rel_path.encode() + b"\0" + source).hexdigest()
+    if key in _cache:
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        return {**_cache[key], "cached": True}
+    _stats["misses"] += 1
+
+    if not source.strip():
+        error = "Empty file"
+    elif ext in PYTHON_EXTENSIONS:
+        error = await _compile_in_pool(source, rel_path)
+    elif ext in NODE_EXTENSIONS and shutil.which("node"):
+        error = await _check_node(full_path)
+    else:
+        error = None
+
+    result = {"file": rel_path, "status": "error" if error else "passed", "errors": [error] if error else []}
+    _cache[key] = result
+    while len(_cache) > TESTER_CACHE_ENTRIES:
+        _cache.popitem(last=False)
+    return {**result, "cached": False}
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def cache_stats() -> dict:
+    return {**_stats, "entries": len(_cache)}
@@ -0,0 +1,88 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+CANCELLED = "cancelled by user"
+
+_budget: ContextVar["TaskBudget | None"] = ContextVar("task_budget", default=None)
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class TaskBudget:
+    """Wall-clock and token limits for one agent task.
+
+    Exhausting either limit, or calling `cancel`, cancels the bound asyncio
+    task outright so in-flight LLM requests, subprocesses and their scheduler
+    slots are released at once. `reason` records why."""
+
+    def __init__(self, seconds: float | None = None, tokens: int | None = None):
+        self.deadline = time.monotonic() + seconds if seconds else None
+        self.token_limit = tokens or None
+        self.tokens_used = 0
+        self.reason: str | None = None
+        self._task: asyncio.Task | None = None
+        self._timer: asyncio.TimerHandle | None = None
+
+    def bind(self, task: asyncio.Task):
+        self._task = task
+        if self.deadline is not None:
+            self._timer = asyncio.get_running_loop().call_later(
+                max(0.0, self.deadline - time.monotonic()), self.cancel, "time budget exceeded"
+            )
+        task.add_done_callback(lambda _: self._timer and self._timer.cancel())
+
+    def cancel(self, reason: str | None = CANCELLED):
+        if self.reason is None:
+            self.reason = reason
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def remaining_seconds(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def remaining_tokens(self) -> int | None:
+        if self.token_limit is None:
+            return None
+        return max(0, self.token_limit - self.tokens_used)
+
+    def charge(self, tokens: int):
+        self.tokens_used += tokens
+        if self.token_limit is not None and self.tokens_used >= self.token_limit:
+            self.cancel("token budget exceeded")
+
+    def check(self):
+        if self.reason is None and self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel("time budget exceeded")
+        if self.reason is None and self.remaining_tokens() == 0:
+            self.cancel("token budget exceeded")
+        if self.reason is not None:
+            raise BudgetExceeded(self.reason)
+
+    def limit_timeout(self, timeout: float) -> float:
+        remaining = self.remaining_seconds()
+        return timeout if remaining is None else max(0.1, min(timeout, remaining))
+
+
+@contextmanager
+def task_budget(budget: TaskBudget | None):
+    token = _budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _budget.reset(token)
+
+
+def current_budget() -> TaskBudget | None:
+    return _budget.get()
+
+
+def check_budget():
+    budget = _budget.get()
+    if budget is not None:
+        budget.check()
@@ -0,0 +1,48 @@
+import hashlib
+import aiosqlite
+from app.core.config import DB_PATH
+from app.services.model_names import normalize_model
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(text.strip().encode()).hexdigest()
+
+
+async def lookup(texts: list[str], target_lang: str, model: str) -> dict[str, str]:
+    """Return {source text: translation} for every text already in memory."""
+    by_hash = {source_hash(t): t for t in texts}
+    if not by_hash:
+        return {}
+    found = {}
+    hashes = list(by_hash)
+    async with aiosqlite.connect(DB_PATH) as db:
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = await db.execute(
+                f"SELECT source_hash, translation FROM translation_memory "
+                f"WHERE target_lang = ? AND model = ? AND source_hash IN ({placeholders})",
+                (target_lang, normalize_model(model), *chunk),
+            )
+            for digest, translation in await cursor.fetchall():
+                found[by_hash[digest]] = translation
+            await db.execute(
+                f"UPDATE translation_memory SET hits = hits + 1 "
+                f"WHERE target_lang = ? AND model = ? AND source_hash IN ({placeholders})",
+                (target_lang, normalize_model(model), *chunk),
+            )
+        await db.commit()
+    return found
+
+
+async def store(pairs: dict[str, str], target_lang: str, model: str):
+    if not pairs:
+        return
+    async with aiosqlite.connect(DB_PATH) as db:
+        await db.executemany(
+            """INSERT INTO translation_memory (source_hash, target_lang, model, source_text, translation)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (source_hash, target_lang, model) DO UPDATE SET translation = excluded.translation""",
+            [(source_hash(src), target_lang, normalize_model(model), src, dst) for src, dst in pairs.items()],
+        )
+        await db.commit()
@@ -0,0 +1,204 @@
+import json
+import os
+import shutil
+import threading
+import numpy as np
+from app.core.config import MEMORY_INDEX_DIR, MEMORY_ANN_MIN_ROWS, MEMORY_ANN_PROBES
+
+MIN_CAPACITY = 1024
+TRAIN_SAMPLE = 50000
+TRAIN_ITERATIONS = 10
+ASSIGN_CHUNK = 65536
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class VectorShard:
+    """Per-user embedding matrix kept as float32 memmaps on disk.
+
+    Rows are unit-normalised so cosine similarity is a plain dot product. Row
+    ``i`` of ``vectors`` belongs to memory_store id ``ids[i]`` (-1 once removed),
+    and ``str(i)`` is what memory_store.embedding_id points at. Large shards get
+    a coarse k-means partition (IVF) for approximate search. Training and
+    search run in worker threads, so ``centroids`` and ``lists`` are only
+    replaced or read together under ``_ivf_lock``."""
+
+    def __init__(self, path: str, dim: int, model: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            self.meta = {"dim": dim, "model": model, "count": 0, "capacity": 0, "trained_count": 0}
+        self.dim = self.meta["dim"]
+        self.centroids: np.ndarray | None = None
+        self.lists: list[np.ndarray] = []
+        self._ivf_lock = threading.Lock()
+        self._open(max(self.meta["capacity"], MIN_CAPACITY))
+        if self.meta["trained_count"] and os.path.exists(self._file("centroids.npy")):
+            self.centroids = np.load(self._file("centroids.npy"))
+            self.lists = self._build_lists(len(self.centroids))
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _map(self, name: str, dtype, shape: tuple, fill=0):
+        path = self._file(name)
+        size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        existing = os.path.getsize(path) if os.path.exists(path) else 0
+        if existing < size:
+            with open(path, "ab") as f:
+                f.truncate(size)
+            mapped = np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+            if fill:
+                mapped[existing // np.dtype(dtype).itemsize:] = fill
+            return mapped
+        return np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+
+    def _open(self, capacity: int):
+        self.vectors = self._map("vectors.f32", np.float32, (capacity, self.dim))
+        self.ids = self._map("ids.i64", np.int64, (capacity,), fill=-1)
+        self.assign = self._map("assign.i32", np.int32, (capacity,), fill=-1)
+        self.meta["capacity"] = capacity
+
+    def _save_meta(self):
+        with open(self._file("meta.json"), "w") as f:
+            json.dump(self.meta, f)
+
+    @property
+    def count(self) -> int:
+        return self.meta["count"]
+
+    @property
+    def model(self) -> str:
+        return self.meta["model"]
+
+    def live_count(self) -> int:
+        return int(np.count_nonzero(self.ids[:self.count] >= 0))
+
+    def upsert(self, memory_id: int, vector, embedding_id: str | None = None) -> str:
+        vec = _normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+        if vec.shape[0] != self.dim:
+            raise ValueError(f"embedding dimension {vec.shape[0]} does not match index dimension {self.dim}")
+        row = int(embedding_id) if embedding_id not in (None, "") else -1
+        if not 0 <= row < self.count:
+            row = self.count
+            if row >= self.meta["capacity"]:
+                self.flush()
+                self._open(self.meta["capacity"] * 2)
+            self.meta["count"] = row + 1
+        self.vectors[row] = vec
+        self.ids[row] = memory_id
+        if self.centroids is not None:
+            self._assign_row(row, vec)
+        self._save_meta()
+        return str(row)
+
+    def remove(self, embedding_id: str):
+        row = int(embedding_id)
+        if 0 <= row < self.count:
+            self.ids[row] = -1
+            self.vectors[row] = 0.0
+
+    def flush(self):
+        self.vectors.flush()
+        self.ids.flush()
+        self.assign.flush()
+        self._save_meta()
+
+    def needs_training(self) -> bool:
+        return self.count >= MEMORY_ANN_MIN_ROWS and self.count >= 2 * self.meta["trained_count"]
+
+    def train(self):
+        live = np.flatnonzero(self.ids[:self.count] >= 0)
+        if len(live) == 0:
+            return
+        nlist = int(min(4096, max(16, np.sqrt(len(live)))))
+        rng = np.random.default_rng(0)
+        sample = self.vectors[np.sort(rng.choice(live, min(len(live), TRAIN_SAMPLE), replace=False))]
+        centroids = sample[rng.choice(len(sample), min(nlist, len(sample)), replace=False)].copy()
+        for _ in range(TRAIN_ITERATIONS):
+            nearest = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            filled = np.bincount(nearest, minlength=len(centroids)) > 0
+            centroids[filled] = _normalize(sums[filled])
+        for start in range(0, self.count, ASSIGN_CHUNK):
+            block = self.vectors[start:start + ASSIGN_CHUNK]
+            self.assign[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        self.assign[:self.count][self.ids[:self.count] < 0] = -1
+        np.save(self._file("centroids.npy"), centroids)
+        lists = self._build_lists(len(centroids))
+        with self._ivf_lock:
+            self.centroids, self.lists = centroids, lists
+        self.meta["trained_count"] = self.count
+        self.flush()
+
+    def _build_lists(self, nlist: int) -> list[np.ndarray]:
+        assign = np.asarray(self.assign[:self.count])
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        return [order[bounds[i]:bounds[i + 1]] for i in range(nlist)]
+
+    def _assign_row(self, row: int, vec: np.ndarray):
+        previous = int(self.assign[row])
+        cluster = int(np.argmax(self.centroids @ vec))
+        self.assign[row] = cluster
+        if previous == cluster:
+            return
+        with self._ivf_lock:
+            if previous >= 0:
+                self.lists[previous] = self.lists[previous][self.lists[previous] != row]
+            self.lists[cluster] = np.append(self.lists[cluster], row)
+
+    def search(self, vector, k: int = 10, approximate: bool | None = None) -> list[tuple[int, float]]:
+        if not self.count:
+            return []
+        query = _normalize(np.asarray(vector, dtype=np.float32).reshape(-1))
+        with self._ivf_lock:
+            centroids, lists = self.centroids, self.lists
+        if approximate is None:
+            approximate = centroids is not None and self.count >= MEMORY_ANN_MIN_ROWS
+        if approximate and centroids is not None:
+            probes = np.argsort(centroids @ query)[::-1][:MEMORY_ANN_PROBES]
+            rows = np.concatenate([lists[p] for p in probes]) if len(probes) else np.empty(0, dtype=np.int64)
+            rows = np.sort(rows)
+            scores = self.vectors[rows] @ query
+        else:
+            rows = np.arange(self.count)
+            scores = self.vectors[:self.count] @ query
+        ids = self.ids[rows]
+        scores = np.where(ids >= 0, scores, -np.inf)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top if scores[i] > -np.inf]
+
+
+_shards: dict[int, VectorShard] = {}
+
+
+def _shard_path(user_id: int) -> str:
+    return os.path.join(MEMORY_INDEX_DIR, f"user_{user_id}")
+
+
+def get_shard(user_id: int, dim: int | None = None, model: str = "") -> VectorShard | None:
+    shard = _shards.get(user_id)
+    if shard is None:
+        if dim is None and not os.path.exists(os.path.join(_shard_path(user_id), "meta.json")):
+            return None
+        shard = VectorShard(_shard_path(user_id), dim or 0, model)
+        _shards[user_id] = shard
+    return shard
+
+
+def drop_shard(user_id: int):
+    _shards.pop(user_id, None)
+    shutil.rmtree(_shard_path(user_id), ignore_errors=True)
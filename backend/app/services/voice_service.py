@@ -1,8 +1,15 @@
 import base64
 import io
 import json
+import asyncio
 import re
-from app.services.ollama_service import query_ollama
+import time
+from app.services import translation_memory
+from app.services.ollama_service import query_ollama, stream_ollama
+
+DETECT_SAMPLE_CHARS = 200
+MIN_CHUNK_CHARS = 12
+MAX_CHUNK_CHARS = 160
 
 
 HINDI_SYSTEM_PROMPT = """You are RudraX AI, a cybersecurity assistant. 
@@ -11,20 +18,25 @@ If the user writes in Hindi or Hinglish, respond in the same language.
 You are an expert in cybersecurity, networking, ethical hacking, and IT security training."""
 
 HINGLISH_PATTERNS = [
-    r'\b(kya|kaise|karo|hai|hain|mein|yeh|woh|kuch|nahi|bhi|aur|se|ko|ka|ki|ke)\b',
-    r'\b(bhai|yaar|accha|theek|chalo|dekho|batao|samjho)\b',
+    re.compile(r'\b(kya|kaise|karo|hai|hain|mein|yeh|woh|kuch|nahi|bhi|aur|se|ko|ka|ki|ke)\b'),
+    re.compile(r'\b(bhai|yaar|accha|theek|chalo|dekho|batao|samjho)\b'),
 ]
+DEVANAGARI = re.compile(r'[\u0900-\u097F]')
+
+SENTENCE_END = re.compile(r'[.!?\u0964\u0965]+["\')\]]*\s+|\n+')
+CLAUSE_BREAK = re.compile(r'[,;:\u2014]\s+')
 
 
-def detect_language(text: str) -> str:
-    hindi_chars = len(re.findall(r'[\u0900-\u097F]', text))
+def detect_language(text: str, sample_chars: int = DETECT_SAMPLE_CHARS) -> str:
+    text = text[:sample_chars]
+    hindi_chars = len(DEVANAGARI.findall(text))
     total_chars = len(text.strip())
     if total_chars == 0:
         return "en"
     if hindi_chars / total_chars > 0.3:
         return "hi"
     hinglish_matches = sum(
-        len(re.findall(pattern, text.lower())) for pattern in HINGLISH_PATTERNS
+        len(pattern.findall(text.lower())) for pattern in HINGLISH_PATTERNS
     )
     if hinglish_matches >= 2:
         return "hinglish"
@@ -61,8 +73,162 @@ async def process_voice_text(
     }
 
 
-async def translate_text(text: str, target_lang: str, model: str = "llama3") -> str:
-    lang_names = {"hi": "Hindi", "en": "English", "hinglish": "Hinglish"}
-    target = lang_names.get(target_lang, "English")
+class SentenceChunker:
+    """Buffers streamed tokens and releases sentence-sized pieces, falling
+    back to clause or word boundaries when a sentence runs long."""
+
+    def __init__(self, min_chars: int = MIN_CHUNK_CHARS, max_chars: int = MAX_CHUNK_CHARS):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def feed(self, token: str) -> list[str]:
+        self.buffer += token
+        chunks = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                return chunks
+            chunk, self.buffer = self.buffer[:cut].strip(), self.buffer[cut:]
+            if chunk:
+                chunks.append(chunk)
+
+    def _find_cut(self) -> int | None:
+        for match in SENTENCE_END.finditer(self.buffer):
+            if match.end() >= self.min_chars:
+                return match.end()
+        if len(self.buffer) < self.max_chars:
+            return None
+        window = self.buffer[:self.max_chars]
+        clauses = [m.end() for m in CLAUSE_BREAK.finditer(window) if m.end() >= self.min_chars]
+        if clauses:
+            return clauses[-1]
+        space = window.rfind(" ")
+        return space + 1 if space >= self.min_chars else self.max_chars
+
+    def flush(self) -> str:
+        chunk, self.buffer = self.buffer.strip(), ""
+        return chunk
+
+
+async def stream_voice_text(
+    text: str,
+    model: str = "llama3",
+    context: str = "cybersecurity",
+    force_language: str | None = None,
+    user_id: int | None = None,
+):
+    started = time.perf_counter()
+    lang = force_language or detect_language(text)
+    system_prompt = get_system_prompt_for_language(lang, context)
+    yield {"detected_language": lang, "model": model}
+
+    chunker = SentenceChunker()
+    parts: list[str] = []
+    first_chunk_ms = None
+    index = 0
+    async for token in stream_ollama(
+        text, model=model, system=system_prompt,
+        priority="interactive", user_id=user_id, caller="voice_stream",
+    ):
+        parts.append(token)
+        for chunk in chunker.feed(token):
+            if first_chunk_ms is None:
+                first_chunk_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield {"chunk": chunk, "index": index}
+            index += 1
+    tail = chunker.flush()
+    if tail:
+        if first_chunk_ms is None:
+            first_chunk_ms = round((time.perf_counter() - started) * 1000, 1)
+        yield {"chunk": tail, "index": index}
+    yield {
+        "done": True,
+        "response": "".join(parts),
+        "time_to_first_chunk_ms": first_chunk_ms,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+LANGUAGE_NAMES = {"hi": "Hindi", "en": "English", "hinglish": "Hinglish"}
+
+BATCH_MAX_SEGMENTS = 40
+BATCH_MAX_CHARS = 3000
+
+
+async def _translate_one(text: str, target: str, model: str) -> str:
     prompt = f"Translate the following text to {target}. Only output the translation, nothing else:\n\n{text}"
-    return await query_ollama(prompt, model=model)
+    return await query_ollama(prompt, model=model, use_cache=False)
+
+
+async def translate_text(text: str, target_lang: str, model: str = "llama3") -> str:
+    cached = await translation_memory.lookup([text], target_lang, model)
+    if text in cached:
+        return cached[text]
+    translated = await _translate_one(text, LANGUAGE_NAMES.get(target_lang, "English"), model)
+    if not translated.startswith("Error"):
+        await translation_memory.store({text: translated}, target_lang, model)
+    return translated
+
+
+def _pack(segments: list[str]) -> list[list[str]]:
+    packs, current, size = [], [], 0
+    for segment in segments:
+        if current and (len(current) >= BATCH_MAX_SEGMENTS or size + len(segment) > BATCH_MAX_CHARS):
+            packs.append(current)
+            current, size = [], 0
+        current.append(segment)
+        size += len(segment)
+    if current:
+        packs.append(current)
+    return packs
+
+
+async def _translate_pack(pack: list[str], target: str, model: str) -> dict[str, str]:
+    """Translate a pack of segments with one JSON-mode prompt. Each segment is
+    sent with a numeric id and must come back under the same id, so the
+    output can be split without guessing at line breaks. Anything missing or
+    malformed is retried one segment at a time."""
+    items = [{"id": i, "text": segment} for i, segment in enumerate(pack)]
+    prompt = (
+        f"Translate the \"text\" of every item to {target}. "
+        'Reply with JSON of the form {"translations": [{"id": <same id>, "text": "<translation>"}]}, '
+        "one entry per input item, keeping ids unchanged.\n\n"
+        + json.dumps({"items": items}, ensure_ascii=False)
+    )
+    results: dict[str, str] = {}
+    raw = await query_ollama(prompt, model=model, use_cache=False, format="json")
+    try:
+        for entry in json.loads(raw).get("translations", []):
+            i = entry.get("id")
+            if isinstance(i, int) and 0 <= i < len(pack) and isinstance(entry.get("text"), str) and entry["text"].strip():
+                results[pack[i]] = entry["text"].strip()
+    except (ValueError, AttributeError):
+        pass
+
+    missing = [segment for segment in pack if segment not in results]
+    if missing:
+        singles = await asyncio.gather(*(_translate_one(segment, target, model) for segment in missing))
+        results.update({src: dst for src, dst in zip(missing, singles) if not dst.startswith("Error")})
+    return results
+
+
+async def translate_batch(segments: list[str], target_lang: str, model: str = "llama3") -> dict:
+    target = LANGUAGE_NAMES.get(target_lang, "English")
+    unique = list(dict.fromkeys(s.strip() for s in segments if s.strip()))
+    known = await translation_memory.lookup(unique, target_lang, model)
+    pending = [s for s in unique if s not in known]
+
+    fresh: dict[str, str] = {}
+    for result in await asyncio.gather(*(_translate_pack(pack, target, model) for pack in _pack(pending))):
+        fresh.update(result)
+    await translation_memory.store(fresh, target_lang, model)
+
+    translated = {**known, **fresh}
+    return {
+        "translations": [translated.get(s.strip(), s) if s.strip() else s for s in segments],
+        "target_language": target_lang,
+        "cached": len(known),
+        "translated": len(fresh),
+        "failed": len(pending) - len(fresh),
+    }
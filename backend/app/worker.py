@@ -0,0 +1,265 @@
+"""Agent job worker.
+
+Run with `python -m app.worker`. Claims orchestrator jobs from the job queue
+(SQLite by default, Redis when REDIS_URL is set) and runs up to
+AGENT_WORKER_CONCURRENCY of them at once, keeping the API processes free of
+long-running agent work."""
+import asyncio
+import os
+import signal
+import socket
+import sys
+import time
+from app.core.config import (
+    AGENT_WORKER_CONCURRENCY, AGENT_TASK_TIME_BUDGET, AGENT_TASK_TOKEN_BUDGET,
+    JOB_VISIBILITY_TIMEOUT, JOB_RETRY_BACKOFF, JOB_POLL_INTERVAL, JOB_CANCEL_POLL,
+)
+from app.core.database import init_db
+from app.agents.orchestrator import AgentOrchestrator
+from app.services import job_queue, log_sink, model_catalog, ollama_client, syntax_check
+from app.services.task_budget import CANCELLED, TaskBudget, task_budget
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+running: dict[int, TaskBudget] = {}
+
+# Orchestrator events carrying one of these in "status" end the task for clients
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+
+
+def _event_callback(user_id: int, task_id: int):
+    async def log_callback(msg: dict):
+        await job_queue.publish_event(user_id, {"task_id": task_id, **msg})
+    return log_callback
+
+
+async def run_orchestrator(payload: dict):
+    orchestrator = AgentOrchestrator(
+        model=payload["model"], log_callback=_event_callback(payload["user_id"], payload["task_id"])
+    )
+    await orchestrator.run(
+        payload["task_id"], payload["description"], payload["user_id"], payload["mode"], raise_errors=True,
+    )
+
+
+async def _finish_orchestrator(payload: dict, status: str, log_type: str, message: str):
+    await log_sink.write(
+        "UPDATE tasks SET status = ?, updated_at = datetime('now') WHERE id = ?", (status, payload["task_id"])
+    )
+    await log_sink.write(
+        "INSERT INTO agent_logs (task_id, agent_name, log_type, message) VALUES (?, ?, ?, ?)",
+        (payload["task_id"], "worker", log_type, message[:5000])
+    )
+    event = {"task_id": payload["task_id"], "agent": "orchestrator", "type": log_type, "content": message}
+    if status in TERMINAL_STATUSES:
+        event["status"] = status
+    await job_queue.publish_event(payload["user_id"], event)
+
+
+async def orchestrator_dead(payload: dict, error: str):
+    await _finish_orchestrator(payload, "failed", "error", f"Execution failed: {error}")
+
+
+async def orchestrator_cancelled(payload: dict):
+    await _finish_orchestrator(payload, "cancelled", "warning", "Execution cancelled")
+
+
+async def orchestrator_retrying(payload: dict, error: str, delay: float):
+    await _finish_orchestrator(payload, "queued", "warning", f"Attempt did not finish ({error}), retrying in {delay:.0f}s")
+
+
+HANDLERS = {"orchestrator": run_orchestrator}
+DEAD_HANDLERS = {"orchestrator": orchestrator_dead}
+CANCEL_HANDLERS = {"orchestrator": orchestrator_cancelled}
+RETRY_HANDLERS = {"orchestrator": orchestrator_retrying}
+
+
+async def _give_up(job: dict, error: str):
+    await job_queue.get_queue().fail(job["id"], WORKER_ID, error, None)
+    on_dead = DEAD_HANDLERS.get(job["kind"])
+    if on_dead:
+        await on_dead(job["payload"], error)
+
+
+async def _cancelled(job: dict):
+    await job_queue.get_queue().mark_cancelled(job["id"], WORKER_ID)
+    on_cancel = CANCEL_HANDLERS.get(job["kind"])
+    if on_cancel:
+        await on_cancel(job["payload"])
+
+
+def cancel_local(job_id: int) -> bool:
+    """Stop a job running in this process right away (the embedded worker
+    path; other workers notice the cancel flag within JOB_CANCEL_POLL)."""
+    budget = running.get(job_id)
+    if budget is None:
+        return False
+    budget.cancel(CANCELLED)
+    return True
+
+
+async def _watch_cancellations(stopping: asyncio.Event):
+    queue = job_queue.get_queue()
+    while not stopping.is_set():
+        try:
+            await asyncio.wait_for(stopping.wait(), JOB_CANCEL_POLL)
+            return
+        except asyncio.TimeoutError:
+            pass
+        if not running:
+            continue
+        try:
+            for job_id in await queue.cancel_requested(list(running)):
+                cancel_local(job_id)
+        except Exception as e:
+            print(f"worker: cancel check failed: {e}", file=sys.stderr)
+
+
+async def _keep_lease(job: dict, task: asyncio.Task):
+    """Extend the lease while the job runs. If it cannot be extended another
+    worker may already have reclaimed the job, so stop working on it."""
+    queue = job_queue.get_queue()
+    while True:
+        await asyncio.sleep(JOB_VISIBILITY_TIMEOUT / 3)
+        try:
+            if not await queue.extend(job["id"], WORKER_ID, JOB_VISIBILITY_TIMEOUT):
+                print(f"worker: lost lease on job {job['id']}", file=sys.stderr)
+                task.cancel()
+                return
+        except Exception as e:
+            print(f"worker: lease renewal for job {job['id']} failed: {e}", file=sys.stderr)
+
+
+async def process(job: dict, stopping: asyncio.Event):
+    queue = job_queue.get_queue()
+    handler = HANDLERS.get(job["kind"])
+    if handler is None:
+        await _give_up(job, f"unknown job kind: {job['kind']}")
+        return
+    if job["attempts"] > job["max_attempts"]:
+        await _give_up(job, "visibility timeout expired on every attempt")
+        return
+
+    if job["cancel_requested"]:
+        await _cancelled(job)
+        return
+
+    payload = job["payload"]
+    budget = TaskBudget(
+        seconds=payload.get("time_budget") or AGENT_TASK_TIME_BUDGET,
+        tokens=payload.get("token_budget") or AGENT_TASK_TOKEN_BUDGET,
+    )
+    with task_budget(budget):
+        task = asyncio.create_task(handler(payload))
+    budget.bind(task)
+    running[job["id"]] = budget
+    lease = asyncio.create_task(_keep_lease(job, task))
+    try:
+        await task
+        await queue.complete(job["id"], WORKER_ID)
+    except asyncio.CancelledError:
+        if budget.reason == CANCELLED:
+            await _cancelled(job)
+        elif budget.reason:
+            await _give_up(job, budget.reason)
+        elif stopping.is_set():
+            await queue.fail(job["id"], WORKER_ID, "worker shut down", time.time())
+        elif not task.cancelled():
+            raise
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if budget.reason == CANCELLED:
+            await _cancelled(job)
+        elif budget.reason:
+            # An exhausted budget would be exhausted again on retry
+            await _give_up(job, budget.reason)
+        elif job["attempts"] >= job["max_attempts"]:
+            await _give_up(job, error)
+        else:
+            delay = JOB_RETRY_BACKOFF * 2 ** (job["attempts"] - 1)
+            await queue.fail(job["id"], WORKER_ID, error, time.time() + delay)
+            on_retry = RETRY_HANDLERS.get(job["kind"])
+            if on_retry:
+                await on_retry(job["payload"], error, delay)
+    finally:
+        lease.cancel()
+        await asyncio.gather(lease, return_exceptions=True)
+        running.pop(job["id"], None)
+
+
+async def _slot(stopping: asyncio.Event):
+    queue = job_queue.get_queue()
+    while not stopping.is_set():
+        try:
+            job = await queue.claim(WORKER_ID, JOB_VISIBILITY_TIMEOUT)
+        except Exception as e:
+            print(f"worker: claim failed: {e}", file=sys.stderr)
+            job = None
+        if job is None:
+            try:
+                await asyncio.wait_for(stopping.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await process(job, stopping)
+
+
+async def run_worker(stopping: asyncio.Event, concurrency: int = AGENT_WORKER_CONCURRENCY):
+    """Each slot claims and runs one job at a time, so `concurrency` bounds
+    the jobs this process runs at once. Setting `stopping` stops claiming and
+    hands running jobs back to the queue for immediate retry, waiting until
+    they have actually stopped."""
+    slots = [asyncio.create_task(_slot(stopping)) for _ in range(concurrency)]
+    watcher = asyncio.create_task(_watch_cancellations(stopping))
+    try:
+        await stopping.wait()
+    finally:
+        stopping.set()
+        for budget in list(running.values()):
+            budget.cancel(None)
+        await asyncio.gather(*slots, watcher, return_exceptions=True)
+
+
+_embedded: tuple[asyncio.Task, asyncio.Event] | None = None
+
+
+def start_embedded():
+    """Run the worker inside the API process (single-process deployments)."""
+    global _embedded
+    if _embedded is None:
+        stopping = asyncio.Event()
+        _embedded = (asyncio.create_task(run_worker(stopping)), stopping)
+
+
+async def stop_embedded():
+    global _embedded
+    if _embedded is not None:
+        task, stopping = _embedded
+        stopping.set()
+        await task
+        _embedded = None
+
+
+async def main():
+    await init_db()
+    log_sink.start_sink()
+    await ollama_client.start_client()
+    model_catalog.start_catalog()
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    print(f"worker {WORKER_ID}: {job_queue.get_queue().name} queue, concurrency {AGENT_WORKER_CONCURRENCY}")
+    try:
+        await run_worker(stopping)
+    finally:
+        model_catalog.stop_catalog()
+        await ollama_client.close_client()
+        syntax_check.shutdown_pool()
+        await log_sink.stop_sink()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,334 @@
+"""Mock Ollama server for benchmarks and offline development.
+
+Implements /api/generate, /api/chat (streaming and not, JSON mode included),
+/api/tags, /api/ps, /api/embed, /api/embeddings and /api/version with a
+simulated token rate, model load delay, limited parallelism and injected
+errors. JSON-mode requests get canned outputs shaped like what the planner
+and coder agents expect.
+
+    python benchmarks/mock_ollama.py --port 11434 --tokens-per-second 50 \\
+        --load-delay 2 --error-rate 0.01 --canned canned.json
+
+`--canned` takes a JSON list of {"match": "<substring of system+prompt>",
+"response": <string or object>} rules, checked before the built-in ones.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "the attacker scanned open ports then pivoted through an exposed service while defenders "
+    "reviewed logs patched systems rotated credentials and blocked the source address"
+).split()
+
+DEFAULT_CANNED = [
+    {
+        "match": '"steps" array',
+        "response": {"steps": [
+            {"id": 1, "title": "Design", "description": "Outline modules", "type": "design", "dependencies": [], "complexity": "low"},
+            {"id": 2, "title": "Core module", "description": "Implement the core logic", "type": "code", "dependencies": [1], "complexity": "medium"},
+            {"id": 3, "title": "CLI", "description": "Command line entry point", "type": "code", "dependencies": [1], "complexity": "low"},
+            {"id": 4, "title": "Testing", "description": "Check the generated files", "type": "test", "dependencies": [2, 3], "complexity": "low"},
+            {"id": 5, "title": "Deployment", "description": "Commit the result", "type": "deploy", "dependencies": [4], "complexity": "low"},
+        ]},
+    },
+    {
+        "match": '"files" array',
+        "response": {"files": [
+            {"path": "{slug}/main.py", "content": "def main():\n    print('hello from the mock model')\n\n\nif __name__ == '__main__':\n    main()\n", "language": "python"},
+            {"path": "{slug}/README.md", "content": "# Generated\n\nProduced by the mock Ollama server.\n", "language": "markdown"},
+        ]},
+    },
+]
+
+
+@dataclass
+class MockConfig:
+    models: list[str] = field(default_factory=lambda: ["llama3:latest", "nomic-embed-text:latest"])
+    tokens_per_second: float = 200.0
+    prompt_tokens_per_second: float = 4000.0
+    load_delay: float = 0.5
+    parallel: int = 4
+    error_rate: float = 0.0
+    slow_rate: float = 0.0
+    slow_delay: float = 2.0
+    response_tokens: int = 64
+    embed_dim: int = 768
+    canned: list[dict] = field(default_factory=list)
+    seed: int = 0
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _digest(name: str) -> str:
+    return hashlib.sha256(name.encode()).hexdigest()
+
+
+def _normalize(model: str) -> str:
+    return model if ":" in model else f"{model}:latest"
+
+
+def create_app(config: MockConfig | None = None) -> FastAPI:
+    config = config or MockConfig()
+    rng = random.Random(config.seed)
+    slots = asyncio.Semaphore(config.parallel)
+    loaded: dict[str, float] = {}
+    loading: dict[str, asyncio.Task] = {}
+    stats = {"requests": 0, "errors": 0, "loads": 0, "slow": 0}
+    app = FastAPI(title="Mock Ollama")
+    app.state.config = config
+    app.state.stats = stats
+
+    async def ensure_loaded(model: str) -> float:
+        """Returns the load time paid by this request (0 when already hot)."""
+        if model in loaded:
+            return 0.0
+        task = loading.get(model)
+        if task is None:
+            stats["loads"] += 1
+            task = loading[model] = asyncio.create_task(asyncio.sleep(config.load_delay))
+        started = time.perf_counter()
+        await task
+        loading.pop(model, None)
+        loaded[model] = time.time()
+        return time.perf_counter() - started
+
+    def known(model: str) -> bool:
+        return _normalize(model) in config.models
+
+    def canned_output(prompt_text: str, json_mode: bool, limit: int) -> str:
+        for rule in config.canned + (DEFAULT_CANNED if json_mode else []):
+            if rule["match"] in prompt_text:
+                response = rule["response"]
+                text = response if isinstance(response, str) else json.dumps(response)
+                # Distinct prompts get distinct paths so parallel steps do not overwrite each other
+                return text.replace("{slug}", "pkg_" + hashlib.sha256(prompt_text.encode()).hexdigest()[:8])
+        if json_mode:
+            return "{}"
+        return " ".join(rng.choice(WORDS) for _ in range(limit))
+
+    def split_tokens(text: str) -> list[str]:
+        return [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+
+    async def handle(body: dict, chat: bool):
+        stats["requests"] += 1
+        model = _normalize(body.get("model", ""))
+        if not known(model):
+            return JSONResponse({"error": f"model '{body.get('model')}' not found"}, status_code=404)
+        if config.error_rate and rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"error": "mock failure"}, status_code=500)
+
+        if chat:
+            prompt_text = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        else:
+            prompt_text = f"{body.get('system', '')}\n{body.get('prompt', '')}"
+        options = body.get("options") or {}
+        num_predict = options.get("num_predict")
+        limit = num_predict if num_predict is not None and num_predict >= 0 else None
+        json_mode = body.get("format") == "json" or isinstance(body.get("format"), dict)
+        if limit is None and not json_mode:
+            limit = config.response_tokens
+        output = canned_output(prompt_text, json_mode, limit or config.response_tokens)
+        pieces = split_tokens(output)[:limit] if limit is not None else split_tokens(output)
+        prompt_tokens = _tokens(prompt_text)
+        stream = body.get("stream", True)
+        keep_alive = body.get("keep_alive")
+
+        def frame(content: str, done: bool, extra: dict | None = None) -> dict:
+            data = {"model": model, "created_at": datetime.now(timezone.utc).isoformat(), "done": done}
+            if chat:
+                data["message"] = {"role": "assistant", "content": content}
+            else:
+                data["response"] = content
+            if extra:
+                data.update(extra)
+            return data
+
+        async def run():
+            async with slots:
+                started = time.perf_counter()
+                load = await ensure_loaded(model)
+                prompt_seconds = prompt_tokens / config.prompt_tokens_per_second
+                if config.slow_rate and rng.random() < config.slow_rate:
+                    stats["slow"] += 1
+                    prompt_seconds += config.slow_delay
+                await asyncio.sleep(prompt_seconds)
+                eval_started = time.perf_counter()
+                for i, piece in enumerate(pieces, start=1):
+                    # Sleep to a per-token deadline so the rate does not drift under load
+                    await asyncio.sleep(max(0.0, eval_started + i / config.tokens_per_second - time.perf_counter()))
+                    yield piece
+                eval_seconds = time.perf_counter() - eval_started
+                if keep_alive in (0, "0", "0s"):
+                    loaded.pop(model, None)
+                yield {
+                    "done_reason": "stop",
+                    "total_duration": int((time.perf_counter() - started) * 1e9),
+                    "load_duration": int(load * 1e9),
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int(prompt_seconds * 1e9),
+                    "eval_count": len(pieces),
+                    "eval_duration": int(eval_seconds * 1e9),
+                }
+
+        if not chat and not body.get("prompt"):
+            # An empty prompt only loads the model (that is how warm-up works)
+            async with slots:
+                load = await ensure_loaded(model)
+            return frame("", True, {"done_reason": "load", "load_duration": int(load * 1e9)})
+
+        if stream:
+            async def lines():
+                async for item in run():
+                    if isinstance(item, dict):
+                        yield json.dumps(frame("", True, item)) + "\n"
+                    else:
+                        yield json.dumps(frame(item, False)) + "\n"
+            return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+        content, final = [], {}
+        async for item in run():
+            if isinstance(item, dict):
+                final = item
+            else:
+                content.append(item)
+        return frame("".join(content), True, final)
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        return await handle(await request.json(), chat=False)
+
+    @app.post("/api/chat")
+    async def chat(request: Request):
+        return await handle(await request.json(), chat=True)
+
+    def vector(text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+        local = random.Random(seed)
+        values = [local.gauss(0, 1) for _ in range(config.embed_dim)]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+    async def embed_inputs(model: str, inputs: list[str]):
+        stats["requests"] += 1
+        if not known(model):
+            return None
+        if config.error_rate and rng.random() < config.error_rate:
+            stats["errors"] += 1
+            return False
+        async with slots:
+            await ensure_loaded(_normalize(model))
+            await asyncio.sleep(sum(_tokens(t) for t in inputs) / config.prompt_tokens_per_second)
+        return [vector(t) for t in inputs]
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        body = await request.json()
+        inputs = body.get("input", "")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        vectors = await embed_inputs(body.get("model", ""), inputs)
+        if vectors is None:
+            return JSONResponse({"error": "model not found"}, status_code=404)
+        if vectors is False:
+            return JSONResponse({"error": "mock failure"}, status_code=500)
+        return {"model": body.get("model"), "embeddings": vectors}
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        vectors = await embed_inputs(body.get("model", ""), [body.get("prompt", "")])
+        if vectors is None:
+            return JSONResponse({"error": "model not found"}, status_code=404)
+        if vectors is False:
+            return JSONResponse({"error": "mock failure"}, status_code=500)
+        return {"embedding": vectors[0]}
+
+    def describe(name: str) -> dict:
+        return {
+            "name": name,
+            "model": name,
+            "size": 4_000_000_000,
+            "digest": _digest(name),
+            "modified_at": "2024-01-01T00:00:00Z",
+            "details": {"format": "gguf", "family": name.split(":")[0], "parameter_size": "8B", "quantization_level": "Q4_0"},
+        }
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [describe(name) for name in config.models]}
+
+    @app.get("/api/ps")
+    async def ps():
+        return {"models": [{**describe(name), "size_vram": 4_000_000_000} for name in loaded]}
+
+    @app.get("/api/version")
+    async def version():
+        return {"version": "0.0.0-mock"}
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        return {**stats, "loaded": sorted(loaded)}
+
+    return app
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    canned = []
+    if getattr(args, "canned", None):
+        with open(args.canned) as f:
+            canned = json.load(f)
+    return MockConfig(
+        models=[_normalize(m) for m in args.models.split(",") if m.strip()],
+        tokens_per_second=args.tokens_per_second,
+        prompt_tokens_per_second=args.prompt_tokens_per_second,
+        load_delay=args.load_delay,
+        parallel=args.parallel,
+        error_rate=args.error_rate,
+        slow_rate=args.slow_rate,
+        slow_delay=args.slow_delay,
+        response_tokens=args.response_tokens,
+        embed_dim=args.embed_dim,
+        canned=canned,
+        seed=args.seed,
+    )
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--models", default="llama3,nomic-embed-text", help="comma separated model names")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--prompt-tokens-per-second", type=float, default=4000.0)
+    parser.add_argument("--load-delay", type=float, default=0.5, help="seconds to 'load' a cold model")
+    parser.add_argument("--parallel", type=int, default=4, help="requests served at once (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="fraction of requests stalled before the first token")
+    parser.add_argument("--slow-delay", type=float, default=2.0, help="seconds a slow request stalls")
+    parser.add_argument("--response-tokens", type=int, default=64, help="tokens per free-text completion")
+    parser.add_argument("--embed-dim", type=int, default=768)
+    parser.add_argument("--canned", help="JSON file with extra canned response rules")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""End-to-end benchmark of the agent, chat and SOC paths against the mock
+Ollama server. Needs no GPU and no network: the mock server listens on
+localhost and the API is driven in-process with a throwaway database and
+workspace.
+
+    python benchmarks/pipeline.py --concurrency 1,4,16 --requests 32
+    python benchmarks/pipeline.py --quick --json results.json   # CI
+
+Each scenario runs `--requests` operations at each concurrency level and
+reports throughput plus p50/p95/p99 latency. Mock server options
+(--tokens-per-second, --load-delay, --error-rate, ...) shape the simulated
+model.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_ollama import add_arguments, config_from_args, create_app  # noqa: E402
+
+SCENARIOS = ("orchestrator", "chat", "soc")
+_counter = itertools.count(1)
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def _environment(workdir: str, ollama_url: str):
+    """Point the backend at the mock server and a scratch directory. Must run
+    before anything under `app` is imported, since config is read at import."""
+    os.environ.update({
+        "OLLAMA_BASE_URL": ollama_url,
+        "OLLAMA_NODES": ollama_url,
+        "DB_PATH": os.path.join(workdir, "bench.db"),
+        "WORKSPACE_DIR": os.path.join(workdir, "workspace"),
+        "CHROMADB_DIR": os.path.join(workdir, "chroma"),
+        "MEMORY_INDEX_DIR": os.path.join(workdir, "index"),
+        "REPORTS_DIR": os.path.join(workdir, "reports"),
+        "UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "REDIS_URL": "",
+        "LLM_CACHE_ENABLED": "false",
+        "AGENT_EMBEDDED_WORKER": "false",
+        "ORCHESTRATOR_RESUME_ON_STARTUP": "false",
+        "OLLAMA_HOT_MODELS": "",
+    })
+
+
+async def _serve_mock(args) -> tuple[str, asyncio.Task, object]:
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    mock = create_app(config_from_args(args))
+    server = uvicorn.Server(uvicorn.Config(mock, log_level="warning", lifespan="off"))
+    task = asyncio.create_task(server.serve(sockets=[sock]))
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return f"http://127.0.0.1:{sock.getsockname()[1]}", task, server
+
+
+async def _run_orchestrator(ctx: dict) -> bool:
+    import aiosqlite
+    from app.agents.orchestrator import AgentOrchestrator
+    from app.core.config import DB_PATH
+
+    n = next(_counter)
+    description = f"Build a small port scanner utility #{n}"
+    async with aiosqlite.connect(DB_PATH) as db:
+        cursor = await db.execute(
+            "INSERT INTO tasks (user_id, title, description, status, agent_type, model_used, mode) "
+            "VALUES (?, ?, ?, 'pending', 'orchestrator', ?, ?)",
+            (ctx["user_id"], description, description, ctx["model"], ctx["mode"])
+        )
+        await db.commit()
+        task_id = cursor.lastrowid
+    result = await AgentOrchestrator(model=ctx["model"]).run(task_id, description, ctx["user_id"], ctx["mode"])
+    return result.get("status") == "completed"
+
+
+async def _run_chat(ctx: dict) -> bool:
+    n = next(_counter)
+    response = await ctx["client"].post("/api/chat/send", json={
+        "message": f"How do I harden SSH on host {n}?", "model": ctx["model"], "session_id": f"bench-{n}",
+    })
+    return response.status_code == 200 and not response.json()["response"].startswith("[")
+
+
+async def _run_soc(ctx: dict) -> bool:
+    n = next(_counter)
+    response = await ctx["client"].post("/api/soc/analyze", json={
+        "model": ctx["model"],
+        "event_data": {"event_type": "ssh_bruteforce", "source": f"10.0.{n // 256 % 256}.{n % 256}", "attempts": 40 + n},
+    })
+    return response.status_code == 200 and not response.json().get("analysis", "Error").startswith("Error")
+
+
+RUNNERS = {"orchestrator": _run_orchestrator, "chat": _run_chat, "soc": _run_soc}
+
+
+async def _level(runner, ctx: dict, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok = await runner(ctx)
+            except Exception:
+                ok = False
+            latencies.append((time.perf_counter() - started) * 1000)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput": round(requests / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(ordered, 50), 1),
+        "p95_ms": round(_percentile(ordered, 95), 1),
+        "p99_ms": round(_percentile(ordered, 99), 1),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--concurrency", default="1,4,16", help="comma separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=32, help="operations per level (chat, soc)")
+    parser.add_argument("--orchestrator-requests", type=int, default=8, help="orchestrator runs per level")
+    parser.add_argument("--mode", default="code", help="orchestrator mode (full also runs git in the workspace)")
+    parser.add_argument("--model", default="llama3")
+    parser.add_argument("--quick", action="store_true", help="small run for CI")
+    parser.add_argument("--json", help="also write results to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+    if args.quick:
+        args.concurrency, args.requests, args.orchestrator_requests = "1,4", 8, 2
+        args.tokens_per_second, args.load_delay = max(args.tokens_per_second, 1000.0), 0.05
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    scenarios = [s for s in args.scenarios.split(",") if s in RUNNERS]
+
+    with tempfile.TemporaryDirectory(prefix="rudrax-bench-") as workdir:
+        url, mock_task, server = await _serve_mock(args)
+        _environment(workdir, url)
+
+        import httpx
+        from app.core.security import create_access_token
+        from app.main import app
+
+        results = {}
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=600) as client:
+                client.headers["Authorization"] = f"Bearer {create_access_token({'sub': '1'})}"
+                ctx = {"client": client, "user_id": 1, "model": args.model, "mode": args.mode}
+                for scenario in scenarios:
+                    requests = args.orchestrator_requests if scenario == "orchestrator" else args.requests
+                    results[scenario] = [await _level(RUNNERS[scenario], ctx, requests, c) for c in levels]
+
+        server.should_exit = True
+        await mock_task
+
+    print(f"{'scenario':<13}{'conc':>5}{'reqs':>6}{'err':>5}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for scenario, rows in results.items():
+        for r in rows:
+            print(f"{scenario:<13}{r['concurrency']:>5}{r['requests']:>6}{r['errors']:>5}{r['throughput']:>9.2f}"
+                  f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    if any(r["errors"] for rows in results.values() for r in rows) and not args.error_rate:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
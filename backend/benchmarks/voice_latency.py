@@ -0,0 +1,75 @@
+"""Time-to-first-chunk benchmark for /api/voice/process.
+
+Compares the blocking endpoint (first audio can only start once the whole
+answer arrives) with the streaming mode (first sentence chunk). Each run
+tags the text with a unique marker so the blocking path is never served
+from the LLM response cache.
+
+    python benchmarks/voice_latency.py --url http://localhost:8000 \\
+        --email admin@rudrax.local --password ... --runs 10
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import httpx
+
+
+def _summary(samples: list[float]) -> str:
+    if not samples:
+        return "n/a"
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return f"p50={statistics.median(ordered):.0f}ms p95={p95:.0f}ms max={ordered[-1]:.0f}ms"
+
+
+async def _blocking(client: httpx.AsyncClient, payload: dict) -> float:
+    started = time.perf_counter()
+    response = await client.post("/api/voice/process", json=payload)
+    response.raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+
+async def _streaming(client: httpx.AsyncClient, payload: dict) -> tuple[float | None, float]:
+    started = time.perf_counter()
+    first_chunk = None
+    async with client.stream("POST", "/api/voice/process", json={**payload, "stream": True}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line and first_chunk is None and "chunk" in json.loads(line):
+                first_chunk = (time.perf_counter() - started) * 1000
+    return first_chunk, (time.perf_counter() - started) * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--model", default="llama3")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--text", default="Explain what a SYN flood is and how to mitigate it.")
+    args = parser.parse_args()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=300) as client:
+        login = await client.post("/api/auth/login", json={"email": args.email, "password": args.password})
+        login.raise_for_status()
+        client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+
+        blocking, first_chunks, streamed = [], [], []
+        for run in range(args.runs):
+            payload = {"text": f"{args.text} (run {run + 1}, {time.time_ns()})", "model": args.model}
+            blocking.append(await _blocking(client, payload))
+            first_chunk, total = await _streaming(client, payload)
+            if first_chunk is not None:
+                first_chunks.append(first_chunk)
+            streamed.append(total)
+
+    print(f"blocking response       {_summary(blocking)}")
+    print(f"streaming first chunk   {_summary(first_chunks)}")
+    print(f"streaming full response {_summary(streamed)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+import json
+
+from app.services.json_stream import JSONStreamParser
+
+
+def _feed_in_chunks(parser: JSONStreamParser, text: str, size: int) -> list:
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i:i + size]))
+    return items
+
+
+def test_items_emitted_as_each_completes():
+    parser = JSONStreamParser("files")
+    assert parser.feed('{"files": [{"path": "a.py", "content": "x"}') == [{"path": "a.py", "content": "x"}]
+    assert parser.feed(', {"path": "b.py"') == []
+    assert parser.feed("}]}") == [{"path": "b.py"}]
+    assert parser.items == [{"path": "a.py", "content": "x"}, {"path": "b.py"}]
+
+
+def test_chunks_split_anywhere():
+    document = {"files": [
+        {"path": "src/main.py", "content": "print('hi')\n"},
+        {"path": "README.md", "content": "# Title {not json} [x]"},
+    ]}
+    text = json.dumps(document)
+    for size in (1, 2, 3, 7, 64):
+        parser = JSONStreamParser("files")
+        assert _feed_in_chunks(parser, text, size) == document["files"]
+        assert parser.close() == document
+
+
+def test_escaped_quotes_and_backslashes_in_strings():
+    document = {"files": [
+        {"path": "q.py", "content": 'say("\\"hi\\"") # ends with backslash \\'},
+        {"path": "r.py", "content": "}]{["},
+    ]}
+    text = json.dumps(document)
+    parser = JSONStreamParser("files")
+    assert _feed_in_chunks(parser, text, 1) == document["files"]
+
+
+def test_only_the_named_top_level_array_is_streamed():
+    text = json.dumps({
+        "notes": [{"path": "ignored"}],
+        "meta": {"files": [{"path": "nested, ignored"}]},
+        "files": [{"path": "kept"}],
+    })
+    parser = JSONStreamParser("files")
+    assert _feed_in_chunks(parser, text, 5) == [{"path": "kept"}]
+
+
+def test_string_value_equal_to_the_key_is_not_mistaken_for_it():
+    parser = JSONStreamParser("steps")
+    text = '{"title": "steps", "steps": [{"id": 1}, {"id": 2}]}'
+    assert _feed_in_chunks(parser, text, 4) == [{"id": 1}, {"id": 2}]
+
+
+def test_close_tolerates_surrounding_text():
+    parser = JSONStreamParser("files")
+    parser.feed('Here you go:\n```json\n{"files": []}\n```')
+    assert parser.close() == {"files": []}
+
+
+def test_close_returns_none_for_invalid_documents():
+    parser = JSONStreamParser("files")
+    parser.feed('{"files": [{"path": "a.py"}')
+    assert parser.items == [{"path": "a.py"}]
+    assert parser.close() is None
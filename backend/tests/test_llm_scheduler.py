@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from app.services.llm_scheduler import LLMQueueFull, LLMScheduler
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _run_in_order(scheduler: LLMScheduler, requests: list[tuple[str, str, int | None]]) -> list[str]:
+    """Holds the only slot, queues `requests` (name, priority, user) and
+    returns the order in which they are granted."""
+    order = []
+    release = asyncio.Event()
+
+    async def request(name, priority, user_id):
+        async with scheduler.slot("llama3", priority, user_id):
+            order.append(name)
+            await release.wait()
+
+    async with scheduler.slot("llama3", "interactive", 0):
+        tasks = [asyncio.create_task(request(*r)) for r in requests]
+        await _settle()
+        assert order == []
+    release.set()
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_higher_priority_waiters_go_first():
+    async def main():
+        scheduler = LLMScheduler(1, {}, 16)
+        return await _run_in_order(scheduler, [
+            ("agent", "background", 1), ("soc", "soc", 2), ("chat", "interactive", 3),
+        ])
+    assert asyncio.run(main()) == ["chat", "soc", "agent"]
+
+
+def test_fair_share_between_users_at_the_same_priority():
+    async def main():
+        scheduler = LLMScheduler(2, {}, 16)
+        order = []
+
+        async def request(name, user_id):
+            async with scheduler.slot("llama3", "background", user_id):
+                order.append(name)
+
+        # User 1 already holds a slot, so when user 3's frees up user 2 is
+        # served before user 1's earlier queued request
+        async with scheduler.slot("llama3", "background", 1):
+            async with scheduler.slot("llama3", "background", 3):
+                tasks = [asyncio.create_task(request(n, u)) for n, u in (("u1-a", 1), ("u1-b", 1), ("u2", 2))]
+                await _settle()
+            await _settle()
+        await asyncio.gather(*tasks)
+        return order
+    assert asyncio.run(main()) == ["u2", "u1-a", "u1-b"]
+
+
+def test_cancel_while_queued_frees_the_place():
+    async def main():
+        scheduler = LLMScheduler(1, {}, 16)
+        granted = []
+
+        async def request(name):
+            async with scheduler.slot("llama3", "interactive", None):
+                granted.append(name)
+
+        async with scheduler.slot("llama3", "interactive", None):
+            first = asyncio.create_task(request("cancelled"))
+            second = asyncio.create_task(request("served"))
+            await _settle()
+            assert scheduler.queued() == 2
+            first.cancel()
+            await _settle()
+            assert scheduler.queued() == 1
+        await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        stats = scheduler.stats()["models"]["llama3:latest"]
+        return granted, stats["active"], stats["queued"]
+    assert asyncio.run(main()) == (["served"], 0, 0)
+
+
+def test_full_queue_rejects():
+    async def main():
+        scheduler = LLMScheduler(1, {}, 1)
+        async with scheduler.slot("llama3", "interactive", None):
+            waiting = asyncio.create_task(scheduler.acquire("llama3", "interactive", None))
+            await _settle()
+            with pytest.raises(LLMQueueFull):
+                await scheduler.acquire("llama3", "interactive", None)
+        await waiting
+        scheduler.release("llama3", None)
+        return scheduler.rejected
+    assert asyncio.run(main()) == 1
+
+
+def test_per_model_limits_scale_with_capacity():
+    async def main():
+        scheduler = LLMScheduler(1, {"big:latest": 2}, 16)
+        for _ in range(2):
+            await scheduler.acquire("big", "interactive", None)
+        waiting = asyncio.create_task(scheduler.acquire("big", "interactive", None))
+        await _settle()
+        assert not waiting.done()
+        scheduler.set_capacity(2)
+        await _settle()
+        assert waiting.done()
+        return scheduler.stats()["models"]["big:latest"]["limit"]
+    assert asyncio.run(main()) == 4
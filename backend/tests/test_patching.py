@@ -0,0 +1,67 @@
+import pytest
+
+from app.services.patching import PatchError, apply_unified_diff
+
+ORIGINAL = "".join(f"line {i}\n" for i in range(1, 21))
+
+
+def test_applies_a_simple_hunk():
+    diff = """--- a/f.txt
++++ b/f.txt
+@@ -4,3 +4,3 @@
+ line 4
+-line 5
++line five
+ line 6
+"""
+    assert apply_unified_diff(ORIGINAL, diff) == ORIGINAL.replace("line 5\n", "line five\n")
+
+
+def test_shifted_hunk_offsets_still_apply():
+    # Header says line 2 but the context is really at line 10
+    diff = """@@ -2,3 +2,4 @@
+ line 10
++inserted
+ line 11
+ line 12
+"""
+    result = apply_unified_diff(ORIGINAL, diff).splitlines()
+    assert result[9:13] == ["line 10", "inserted", "line 11", "line 12"]
+
+
+def test_later_hunks_account_for_earlier_line_changes():
+    diff = """@@ -1,2 +1,4 @@
+ line 1
++a
++b
+ line 2
+@@ -15,2 +17,1 @@
+-line 15
+ line 16
+"""
+    result = apply_unified_diff(ORIGINAL, diff).splitlines()
+    assert result[:4] == ["line 1", "a", "b", "line 2"]
+    assert "line 15" not in result
+    assert len(result) == 21
+
+
+def test_blank_context_lines_without_leading_space():
+    original = "a\n\nb\n"
+    diff = "@@ -1,3 +1,3 @@\n a\n\n-b\n+c\n"
+    assert apply_unified_diff(original, diff) == "a\n\nc\n"
+
+
+def test_trailing_newline_is_preserved():
+    assert apply_unified_diff("x\ny", "@@ -1 +1 @@\n-x\n+z\n") == "z\ny"
+    assert apply_unified_diff("x\ny\n", "@@ -1 +1 @@\n-x\n+z\n") == "z\ny\n"
+
+
+def test_missing_context_raises():
+    diff = "@@ -3,1 +3,1 @@\n-not in file\n+x\n"
+    with pytest.raises(PatchError):
+        apply_unified_diff(ORIGINAL, diff)
+
+
+def test_diff_without_hunks_raises():
+    with pytest.raises(PatchError):
+        apply_unified_diff(ORIGINAL, "--- a/f\n+++ b/f\n")
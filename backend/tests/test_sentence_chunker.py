@@ -0,0 +1,43 @@
+from app.services.voice_service import SentenceChunker
+
+
+def _chunk(tokens: list[str], **kwargs) -> list[str]:
+    chunker = SentenceChunker(**kwargs)
+    chunks = [c for t in tokens for c in chunker.feed(t)]
+    tail = chunker.flush()
+    return chunks + ([tail] if tail else [])
+
+
+def test_releases_each_sentence_once_it_ends():
+    chunker = SentenceChunker()
+    assert chunker.feed("A SYN flood exhausts") == []
+    assert chunker.feed(" the backlog. Enable") == ["A SYN flood exhausts the backlog."]
+    assert chunker.feed(" SYN cookies!\n") == ["Enable SYN cookies!"]
+    assert chunker.flush() == ""
+
+
+def test_token_boundaries_do_not_matter():
+    text = "First sentence here. Second one follows? Third ends it."
+    expected = ["First sentence here.", "Second one follows?", "Third ends it."]
+    assert _chunk([text]) == expected
+    assert _chunk(list(text)) == expected
+
+
+def test_short_sentences_are_merged_up_to_min_chars():
+    assert _chunk(["Yes. No. Maybe so, friend. "], min_chars=12) == ["Yes. No. Maybe so, friend."]
+
+
+def test_devanagari_danda_ends_a_sentence():
+    assert _chunk(["यह पहला वाक्य है। यह दूसरा है।"]) == ["यह पहला वाक्य है।", "यह दूसरा है।"]
+
+
+def test_long_sentences_split_at_a_clause_then_a_word():
+    clause = _chunk(["alpha beta gamma, delta epsilon zeta eta theta"], min_chars=5, max_chars=30)
+    assert clause[0] == "alpha beta gamma,"
+    words = _chunk(["alpha beta gamma delta epsilon zeta eta theta"], min_chars=5, max_chars=20)
+    assert words[0] == "alpha beta gamma"
+    assert all(len(c) <= 20 for c in words)
+
+
+def test_unbroken_text_is_cut_at_max_chars():
+    assert _chunk(["x" * 25], min_chars=5, max_chars=10) == ["x" * 10, "x" * 10, "x" * 5]
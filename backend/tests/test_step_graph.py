@@ -0,0 +1,82 @@
+from app.agents.step_graph import ancestors, build_steps, critical_path
+
+
+def _plan(*steps):
+    return {"steps": list(steps)}
+
+
+def test_dependencies_are_normalised():
+    steps = build_steps(_plan(
+        {"id": 1, "type": "design"},
+        {"id": 2, "type": "code", "dependencies": [1, "1", 2, 99]},
+        {"id": 3, "type": "code", "dependencies": 2},
+    ), "code")
+    assert steps["2"]["deps"] == ["1"]
+    assert steps["3"]["deps"] == ["2"]
+
+
+def test_duplicate_ids_are_kept_apart():
+    steps = build_steps(_plan(
+        {"id": 1, "type": "code", "title": "first"},
+        {"id": 1, "type": "code", "title": "second"},
+    ), "code")
+    assert [s["title"] for s in steps.values()] == ["first", "second"]
+    assert set(steps) == {"1", "1.2"}
+
+
+def test_cycles_are_kept_for_the_orchestrator_to_break():
+    steps = build_steps(_plan(
+        {"id": "a", "type": "code", "dependencies": ["b"]},
+        {"id": "b", "type": "code", "dependencies": ["a"]},
+    ), "code")
+    assert steps["a"]["deps"] == ["b"] and steps["b"]["deps"] == ["a"]
+    assert ancestors(steps, "a") == {"a", "b"}
+
+
+def test_deploy_steps_collapse_into_one_final_node():
+    steps = build_steps(_plan(
+        {"id": 1, "type": "code"},
+        {"id": 2, "type": "deploy", "dependencies": [1]},
+        {"id": 3, "type": "test", "dependencies": [2]},
+        {"id": 4, "type": "deploy", "dependencies": [3]},
+    ), "full")
+    assert [s for s in steps if steps[s]["type"] == "deploy"] == ["deploy"]
+    assert steps["deploy"]["deps"] == ["1", "3"]
+    assert steps["3"]["deps"] == []
+
+
+def test_steps_outside_the_mode_become_noops():
+    steps = build_steps(_plan(
+        {"id": 1, "type": "code"},
+        {"id": 2, "type": "test", "dependencies": [1]},
+        {"id": 3, "type": "deploy", "dependencies": [2]},
+    ), "code")
+    assert steps["2"]["type"] == "noop" and steps["2"]["deps"] == ["1"]
+    assert steps["3"]["type"] == "noop"
+
+
+def test_missing_code_and_test_steps_are_synthesised():
+    steps = build_steps(_plan({"id": 1, "type": "design"}), "full")
+    assert steps["code"]["deps"] == []
+    assert steps["test"]["deps"] == ["code"]
+    assert steps["deploy"]["deps"] == ["1", "code", "test"]
+
+
+def test_empty_or_malformed_plan():
+    steps = build_steps({"steps": ["not a step", None]}, "code")
+    assert list(steps) == ["code"]
+
+
+def test_critical_path_follows_the_latest_finishing_dependency():
+    steps = build_steps(_plan(
+        {"id": "a", "type": "code"},
+        {"id": "b", "type": "code"},
+        {"id": "c", "type": "code", "dependencies": ["a", "b"]},
+    ), "code")
+    timings = {
+        "a": {"start": 0.0, "end": 1.0},
+        "b": {"start": 0.0, "end": 3.0},
+        "c": {"start": 3.0, "end": 4.0},
+    }
+    assert critical_path(steps, timings) == (["b", "c"], 4.0)
+    assert critical_path(steps, {}) == ([], 0.0)
@@ -0,0 +1,124 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.services.vector_index import VectorShard
+
+DIM = 16
+
+
+def _clustered(n_clusters: int = 20, per_cluster: int = 60, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, DIM))
+    return np.concatenate([c + 0.05 * rng.normal(size=(per_cluster, DIM)) for c in centers]).astype(np.float32)
+
+
+def _exact_top(data: np.ndarray, query: np.ndarray, k: int) -> list[int]:
+    unit = data / np.linalg.norm(data, axis=1, keepdims=True)
+    scores = unit @ (query / np.linalg.norm(query))
+    return [int(i) + 1 for i in np.argsort(-scores)[:k]]
+
+
+@pytest.fixture
+def shard(tmp_path):
+    return VectorShard(str(tmp_path / "user_1"), DIM, "nomic-embed-text:latest")
+
+
+def _fill(shard: VectorShard, data: np.ndarray):
+    for memory_id, vector in enumerate(data, start=1):
+        shard.upsert(memory_id, vector)
+
+
+def test_exact_top_k_before_training(shard):
+    data = _clustered()
+    _fill(shard, data)
+    query = data[137] + 0.01
+    hits = shard.search(query, k=5)
+    assert [memory_id for memory_id, _ in hits] == _exact_top(data, query, 5)
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-3)
+    assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+
+
+def test_approximate_top_k_after_training(shard):
+    data = _clustered()
+    _fill(shard, data)
+    shard.train()
+    assert shard.centroids is not None
+    for row in (3, 250, 1100):
+        query = data[row] + 0.01
+        exact = shard.search(query, k=5, approximate=False)
+        approximate = shard.search(query, k=5, approximate=True)
+        assert [m for m, _ in exact] == _exact_top(data, query, 5)
+        assert approximate[0][0] == row + 1
+        # Neighbours within the same tight cluster are found through the probed lists
+        assert len(set(m for m, _ in approximate) & set(m for m, _ in exact)) >= 4
+
+
+def test_rows_added_after_training_are_searchable(shard):
+    data = _clustered()
+    _fill(shard, data[:-1])
+    shard.train()
+    embedding_id = shard.upsert(9999, data[-1])
+    assert shard.search(data[-1], k=1, approximate=True)[0][0] == 9999
+    assert embedding_id == str(len(data) - 1)
+
+
+def test_upsert_in_place_and_remove(shard):
+    a, b = np.eye(DIM, dtype=np.float32)[:2]
+    embedding_id = shard.upsert(1, a)
+    shard.upsert(2, b)
+    assert shard.upsert(1, b, embedding_id) == embedding_id
+    assert shard.count == 2
+    assert {m for m, _ in shard.search(b, k=2)} == {1, 2}
+    shard.remove(embedding_id)
+    assert shard.search(b, k=2) == [(2, pytest.approx(1.0))]
+    assert shard.live_count() == 1
+
+
+def test_grows_past_initial_capacity_and_reopens(tmp_path):
+    path = str(tmp_path / "user_2")
+    shard = VectorShard(path, DIM, "m")
+    data = _clustered(n_clusters=5, per_cluster=240, seed=1)
+    _fill(shard, data)
+    shard.flush()
+    reopened = VectorShard(path, 0, "")
+    assert reopened.count == len(data) and reopened.dim == DIM and reopened.model == "m"
+    assert reopened.search(data[1100], k=1)[0][0] == 1101
+
+
+def test_dimension_mismatch_is_rejected(shard):
+    with pytest.raises(ValueError):
+        shard.upsert(1, np.ones(DIM + 1))
+
+
+def test_empty_shard_returns_nothing(shard):
+    assert shard.search(np.ones(DIM), k=3) == []
+
+
+def test_search_during_retraining_sees_a_consistent_partition(shard):
+    data = _clustered()
+    _fill(shard, data[:200])
+    shard.train()
+    _fill(shard, data)
+    errors = []
+    done = threading.Event()
+
+    def search_loop():
+        while not done.is_set():
+            try:
+                shard.search(data[900], k=5, approximate=True)
+            except Exception as e:
+                errors.append(e)
+                return
+
+    searcher = threading.Thread(target=search_loop)
+    searcher.start()
+    try:
+        for _ in range(5):
+            shard.train()
+    finally:
+        done.set()
+        searcher.join()
+    assert errors == []
+    assert len(shard.lists) == len(shard.centroids)
@@ -44,7 +44,7 @@ docker-compose down --remove-orphans 2>/dev/null || true
 
 if [ -n "$OLLAMA_HOST_URL" ]; then
     echo -e "${YELLOW}  Using existing Ollama at: $OLLAMA_HOST_URL${NC}"
-    OLLAMA_BASE_URL="$OLLAMA_HOST_URL" docker-compose up -d --build rudrax-backend rudrax-frontend redis celery-worker
+    OLLAMA_BASE_URL="$OLLAMA_HOST_URL" docker-compose up -d --build rudrax-backend rudrax-frontend redis agent-worker
 else
     echo -e "${YELLOW}  Starting full stack including Ollama...${NC}"
     docker-compose up -d --build
@@ -1,13 +1,14 @@
 import { useState, useEffect, useRef } from "react";
 import { api } from "@/services/api";
 import { useAuth } from "@/context/AuthContext";
-import { Play, Terminal, Bot, Loader2 } from "lucide-react";
+import { Play, Square, Terminal, Bot, Loader2 } from "lucide-react";
 
 interface LogEntry {
   agent: string;
   type: string;
   content: string;
   timestamp?: string;
+  status?: "completed" | "failed" | "cancelled";
 }
 
 export default function AgentPage() {
@@ -38,11 +39,9 @@ export default function AgentPage() {
         const data = JSON.parse(event.data);
         if (data.type === "connected") return;
         if (data.type === "pong") return;
-        setLogs((prev) => [...prev, data]);
-        if (data.agent === "orchestrator" && data.content?.includes("completed")) {
-          setRunning(false);
-        }
-        if (data.agent === "orchestrator" && data.content?.includes("failed")) {
+        const messages: LogEntry[] = data.type === "batch" ? data.messages : [data];
+        setLogs((prev) => [...prev, ...messages]);
+        if (messages.some((msg) => msg.agent === "orchestrator" && msg.status)) {
           setRunning(false);
         }
       } catch {
@@ -68,6 +67,17 @@ export default function AgentPage() {
     }
   };
 
+  const cancelTask = async () => {
+    if (!taskId) return;
+    try {
+      const data = await api.cancelAgentTask(taskId);
+      if (data.status === "cancelled") setRunning(false);
+      setLogs((prev) => [...prev, { agent: "system", type: "warning", content: `Task #${taskId} ${data.status ?? "cancel failed"}` }]);
+    } catch {
+      setLogs((prev) => [...prev, { agent: "system", type: "error", content: "Failed to cancel task" }]);
+    }
+  };
+
   const getAgentColor = (agent: string) => {
     const colors: Record<string, string> = {
       planner: "text-blue-400",
@@ -119,6 +129,11 @@ export default function AgentPage() {
             {running ? <Loader2 className="w-4 h-4 animate-spin" /> : <Play className="w-4 h-4" />}
             {running ? "Running..." : "Execute"}
           </button>
+          {running && taskId && (
+            <button onClick={cancelTask} className="flex items-center gap-2 px-4 py-2 bg-red-600/80 hover:bg-red-500 text-white font-medium rounded-lg transition-all">
+              <Square className="w-4 h-4" /> Stop
+            </button>
+          )}
         </div>
       </div>
 
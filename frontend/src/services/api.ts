@@ -98,6 +98,11 @@ export const api = {
     return res.json();
   },
 
+  async cancelAgentTask(taskId: number) {
+    const res = await request(`/api/agent/tasks/${taskId}/cancel`, { method: "POST" });
+    return res.json();
+  },
+
   async getTasks() {
     const res = await request("/api/tasks/");
     return res.json();
@@ -226,16 +226,33 @@ async def root():
         "ollama_url": OLLAMA_URL
     }
 
-@app.get("/api/health")
-async def health_check():
-    """Health check endpoint"""
-    ollama_status = "unknown"
+# Ollama model list cache, so health/model polling doesn't hit Ollama every call
+TAGS_CACHE_TTL = float(os.getenv("OLLAMA_TAGS_CACHE_TTL", "15"))
+_tags_cache: Dict[str, Any] = {"status": "unknown", "models": [], "fetched_at": 0.0}
+
+async def get_ollama_tags() -> Dict[str, Any]:
+    """Return cached Ollama /api/tags result, refreshing it once the TTL expires"""
+    now = datetime.now().timestamp()
+    if now - _tags_cache["fetched_at"] < TAGS_CACHE_TTL:
+        return _tags_cache
     try:
         async with httpx.AsyncClient() as client:
             response = await client.get(f"{OLLAMA_URL}/api/tags", timeout=5.0)
-            ollama_status = "connected" if response.status_code == 200 else "error"
+            if response.status_code == 200:
+                _tags_cache["status"] = "connected"
+                _tags_cache["models"] = [model["name"] for model in response.json().get("models", [])]
+            else:
+                _tags_cache["status"] = "error"
     except:
-        ollama_status = "disconnected"
+        _tags_cache["status"] = "disconnected"
+    _tags_cache["fetched_at"] = now
+    return _tags_cache
+
+@app.get("/api/health")
+async def health_check():
+    """Health check endpoint"""
+    tags = await get_ollama_tags()
+    ollama_status = tags["status"]
     
     return {
         "status": "healthy",
@@ -246,17 +263,12 @@ async def health_check():
 @app.get("/api/models")
 async def list_models():
     """List available Ollama models"""
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{OLLAMA_URL}/api/tags", timeout=10.0)
-            if response.status_code == 200:
-                data = response.json()
-                models = [model["name"] for model in data.get("models", [])]
-                return {"models": models}
-            else:
-                return {"models": ["llama2", "codellama", "mistral"], "error": "Using defaults"}
-    except:
-        return {"models": ["llama2", "codellama", "mistral"], "error": "Ollama not connected"}
+    tags = await get_ollama_tags()
+    if tags["status"] == "connected":
+        return {"models": tags["models"]}
+    elif tags["status"] == "error":
+        return {"models": ["llama2", "codellama", "mistral"], "error": "Using defaults"}
+    return {"models": ["llama2", "codellama", "mistral"], "error": "Ollama not connected"}
 
 @app.post("/api/chat")
 async def chat(request: ChatRequest):